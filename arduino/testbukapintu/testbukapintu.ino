@@ -31,6 +31,7 @@ const char* password = "1234512345";      // Ganti dengan password WiFi Anda
 const char* mqtt_server = "broker.hivemq.com";
 const int mqtt_port = 1883;
 const char* mqtt_topic = "fc/pintu";         // Topik MQTT (harus sama dengan app.py)
+const char* mqtt_status_topic = "fc/pintu/status";  // Status pintu untuk app.py (retained)
 const char* mqtt_id = "esp32_door_01";       // ID unik ESP32
 
 // ============================================================
@@ -103,6 +104,7 @@ void mqtt_callback(char* topic, byte* payload, unsigned int length) {
     // Nyalakan Relay (buzzer bunyi)
     digitalWrite(RELAY_PIN, HIGH);
     Serial.println("📣 RELAY ON (Buzzer bunyi)");
+    client.publish(mqtt_status_topic, "pintu=TERBUKA", true);
     
     // Tunggu 10 detik
     delay(10000);
@@ -112,6 +114,7 @@ void mqtt_callback(char* topic, byte* payload, unsigned int length) {
     digitalWrite(RELAY_PIN, LOW);
     Serial.println("💡 LED OFF");
     Serial.println("📣 RELAY OFF (Buzzer diam)");
+    client.publish(mqtt_status_topic, "pintu=TERTUTUP", true);
   }
 
   // ========================================================
@@ -125,6 +128,7 @@ void mqtt_callback(char* topic, byte* payload, unsigned int length) {
     digitalWrite(RELAY_PIN, LOW);
     Serial.println("💡 LED OFF");
     Serial.println("📣 RELAY OFF");
+    client.publish(mqtt_status_topic, "pintu=TERTUTUP", true);
   }
 
   // ========================================================
@@ -159,7 +163,8 @@ void reconnect() {
   while (!client.connected() && attempts < 5) {
     Serial.print("🔄 Mencoba connect ke MQTT broker...");
     
-    if (client.connect(mqtt_id)) {
+    // Last will: broker publish status=OFFLINE jika ESP32 putus tanpa pamit
+    if (client.connect(mqtt_id, mqtt_status_topic, 1, true, "status=OFFLINE")) {
       Serial.println(" ✅ Connected!");
       
       // Subscribe ke topik MQTT
@@ -169,6 +174,7 @@ void reconnect() {
       
       // Publish status online
       client.publish(mqtt_topic, "status=ONLINE");
+      client.publish(mqtt_status_topic, "status=ONLINE", true);
       Serial.println("📡 Publish: status=ONLINE");
     } else {
       Serial.print(" ❌ Failed (rc=");
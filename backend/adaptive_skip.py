@@ -0,0 +1,104 @@
+"""
+=============================================================
+Adaptive Frame-Skip Controller
+=============================================================
+Pengganti `frame_count % 2 == 0` yang hard-coded. Controller ini
+mengukur waktu deteksi + encoding per frame yang diproses, lalu
+menentukan kapan frame berikutnya boleh diproses:
+
+    interval = max(1 / target_rate, biaya_rata2 / cpu_budget)
+
+  - Mesin cepat  → diproses sesuai target_rate (tidak boros CPU)
+  - Mesin lambat → interval melebar supaya waktu proses tidak melebihi
+                   cpu_budget (fraksi waktu wall-clock) dan stream
+                   tidak tertinggal
+
+Penggunaan:
+    from adaptive_skip import AdaptiveFrameSkipper
+
+    skipper = AdaptiveFrameSkipper(target_rate=5.0, cpu_budget=0.5)
+    if skipper.should_process():
+        t0 = time.perf_counter()
+        ...  # deteksi + encoding
+        skipper.record(time.perf_counter() - t0)
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+
+class AdaptiveFrameSkipper:
+    """
+    Menentukan frame mana yang diproses berdasarkan latency terukur
+    """
+
+    def __init__(self, target_rate: float = 5.0, cpu_budget: float = 0.5,
+                 smoothing: float = 0.2, window: float = 5.0):
+        """
+        Args:
+            target_rate: Target frame diproses per detik
+            cpu_budget: Fraksi waktu (0..1) maksimum untuk proses recognition
+            smoothing: Bobot EWMA untuk sample latency baru
+            window: Jendela (detik) untuk menghitung rate efektif
+        """
+        self.target_rate = target_rate
+        self.cpu_budget = cpu_budget
+        self.smoothing = smoothing
+        self.window = window
+
+        self.avg_cost = 0.0  # Detik per frame yang diproses (EWMA)
+        self.last_processed = None
+        self.processed_times = deque()
+        self.frames_seen = 0
+        self.frames_processed = 0
+        self.lock = threading.Lock()
+
+    def interval(self) -> float:
+        """Jeda minimum (detik) antar frame yang diproses"""
+        base = 1.0 / self.target_rate if self.target_rate > 0 else 0.0
+        budget = self.avg_cost / self.cpu_budget if self.cpu_budget > 0 else 0.0
+        return max(base, budget)
+
+    def should_process(self, now: Optional[float] = None) -> bool:
+        """Panggil sekali per frame; True jika frame ini harus diproses"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self.frames_seen += 1
+            if self.last_processed is not None and now - self.last_processed < self.interval():
+                return False
+            self.last_processed = now
+            self.frames_processed += 1
+            self.processed_times.append(now)
+            return True
+
+    def record(self, cost: float):
+        """Laporkan waktu deteksi + encoding (detik) frame yang baru diproses"""
+        with self.lock:
+            if self.avg_cost == 0.0:
+                self.avg_cost = cost
+            else:
+                self.avg_cost += self.smoothing * (cost - self.avg_cost)
+
+    def effective_rate(self, now: Optional[float] = None) -> float:
+        """Frame yang benar-benar diproses per detik (dalam `window` terakhir)"""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            while self.processed_times and now - self.processed_times[0] > self.window:
+                self.processed_times.popleft()
+            return len(self.processed_times) / self.window
+
+    def snapshot(self) -> dict:
+        """Statistik untuk /stats"""
+        rate = self.effective_rate()
+        with self.lock:
+            return {
+                "processing_rate": round(rate, 2),
+                "target_rate": self.target_rate,
+                "cpu_budget": self.cpu_budget,
+                "avg_cost_ms": round(self.avg_cost * 1000, 1),
+                "interval_ms": round(self.interval() * 1000, 1),
+                "frames_seen": self.frames_seen,
+                "frames_processed": self.frames_processed,
+            }
@@ -0,0 +1,143 @@
+"""
+=============================================================
+Approximate Nearest-Neighbour Index (IVF, NumPy only)
+=============================================================
+Index untuk gallery besar (puluhan ribu karyawan). Encoding dibagi
+ke beberapa cluster (inverted file / IVF) dengan k-means. Saat
+search, query hanya dibandingkan dengan isi n_probe cluster yang
+centroid-nya paling dekat.
+
+Knob recall vs latency:
+    n_probe kecil  → lebih cepat, recall bisa turun
+    n_probe besar  → lebih lambat, recall mendekati exact
+    n_probe = n_lists → sama dengan brute-force
+
+Penggunaan:
+    from ann_index import IVFIndex, evaluate_recall
+
+    gallery.index = IVFIndex(gallery, n_probe=8)
+    print(evaluate_recall(gallery, gallery.index))
+"""
+
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from face_gallery import FaceGallery, kmeans, pairwise_distances
+
+# Maksimum sample per cluster untuk training k-means
+TRAIN_SAMPLES_PER_LIST = 64
+
+
+class IVFIndex:
+    """
+    Inverted-file index: k-means coarse quantizer + scan n_probe list
+    """
+
+    def __init__(self, gallery: FaceGallery, n_lists: Optional[int] = None, n_probe: int = 8, seed: int = 0):
+        """
+        Args:
+            gallery: FaceGallery sumber
+            n_lists: Jumlah cluster (default: sqrt(N))
+            n_probe: Jumlah cluster yang di-scan per query
+            seed: Seed untuk sampling data training k-means
+        """
+        self.gallery = gallery
+        n = len(gallery)
+        self.n_lists = max(1, min(n_lists or int(np.sqrt(n)), max(n, 1)))
+        self.n_probe = n_probe
+
+        if n == 0:
+            self.centroids = np.empty((0, gallery.matrix.shape[1]), dtype=np.float32)
+            self.centroid_sq = np.empty(0, dtype=np.float32)
+            self.row_ids = np.empty(0, dtype=np.intp)
+            self.matrix = gallery.matrix
+            self.sq_norms = gallery.sq_norms
+            self.offsets = np.zeros(1, dtype=np.intp)
+            return
+
+        # Training k-means di sample supaya build tetap cepat di gallery besar
+        rng = np.random.default_rng(seed)
+        max_train = self.n_lists * TRAIN_SAMPLES_PER_LIST
+        train = gallery.matrix
+        if n > max_train:
+            train = gallery.matrix[rng.choice(n, max_train, replace=False)]
+        _, centroids = kmeans(train, self.n_lists)
+        self.centroids = np.ascontiguousarray(centroids, dtype=np.float32)
+        self.centroid_sq = np.einsum('ij,ij->i', self.centroids, self.centroids)
+
+        # Assign semua encoding → list, simpan kontigu per list
+        labels = np.argmin(pairwise_distances(gallery.matrix, self.centroids, self.centroid_sq), axis=1)
+        order = np.argsort(labels, kind='stable')
+        self.row_ids = order
+        self.matrix = np.ascontiguousarray(gallery.matrix[order])
+        self.sq_norms = gallery.sq_norms[order]
+        self.offsets = np.searchsorted(labels[order], np.arange(len(self.centroids) + 1))
+
+    def search(self, queries, tolerance: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cari (perkiraan) encoding terdekat untuk setiap query
+
+        Returns:
+            (indices ke gallery asli, distances)
+        """
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, self.gallery.matrix.shape[1])
+        indices = np.full(len(q), -1, dtype=np.intp)
+        distances = np.full(len(q), np.inf, dtype=np.float32)
+        if len(self.row_ids) == 0:
+            return indices, distances
+
+        n_probe = max(1, min(self.n_probe, len(self.centroids)))
+        dc = pairwise_distances(q, self.centroids, self.centroid_sq)
+        probes = np.argpartition(dc, n_probe - 1, axis=1)[:, :n_probe]
+
+        for i in range(len(q)):
+            rows = np.concatenate([np.arange(self.offsets[c], self.offsets[c + 1]) for c in probes[i]])
+            if len(rows) == 0:
+                continue
+            d = pairwise_distances(q[i:i + 1], self.matrix[rows], self.sq_norms[rows])[0]
+            j = int(np.argmin(d))
+            indices[i] = self.row_ids[rows[j]]
+            distances[i] = d[j]
+        return indices, distances
+
+
+def evaluate_recall(gallery: FaceGallery, index, n_queries: int = 200, noise: float = 0.3,
+                    seed: int = 0) -> dict:
+    """
+    Ukur recall@1 index terhadap exact search pada dataset saat ini
+
+    Query dibuat dari encoding gallery yang diberi noise acak dengan
+    panjang rata-rata `noise` (kira-kira jarak antar foto orang yang sama).
+
+    Returns:
+        Dict {recall, queries, exact_ms, index_ms} — latency per query
+    """
+    n = len(gallery)
+    if n == 0:
+        return {"recall": 1.0, "queries": 0, "exact_ms": 0.0, "index_ms": 0.0}
+
+    rng = np.random.default_rng(seed)
+    picks = rng.integers(0, n, size=min(n_queries, n))
+    dim = gallery.matrix.shape[1]
+    queries = gallery.matrix[picks] + rng.standard_normal((len(picks), dim)).astype(np.float32) * (noise / np.sqrt(dim))
+
+    t0 = time.perf_counter()
+    exact_idx = np.concatenate([gallery.nearest(queries[i:i + 1])[0] for i in range(len(queries))])
+    t1 = time.perf_counter()
+    approx_idx = np.concatenate([index.search(queries[i:i + 1], np.inf)[0] for i in range(len(queries))])
+    t2 = time.perf_counter()
+
+    # Hitung benar jika index menemukan baris yang sama, atau baris lain
+    # dengan jarak yang sama (duplikat encoding)
+    exact_d = gallery.distances(queries)
+    rows = np.arange(len(queries))
+    hits = np.isclose(exact_d[rows, approx_idx], exact_d[rows, exact_idx], atol=1e-6) & (approx_idx >= 0)
+
+    return {
+        "recall": float(hits.mean()),
+        "queries": len(queries),
+        "exact_ms": (t1 - t0) * 1000 / len(queries),
+        "index_ms": (t2 - t1) * 1000 / len(queries),
+    }
@@ -8,35 +8,60 @@
 #       pintu=BUKA  → LED ESP32 ON
 #       tunggu 10 detik
 #       pintu=TUTUP → LED ESP32 OFF
-# Broker MQTT: broker.hivemq.com (public)
-# Topik MQTT : teguhdayanto/esp32/pintu
+# Broker MQTT: broker.hivemq.com (public), bisa diganti lewat env MQTT_BROKER
+# Topik MQTT : fc/pintu (perintah), fc/pintu/status (status dari ESP32)
 # =============================================================
 
 from flask import Flask, render_template, Response, request
 import cv2
 import face_recognition
 import os
-import requests
 import time
 import json
-import paho.mqtt.client as mqtt
+from mqtt_door import MQTTDoorClient
+from encoding_cache import EncodingCache, cache_path
+from camera_stream import CameraStream
+from frame_source import source_options
+from attendance_writer import AttendanceWriter
+from presence_aggregator import PresenceAggregator
+from door_scheduler import DoorScheduler
+from event_stream import EventStream
 
 # -------------------------------------------------------------
 # KONFIGURASI UTAMA
 # -------------------------------------------------------------
 app = Flask(__name__)
-camera = cv2.VideoCapture(0)
+# Satu capture thread untuk semua client /video_feed. Source: camera 0, atau
+# --source file video / folder gambar (--source-fps, --loop; lihat frame_source.py)
+SOURCE = source_options()
+camera = CameraStream(SOURCE.source, fps=SOURCE.fps, loop=SOURCE.loop)
+camera.start()
 
 DATASET_PATH = "../dataset"        # Folder dataset wajah
-MQTT_BROKER = "broker.hivemq.com"  # Broker MQTT publik
-MQTT_PORT = 1883
+MQTT_BROKER = os.environ.get("MQTT_BROKER", "broker.hivemq.com")  # Broker publik, atau mosquitto lokal
+MQTT_PORT = int(os.environ.get("MQTT_PORT", 1883))
 MQTT_TOPIC = "fc/pintu"
+MQTT_STATUS_TOPIC = "fc/pintu/status"  # Status yang dipublish ESP32 (harus sama dengan firmware)
+MQTT_QOS = 1                       # Tunggu PUBACK broker untuk setiap perintah
+ENCODING_CACHE_PATH = cache_path(DATASET_PATH)  # face_encodings() default: hog, 1 jitter
+PRESENSI_URL = "http://localhost/facereconigtion/php/presensi.php"
+ATTENDANCE_SPOOL_PATH = "attendance_spool.db"  # Spool SQLite: presensi aman saat server PHP/MySQL mati
+PRESENCE_GAP = 30.0                # Detik tidak terlihat sebelum kunjungan selesai
+PRESENCE_MIN_DWELL = 1.0           # Detik terlihat sebelum event "datang" dicatat
+PRESENCE_DEPARTURES = True         # Kirim juga event "pulang" (butuh kolom kehadiran.jenis)
+DOOR_OPEN_SECONDS = 10             # Lama pintu terbuka per /buka_pintu
+FIRMWARE_AUTO_CLOSE = 10.2         # Firmware MQTT menutup sendiri setelah delay(10000) → kirim BUKA ulang saat diperpanjang
 
 # -------------------------------------------------------------
 # MUAT SEMUA DATASET WAJAH YANG DIKENAL
 # -------------------------------------------------------------
 known_face_encodings = []
 known_face_names = []
+seen_paths = []
+
+# Cache encoding di disk → restart hanya encode gambar baru/berubah
+encoding_cache = EncodingCache(ENCODING_CACHE_PATH)
+encoding_cache.load()
 
 for person_name in os.listdir(DATASET_PATH):
     folder = os.path.join(DATASET_PATH, person_name)
@@ -44,13 +69,31 @@ for person_name in os.listdir(DATASET_PATH):
         continue
     for file in os.listdir(folder):
         path = os.path.join(folder, file)
-        image = face_recognition.load_image_file(path)
-        encodings = face_recognition.face_encodings(image)
-        if encodings:
-            known_face_encodings.append(encodings[0])
+        seen_paths.append(path)
+        hit, encoding = encoding_cache.lookup(path)
+        if not hit:
+            image = face_recognition.load_image_file(path)
+            encodings = face_recognition.face_encodings(image)
+            encoding = encodings[0] if encodings else None
+            encoding_cache.store(path, encoding)
+        if encoding is not None:
+            known_face_encodings.append(encoding)
             known_face_names.append(person_name)
 
-last_seen = {}
+encoding_cache.prune(seen_paths)
+encoding_cache.save()
+print(f"✅ Loaded {len(known_face_encodings)} face encodings "
+      f"(cache: {encoding_cache.hits} hits, {encoding_cache.misses} misses, "
+      f"{encoding_cache.evictions} evicted)")
+
+# Presensi dikirim lewat antrian + worker thread (HTTP keep-alive)
+attendance_writer = AttendanceWriter(PRESENSI_URL, spool_path=ATTENDANCE_SPOOL_PATH)
+attendance_writer.start()
+
+# Satu event datang + satu event pulang per orang per kunjungan
+presence = PresenceAggregator(on_event=lambda nama, jenis, ts: attendance_writer.submit(nama, ts, jenis),
+                              gap=PRESENCE_GAP, min_dwell=PRESENCE_MIN_DWELL,
+                              emit_departure=PRESENCE_DEPARTURES)
 last_name = "-"
 last_time = time.strftime("%Y-%m-%d %H:%M:%S")
 last_detected_timestamp = time.time()
@@ -61,10 +104,14 @@ last_detected_timestamp = time.time()
 def generate_frames():
     global last_name, last_time, last_detected_timestamp
 
+    frame_id = None
     while True:
-        success, frame = camera.read()
-        if not success:
-            break
+        frame_id, frame = camera.read(last_id=frame_id)
+        if frame is None:
+            if not camera.running:
+                break  # Capture thread berhenti (camera lepas / file habis)
+            continue  # Timeout (frame pertama lambat, FPS rendah) → tunggu lagi
+        frame = frame.copy()
 
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         face_locations = face_recognition.face_locations(rgb_frame)
@@ -73,6 +120,7 @@ def generate_frames():
         if face_encodings:
             last_detected_timestamp = time.time()
 
+        frame_names = []
         for face_encoding, face_location in zip(face_encodings, face_locations):
             matches = face_recognition.compare_faces(known_face_encodings, face_encoding, tolerance=0.45)
             name = "Tidak Dikenal"
@@ -80,13 +128,7 @@ def generate_frames():
                 match_index = matches.index(True)
                 name = known_face_names[match_index]
 
-            now = time.time()
-            if name not in last_seen or (now - last_seen[name]) > 5:
-                try:
-                    requests.post("http://localhost/facereconigtion/php/presensi.php", data={"nama": name})
-                    last_seen[name] = now
-                except:
-                    pass
+            frame_names.append(name)
 
             top, right, bottom, left = face_location
             color = (0, 255, 0) if name != "Tidak Dikenal" else (0, 0, 255)
@@ -96,6 +138,11 @@ def generate_frames():
             last_name = name
             last_time = time.strftime("%Y-%m-%d %H:%M:%S")
 
+        # Presensi per kunjungan (bukan per frame), dikirim di background.
+        # Wajah "Tidak Dikenal" tidak dicatat di tabel kehadiran
+        presence.observe([name for name in frame_names if name != "Tidak Dikenal"])
+        presence.sweep()
+
         # Reset nama jika tidak ada wajah selama 5 detik
         if not face_encodings and time.time() - last_detected_timestamp > 5:
             last_name = "-"
@@ -125,37 +172,68 @@ def terakhir():
 # -------------------------------------------------------------
 # ROUTE UNTUK KIRIM PERINTAH KE ESP32 VIA MQTT
 # -------------------------------------------------------------
-@app.route('/buka_pintu', methods=['POST'])
-def buka_pintu():
-    try:
-        client = mqtt.Client()
-        client.connect(MQTT_BROKER, MQTT_PORT, 60)
-        print(f"✅ Terhubung ke broker {MQTT_BROKER}:{MQTT_PORT}")
+# Satu koneksi MQTT persisten (loop_start + reconnect otomatis) untuk semua request
+mqtt_door = MQTTDoorClient(MQTT_BROKER, MQTT_PORT, MQTT_TOPIC,
+                           status_topic=MQTT_STATUS_TOPIC, qos=MQTT_QOS)
+mqtt_door.start()
 
-        # 1️⃣ Kirim status "pintu=BUKA"
-        client.publish(MQTT_TOPIC, "pintu=BUKA")
-        print(f"📡 MQTT publish: pintu=BUKA → topik {MQTT_TOPIC}")
+def publish_door_command(command):
+    """Kirim satu perintah pintu lewat MQTT (dipakai oleh door_scheduler)"""
+    if not mqtt_door.publish(command):
+        raise RuntimeError(mqtt_door.last_error)
+    return True
 
-        # 2️⃣ Tunggu 10 detik (pintu terbuka)
-        time.sleep(10)
+# Buka → return langsung dengan job ID, "pintu=TUTUP" dijadwalkan di timer wheel
+door_scheduler = DoorScheduler(publish_door_command, open_duration=DOOR_OPEN_SECONDS,
+                               refresh_interval=FIRMWARE_AUTO_CLOSE)
 
-        # 3️⃣ Kirim status "pintu=TUTUP"
-        client.publish(MQTT_TOPIC, "pintu=TUTUP")
-        print(f"📡 MQTT publish: pintu=TUTUP → topik {MQTT_TOPIC}")
-
-        client.disconnect()
+@app.route('/buka_pintu', methods=['POST'])
+def buka_pintu():
+    job = door_scheduler.open()
 
-        return json.dumps({
-            "status": "OK",
-            "pesan": "pintu dibuka selama 10 detik, lalu ditutup otomatis."
-        })
-    except Exception as e:
-        print(f"❌ Gagal MQTT: {e}")
+    if job["status"] == "error":
+        print(f"❌ Gagal MQTT: {job['error']}")
         return json.dumps({
             "status": "ERROR",
-            "pesan": f"Gagal mengirim MQTT: {e}"
+            "pesan": f"Gagal mengirim MQTT: {job['error']}",
+            "job": job
         })
 
+    pesan = f"pintu dibuka selama {DOOR_OPEN_SECONDS} detik, lalu ditutup otomatis."
+    if job["extended"]:
+        pesan = f"pintu masih terbuka, diperpanjang {DOOR_OPEN_SECONDS} detik."
+    return json.dumps({
+        "status": "OK",
+        "pesan": pesan,
+        "job_id": job["job_id"],
+        "job": job
+    })
+
+@app.route('/mqtt_status')
+def mqtt_status():
+    return json.dumps(mqtt_door.snapshot())
+
+@app.route('/door_jobs/<job_id>')
+def door_job_status(job_id):
+    job = door_scheduler.job(job_id)
+    if job is None:
+        return json.dumps({"status": "ERROR", "pesan": f"Job {job_id} tidak ditemukan"}), 404
+    return json.dumps(job)
+
+# -------------------------------------------------------------
+# PUSH EVENTS (SSE) — pengganti polling /terakhir & status dari dashboard
+# -------------------------------------------------------------
+events = EventStream()
+events.watch("recognition", lambda: {"nama": last_name, "waktu": last_time}, key=lambda d: d["nama"])
+events.watch("door", lambda: {**door_scheduler.state(), "esp32": mqtt_door.door_state})
+events.watch("link", lambda: {"connected": mqtt_door.connected, "port": f"{MQTT_BROKER}:{MQTT_PORT}",
+                              "device_online": mqtt_door.device_online})
+
+@app.route('/events')
+def events_feed():
+    return Response(events.stream(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # -------------------------------------------------------------
 # MAIN
 # -------------------------------------------------------------
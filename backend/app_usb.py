@@ -15,11 +15,10 @@ from flask import Flask, render_template, Response, request, jsonify
 import cv2
 import face_recognition
 import os
-import requests
 import time
 import json
 import serial
-from threading import Thread
+from threading import Lock, Thread
 
 # Coba import library serial kita (jika ada)
 try:
@@ -29,21 +28,46 @@ except ImportError:
     USE_CUSTOM_SERIAL = False
     print("⚠️  esp32_serial tidak ditemukan, menggunakan standard pyserial")
 
+from encoding_cache import EncodingCache, cache_path
+from camera_stream import CameraStream
+from frame_source import source_options
+from attendance_writer import AttendanceWriter
+from presence_aggregator import PresenceAggregator
+from door_scheduler import DoorScheduler
+from serial_discovery import resolve_port
+from event_stream import EventStream
+
 # ============================================================
 # KONFIGURASI UTAMA
 # ============================================================
 app = Flask(__name__)
-camera = cv2.VideoCapture(0)
+# Satu capture thread untuk semua client /video_feed. Source: camera 0, atau
+# --source file video / folder gambar (--source-fps, --loop; lihat frame_source.py)
+SOURCE = source_options()
+camera = CameraStream(SOURCE.source, fps=SOURCE.fps, loop=SOURCE.loop)
+camera.start()
 
 DATASET_PATH = "../dataset"        # Folder dataset wajah
-SERIAL_PORT = "COM3"               # COM port ESP32 (ubah sesuai port Anda)
+SERIAL_PORT = "auto"               # "auto" = cari port ESP32 otomatis, atau isi mis. "COM3"
 SERIAL_BAUDRATE = 115200           # Baud rate
+SERIAL_FAST_CONNECT = True         # Tanpa reset ESP32 (DTR/RTS), konfirmasi via handshake status
+DOOR_DAEMON_SOCKET = None          # Path socket door_daemon.py (port dipegang daemon → bisa multi-proses)
+ENCODING_CACHE_PATH = cache_path(DATASET_PATH)  # face_encodings() default: hog, 1 jitter
+PRESENSI_URL = "http://localhost/facereconigtion/php/presensi.php"
+ATTENDANCE_SPOOL_PATH = "attendance_spool.db"  # Spool SQLite: presensi aman saat server PHP/MySQL mati
+PRESENCE_GAP = 30.0                # Detik tidak terlihat sebelum kunjungan selesai
+PRESENCE_MIN_DWELL = 1.0           # Detik terlihat sebelum event "datang" dicatat
+PRESENCE_DEPARTURES = True         # Kirim juga event "pulang" (butuh kolom kehadiran.jenis)
+DOOR_OPEN_SECONDS = 10             # Lama pintu terbuka per /buka_pintu
+FIRMWARE_AUTO_CLOSE = 10.2         # Firmware menutup sendiri setelah 10 detik → kirim BUKA ulang saat diperpanjang
 
 # ============================================================
 # GLOBAL VARIABLES
 # ============================================================
 esp32_controller = None
 serial_connected = False
+serial_port = None                 # Session pyserial persisten (fallback tanpa esp32_serial)
+serial_lock = Lock()               # Satu perintah serial pada satu waktu
 
 # ============================================================
 # MUAT SEMUA DATASET WAJAH YANG DIKENAL
@@ -54,6 +78,9 @@ known_face_names = []
 try:
     if os.path.exists(DATASET_PATH):
         print(f"📁 Loading dataset dari {DATASET_PATH}...")
+        encoding_cache = EncodingCache(ENCODING_CACHE_PATH)
+        encoding_cache.load()
+        seen_paths = []
         for person_name in os.listdir(DATASET_PATH):
             folder = os.path.join(DATASET_PATH, person_name)
             if not os.path.isdir(folder):
@@ -62,18 +89,27 @@ try:
             count = 0
             for file in os.listdir(folder):
                 path = os.path.join(folder, file)
+                seen_paths.append(path)
                 try:
-                    image = face_recognition.load_image_file(path)
-                    encodings = face_recognition.face_encodings(image)
-                    if encodings:
-                        known_face_encodings.append(encodings[0])
+                    hit, encoding = encoding_cache.lookup(path)
+                    if not hit:
+                        image = face_recognition.load_image_file(path)
+                        encodings = face_recognition.face_encodings(image)
+                        encoding = encodings[0] if encodings else None
+                        encoding_cache.store(path, encoding)
+                    if encoding is not None:
+                        known_face_encodings.append(encoding)
                         known_face_names.append(person_name)
                         count += 1
                 except Exception as e:
                     print(f"⚠️  Gagal load {path}: {e}")
                     continue
             print(f"({count} images)")
+        encoding_cache.prune(seen_paths)
+        encoding_cache.save()
         print(f"✅ Loaded {len(known_face_encodings)} face encodings dari {len(set(known_face_names))} orang")
+        print(f"   Cache: {encoding_cache.hits} hits, {encoding_cache.misses} misses, "
+              f"{encoding_cache.evictions} evicted")
     else:
         print(f"⚠️  Dataset folder tidak ditemukan: {DATASET_PATH}")
         print(f"   Aplikasi akan berjalan tanpa face recognition")
@@ -82,7 +118,14 @@ except KeyboardInterrupt:
 except Exception as e:
     print(f"⚠️  Error loading dataset: {e}")
 
-last_seen = {}
+# Presensi dikirim lewat antrian + worker thread (HTTP keep-alive)
+attendance_writer = AttendanceWriter(PRESENSI_URL, spool_path=ATTENDANCE_SPOOL_PATH)
+attendance_writer.start()
+
+# Satu event datang + satu event pulang per orang per kunjungan
+presence = PresenceAggregator(on_event=lambda nama, jenis, ts: attendance_writer.submit(nama, ts, jenis),
+                              gap=PRESENCE_GAP, min_dwell=PRESENCE_MIN_DWELL,
+                              emit_departure=PRESENCE_DEPARTURES)
 last_name = "-"
 last_time = time.strftime("%Y-%m-%d %H:%M:%S")
 last_detected_timestamp = time.time()
@@ -90,21 +133,59 @@ last_detected_timestamp = time.time()
 # ============================================================
 # INISIALISASI SERIAL CONNECTION
 # ============================================================
+def _ensure_serial_port():
+    """Buka port pyserial jika belum terbuka (panggil dengan serial_lock)"""
+    global serial_port
+    if serial_port is None or not serial_port.is_open:
+        serial_port = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2, write_timeout=2)
+        time.sleep(2)  # Buka port → ESP32 reset (DTR), tunggu boot SEKALI saja
+    return serial_port
+
+def open_serial_session():
+    """Buka session pyserial persisten (dipakai bersama oleh semua route)"""
+    with serial_lock:
+        return _ensure_serial_port()
+
+def serial_send(command):
+    """Kirim perintah lewat session pyserial yang sama, tanpa buka-tutup port"""
+    global serial_port
+    with serial_lock:
+        port = _ensure_serial_port()
+        try:
+            port.write(f"{command}\n".encode())
+        except Exception:
+            # Port putus → buang handle, perintah berikutnya membuka ulang
+            port.close()
+            serial_port = None
+            raise
+    return True
+
 def init_serial_connection():
     """Inisialisasi koneksi serial ke ESP32"""
-    global esp32_controller, serial_connected
+    global esp32_controller, serial_connected, SERIAL_PORT
+    
+    if DOOR_DAEMON_SOCKET:
+        # Port serial dipegang door_daemon.py, proses ini cukup jadi client
+        from door_daemon import DoorClient  # Unix socket: tidak di-import di Windows
+        esp32_controller = DoorClient(DOOR_DAEMON_SOCKET)
+        serial_connected = esp32_controller.connected
+        print(f"{'✅' if serial_connected else '⚠️ '} Door daemon {DOOR_DAEMON_SOCKET}")
+        return serial_connected
+    
+    # Probe port cache dulu, lalu semua port kandidat paralel
+    SERIAL_PORT = resolve_port(SERIAL_PORT, SERIAL_BAUDRATE)
     
     try:
         if USE_CUSTOM_SERIAL:
-            esp32_controller = ESP32SerialController(SERIAL_PORT, SERIAL_BAUDRATE)
+            esp32_controller = ESP32SerialController(SERIAL_PORT, SERIAL_BAUDRATE,
+                                                     fast_connect=SERIAL_FAST_CONNECT)
             if esp32_controller.open():
                 serial_connected = True
                 print(f"✅ Serial {SERIAL_PORT} terhubung!")
                 return True
         else:
             # Gunakan pyserial langsung
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            time.sleep(2)
+            open_serial_session()
             serial_connected = True
             print(f"✅ Serial {SERIAL_PORT} terhubung!")
             return True
@@ -120,10 +201,14 @@ def init_serial_connection():
 def generate_frames():
     global last_name, last_time, last_detected_timestamp
 
+    frame_id = None
     while True:
-        success, frame = camera.read()
-        if not success:
-            break
+        frame_id, frame = camera.read(last_id=frame_id)
+        if frame is None:
+            if not camera.running:
+                break  # Capture thread berhenti (camera lepas / file habis)
+            continue  # Timeout (frame pertama lambat, FPS rendah) → tunggu lagi
+        frame = frame.copy()
 
         rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
         face_locations = face_recognition.face_locations(rgb_frame)
@@ -132,6 +217,7 @@ def generate_frames():
         if face_encodings:
             last_detected_timestamp = time.time()
 
+        frame_names = []
         for face_encoding, face_location in zip(face_encodings, face_locations):
             matches = face_recognition.compare_faces(known_face_encodings, face_encoding, tolerance=0.45)
             name = "Tidak Dikenal"
@@ -139,13 +225,7 @@ def generate_frames():
                 match_index = matches.index(True)
                 name = known_face_names[match_index]
 
-            now = time.time()
-            if name not in last_seen or (now - last_seen[name]) > 5:
-                try:
-                    requests.post("http://localhost/facereconigtion/php/presensi.php", data={"nama": name})
-                    last_seen[name] = now
-                except:
-                    pass
+            frame_names.append(name)
 
             top, right, bottom, left = face_location
             color = (0, 255, 0) if name != "Tidak Dikenal" else (0, 0, 255)
@@ -155,6 +235,11 @@ def generate_frames():
             last_name = name
             last_time = time.strftime("%Y-%m-%d %H:%M:%S")
 
+        # Presensi per kunjungan (bukan per frame), dikirim di background.
+        # Wajah "Tidak Dikenal" tidak dicatat di tabel kehadiran
+        presence.observe([name for name in frame_names if name != "Tidak Dikenal"])
+        presence.sweep()
+
         # Reset nama jika tidak ada wajah selama 5 detik
         if not face_encodings and time.time() - last_detected_timestamp > 5:
             last_name = "-"
@@ -184,85 +269,78 @@ def terakhir():
 # ============================================================
 # ROUTE UNTUK KONTROL PINTU VIA USB SERIAL
 # ============================================================
+def send_door_command(command):
+    """Kirim satu perintah pintu ke ESP32 (dipakai oleh door_scheduler)"""
+    if esp32_controller:
+        return esp32_controller.send_command(command)
+
+    return serial_send(command)
+
+# Buka → return langsung dengan job ID, tutup dijadwalkan di timer wheel
+door_scheduler = DoorScheduler(send_door_command, open_duration=DOOR_OPEN_SECONDS,
+                               refresh_interval=FIRMWARE_AUTO_CLOSE)
+
 @app.route('/buka_pintu', methods=['POST'])
 def buka_pintu():
     global serial_connected
-    
+
     if not serial_connected:
         return jsonify({
             "status": "ERROR",
             "pesan": f"ESP32 tidak terhubung via serial {SERIAL_PORT}. Cek USB connection!"
         }), 500
-    
-    try:
-        print("🔓 Membuka pintu...")
-        
-        if USE_CUSTOM_SERIAL and esp32_controller:
-            # Gunakan library custom
-            esp32_controller.send_command("pintu=BUKA")
-            
-            # Baca response
-            responses = esp32_controller.read_response(10)
-            
-            return jsonify({
-                "status": "OK",
-                "pesan": "Pintu dibuka selama 10 detik, lalu ditutup otomatis.",
-                "response": responses
-            })
-        else:
-            # Gunakan pyserial langsung
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"pintu=BUKA\n")
-            time.sleep(10.5)  # Tunggu 10 detik + buffer
-            ser.close()
-            
-            return jsonify({
-                "status": "OK",
-                "pesan": "Pintu dibuka selama 10 detik, lalu ditutup otomatis."
-            })
-            
-    except Exception as e:
-        print(f"❌ Error: {e}")
+
+    print("🔓 Membuka pintu...")
+    job = door_scheduler.open()
+
+    if job["status"] == "error":
+        print(f"❌ Error: {job['error']}")
         serial_connected = False
         return jsonify({
             "status": "ERROR",
-            "pesan": f"Gagal kontrol pintu: {str(e)}"
+            "pesan": f"Gagal kontrol pintu: {job['error']}",
+            "job": job
         }), 500
 
+    pesan = f"Pintu dibuka selama {DOOR_OPEN_SECONDS} detik, lalu ditutup otomatis."
+    if job["extended"]:
+        pesan = f"Pintu masih terbuka, diperpanjang {DOOR_OPEN_SECONDS} detik."
+    return jsonify({
+        "status": "OK",
+        "pesan": pesan,
+        "job_id": job["job_id"],
+        "job": job
+    })
+
+@app.route('/door_jobs/<job_id>', methods=['GET'])
+def door_job_status(job_id):
+    """Status job buka pintu (sisa waktu, progress, error)"""
+    job = door_scheduler.job(job_id)
+    if job is None:
+        return jsonify({"status": "ERROR", "pesan": f"Job {job_id} tidak ditemukan"}), 404
+    return jsonify(job)
+
 @app.route('/tutup_pintu', methods=['POST'])
 def tutup_pintu():
     """Tutup pintu immediate (manual)"""
     global serial_connected
-    
+
     if not serial_connected:
         return jsonify({
             "status": "ERROR",
             "pesan": f"ESP32 tidak terhubung"
         }), 500
-    
+
     try:
         print("🔒 Menutup pintu...")
-        
-        if USE_CUSTOM_SERIAL and esp32_controller:
-            esp32_controller.send_command("pintu=TUTUP")
-            responses = esp32_controller.read_response(3)
-            
-            return jsonify({
-                "status": "OK",
-                "pesan": "Pintu ditutup",
-                "response": responses
-            })
-        else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"pintu=TUTUP\n")
-            time.sleep(1)
-            ser.close()
-            
-            return jsonify({
-                "status": "OK",
-                "pesan": "Pintu ditutup"
-            })
-            
+        job = door_scheduler.close()
+
+        return jsonify({
+            "status": "OK",
+            "pesan": "Pintu ditutup",
+            "job": job
+        })
+
     except Exception as e:
         serial_connected = False
         return jsonify({
@@ -286,12 +364,10 @@ def test_led():
         return jsonify({"status": "ERROR", "pesan": "ESP32 tidak terhubung"}), 500
     
     try:
-        if USE_CUSTOM_SERIAL and esp32_controller:
+        if esp32_controller:
             esp32_controller.send_command("test=LED")
         else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"test=LED\n")
-            ser.close()
+            serial_send("test=LED")
         
         return jsonify({"status": "OK", "pesan": "Test LED sent"})
     except Exception as e:
@@ -304,17 +380,28 @@ def test_relay():
         return jsonify({"status": "ERROR", "pesan": "ESP32 tidak terhubung"}), 500
     
     try:
-        if USE_CUSTOM_SERIAL and esp32_controller:
+        if esp32_controller:
             esp32_controller.send_command("test=RELAY")
         else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"test=RELAY\n")
-            ser.close()
+            serial_send("test=RELAY")
         
         return jsonify({"status": "OK", "pesan": "Test RELAY sent"})
     except Exception as e:
         return jsonify({"status": "ERROR", "pesan": str(e)}), 500
 
+# ============================================================
+# PUSH EVENTS (SSE) — pengganti polling /terakhir & status dari dashboard
+# ============================================================
+events = EventStream()
+events.watch("recognition", lambda: {"nama": last_name, "waktu": last_time}, key=lambda d: d["nama"])
+events.watch("door", door_scheduler.state)
+events.watch("link", lambda: {"connected": serial_connected, "port": SERIAL_PORT})
+
+@app.route('/events')
+def events_feed():
+    return Response(events.stream(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # ============================================================
 # MAIN
 # ============================================================
@@ -19,11 +19,10 @@ from flask import Flask, render_template, Response, request, jsonify
 import cv2
 import face_recognition
 import os
-import requests
 import time
 import json
 import numpy as np
-from threading import Thread
+from threading import Lock, Thread
 
 # Coba import library serial kita
 try:
@@ -34,39 +33,116 @@ except ImportError:
     print("⚠️  esp32_serial tidak ditemukan, menggunakan standard pyserial")
     import serial
 
+from encoding_cache import EncodingCache, cache_path
+from parallel_encoder import default_workers, encode_images
+from face_gallery import FaceGallery, PrototypeIndex
+from camera_stream import CameraStream
+from frame_source import describe_source, source_options
+from mjpeg_hub import MJPEGHub, multipart_chunk
+from face_tracker import FaceTracker
+from adaptive_skip import AdaptiveFrameSkipper
+from motion_gate import MotionGate
+from attendance_writer import AttendanceWriter
+from presence_aggregator import PresenceAggregator
+from door_scheduler import DoorScheduler
+from serial_discovery import port_finder, resolve_port
+from event_stream import EventStream
+from pipeline_metrics import PipelineMetrics
+from ann_index import IVFIndex, evaluate_recall
+
 # ============================================================
 # KONFIGURASI
 # ============================================================
 app = Flask(__name__)
 
-# Initialize camera later (in generate_frames) untuk avoid blocking
+# Initialize camera later (in generate_frames) untuk avoid blocking.
+# Satu capture thread dipakai bersama oleh semua client /video_feed
 camera = None
+camera_lock = Lock()
+# Camera, file video, atau folder gambar: --source / --source-fps / --loop (lihat frame_source.py)
+CAMERA_SOURCE, CAMERA_FPS, CAMERA_LOOP = source_options(default=0)
+
+# Pipeline recognition berjalan sekali, hasil JPEG dibagikan ke semua client
+video_hub = MJPEGHub()
+pipeline_thread = None
+pipeline_lock = Lock()
 
 DATASET_PATH = "../dataset"
-SERIAL_PORT = "COM3"
+SERIAL_PORT = "auto"  # "auto" = cari port ESP32 otomatis, atau isi mis. "COM3"
 SERIAL_BAUDRATE = 115200
+SERIAL_FAST_CONNECT = True  # Tanpa reset ESP32 (DTR/RTS), konfirmasi via handshake status
+DOOR_DAEMON_SOCKET = None  # Path socket door_daemon.py (port dipegang daemon → bisa multi-proses)
+SERIAL_MAX_BACKOFF = 30.0  # Jeda maksimum antar percobaan reconnect ESP32 (detik)
+PRESENSI_URL = "http://localhost/facereconigtion/php/presensi.php"
+DOOR_OPEN_SECONDS = 10  # Lama pintu terbuka per /buka_pintu
+FIRMWARE_AUTO_CLOSE = 10.2  # Firmware menutup sendiri setelah 10 detik → kirim BUKA ulang saat diperpanjang
+ATTENDANCE_SPOOL_PATH = "attendance_spool.db"  # Spool SQLite: presensi aman saat server PHP/MySQL mati
 
 # TUNING PARAMETERS
 FACE_TOLERANCE = 0.5  # 0.6 = lebih permisif, 0.4 = lebih ketat
 FACE_DETECTION_MODEL = "hog"  # "hog" (cepat) atau "cnn" (akurat tapi lambat)
 NUM_JITTERS = 1  # Berapa kali process face untuk accuracy (1=cepat, 2+=lebih akurat)
+MATCH_INDEX = "prototype"  # "exact" (brute-force), "prototype" (2 tahap, hasil tetap exact), "ivf" (approximate)
+PROTOTYPES_PER_PERSON = 2  # Jumlah prototype per orang untuk MATCH_INDEX="prototype"
+PROTOTYPE_TOP_K = 3  # Jumlah orang kandidat yang dicek ke semua encoding-nya
+IVF_LISTS = None  # Jumlah cluster untuk MATCH_INDEX="ivf" (None = sqrt(jumlah encoding))
+IVF_PROBE = 8  # Cluster yang di-scan per wajah: lebih besar = recall naik, latency naik
+TARGET_PROCESS_RATE = 5.0  # Target frame yang diproses recognition per detik
+CPU_BUDGET = 0.5  # Fraksi waktu maksimum untuk deteksi + encoding (0..1)
+MOTION_GATE = True  # Lewati deteksi wajah saat scene kosong/diam
+MOTION_THRESHOLD = 0.01  # Fraksi pixel berubah (0..1) agar dianggap ada gerakan
+MOTION_FORCE_INTERVAL = 60.0  # Deteksi penuh sesekali walau scene diam (detik, 0 = tidak pernah)
+PRESENCE_GAP = 30.0  # Detik tidak terlihat sebelum kunjungan selesai (event "pulang")
+PRESENCE_MIN_DWELL = 1.0  # Detik terlihat sebelum event "datang" dicatat
+PRESENCE_DEPARTURES = True  # Kirim juga event "pulang" (butuh kolom kehadiran.jenis, lihat database_setup.sql)
+REVERIFY_INTERVAL = 3.0  # Detik sebelum wajah yang sudah dikenal (tracked) di-encode ulang
+UNKNOWN_REVERIFY_INTERVAL = 1.0  # Detik sebelum wajah "Tidak Dikenal" di-encode ulang
+ENCODE_WORKERS = None  # Jumlah process untuk encoding dataset (None = jumlah core CPU)
+PIPELINE_METRICS_WINDOW = 1000  # Sample terakhir per tahap untuk p50/p95/p99 di /stats/pipeline
+
+# Cache encoding di disk (None = nonaktif, selalu encode ulang)
+ENCODING_CACHE_PATH = cache_path(DATASET_PATH, FACE_DETECTION_MODEL, NUM_JITTERS)
 
 # ============================================================
 # GLOBAL VARIABLES
 # ============================================================
 esp32_controller = None
 serial_connected = False
+serial_port = None                 # Session pyserial persisten (fallback tanpa esp32_serial)
+serial_lock = Lock()               # Satu perintah serial pada satu waktu
 
 # Dataset dan face encodings
 known_face_encodings = []
 known_face_names = []
 known_face_files = []  # Track file source untuk debugging
+face_gallery = FaceGallery()  # Matrix float32 untuk batched matching
 
-last_seen = {}
 last_name = "-"
 last_time = time.strftime("%Y-%m-%d %H:%M:%S")
 last_detected_timestamp = time.time()
 
+# Tracker wajah: encode ulang hanya untuk track baru / bergeser / re-verify
+face_tracker = FaceTracker(reverify_interval=REVERIFY_INTERVAL,
+                           unknown_reverify_interval=UNKNOWN_REVERIFY_INTERVAL)
+
+# Controller frame-skip: frekuensi proses mengikuti latency terukur
+frame_skipper = AdaptiveFrameSkipper(target_rate=TARGET_PROCESS_RATE, cpu_budget=CPU_BUDGET)
+
+# Motion gate: deteksi HOG/CNN hanya jika ada gerakan atau track aktif
+motion_gate = MotionGate(threshold=MOTION_THRESHOLD, force_interval=MOTION_FORCE_INTERVAL)
+
+# Latency per tahap generate_frames() → /stats/pipeline dan /metrics
+pipeline_metrics = PipelineMetrics(window=PIPELINE_METRICS_WINDOW)
+
+# Presensi dikirim lewat antrian + worker thread (HTTP keep-alive).
+# Dibuat di startup(): membuka spool SQLite dan mengirim ulang isinya
+attendance_writer = None
+
+# Satu event datang + satu event pulang per orang per kunjungan
+presence = PresenceAggregator(on_event=lambda nama, jenis, ts: attendance_writer.submit(nama, ts, jenis),
+                              gap=PRESENCE_GAP, min_dwell=PRESENCE_MIN_DWELL,
+                              emit_departure=PRESENCE_DEPARTURES)
+
 # Statistics
 stats = {
     "faces_detected": 0,
@@ -79,7 +155,7 @@ stats = {
 # ============================================================
 def load_dataset():
     """Load semua face encodings dari dataset folder"""
-    global known_face_encodings, known_face_names, known_face_files
+    global known_face_encodings, known_face_names, known_face_files, face_gallery
     
     print()
     print("=" * 60)
@@ -94,47 +170,74 @@ def load_dataset():
     total_files = 0
     total_loaded = 0
     
+    cache = None
+    if ENCODING_CACHE_PATH:
+        cache = EncodingCache(ENCODING_CACHE_PATH, model=FACE_DETECTION_MODEL, num_jitters=NUM_JITTERS)
+        cached = cache.load()
+        print(f"💾 Encoding cache: {cached} entries ({ENCODING_CACHE_PATH})")
+    
     try:
+        # 1) Scan dataset + cek cache
+        jobs = []  # (person_name, file, path, hit, encoding)
         for person_name in sorted(os.listdir(DATASET_PATH)):
             folder = os.path.join(DATASET_PATH, person_name)
             if not os.path.isdir(folder):
                 continue
             
-            person_count = 0
-            print(f"\n👤 Processing: {person_name}")
-            
-            for file in os.listdir(folder):
+            for file in sorted(os.listdir(folder)):
                 if not file.lower().endswith(('.jpg', '.jpeg', '.png')):
                     continue
                 
                 total_files += 1
                 path = os.path.join(folder, file)
-                
-                try:
-                    # Load image
-                    print(f"   Loading {file}...", end=" ", flush=True)
-                    image = face_recognition.load_image_file(path)
-                    
-                    # Extract face encodings
-                    face_locations = face_recognition.face_locations(image, model=FACE_DETECTION_MODEL)
-                    face_encodings = face_recognition.face_encodings(image, face_locations, num_jitters=NUM_JITTERS)
-                    
-                    if face_encodings:
-                        # Add first face encoding
-                        known_face_encodings.append(face_encodings[0])
-                        known_face_names.append(person_name)
-                        known_face_files.append(file)
-                        person_count += 1
-                        total_loaded += 1
-                        print("✅")
-                    else:
-                        print("⚠️  (no faces detected)")
-                        
-                except Exception as e:
-                    print(f"❌ ({str(e)[:30]})")
+                hit, encoding = cache.lookup(path) if cache else (False, None)
+                jobs.append((person_name, file, path, hit, encoding))
+        
+        # 2) Encode gambar yang belum ada di cache secara paralel
+        misses = [path for _, _, path, hit, _ in jobs if not hit]
+        workers = max(1, min(ENCODE_WORKERS or default_workers(), len(misses) or 1))
+        if misses:
+            print(f"\n⚙️  Encoding {len(misses)} images with {workers} worker(s)...")
+        
+        last_report = 0.0
+        def show_progress(done, total, rate):
+            nonlocal last_report
+            now = time.time()
+            if done == total or now - last_report >= 1.0:
+                last_report = now
+                print(f"   [{done}/{total}] {rate:.1f} img/s", flush=True)
+        
+        encoded = encode_images(misses, model=FACE_DETECTION_MODEL, num_jitters=NUM_JITTERS,
+                                workers=workers, progress=show_progress)
+        
+        # 3) Gabungkan hasil sesuai urutan scan
+        person_counts = {}
+        for person_name, file, path, hit, encoding in jobs:
+            person_counts.setdefault(person_name, 0)
+            if not hit:
+                _, encoding, error = next(encoded)
+                if error:
+                    print(f"   ❌ {person_name}/{file} ({error[:30]})")
                     continue
+                if cache:
+                    cache.store(path, encoding)
+                if encoding is None:
+                    print(f"   ⚠️  {person_name}/{file} (no faces detected)")
             
-            print(f"   ✅ {person_name}: {person_count} encodings")
+            if encoding is not None:
+                known_face_encodings.append(encoding)
+                known_face_names.append(person_name)
+                known_face_files.append(file)
+                person_counts[person_name] += 1
+                total_loaded += 1
+        
+        print()
+        for person_name, person_count in person_counts.items():
+            print(f"👤 {person_name}: {person_count} encodings")
+        
+        if cache:
+            cache.prune(path for _, _, path, _, _ in jobs)
+            cache.save()
         
         print()
         print("=" * 60)
@@ -143,36 +246,104 @@ def load_dataset():
         print(f"   Total encodings: {total_loaded}")
         print(f"   Unique persons: {len(set(known_face_names))}")
         print(f"   Persons: {', '.join(sorted(set(known_face_names)))}")
+        if cache:
+            print(f"   Cache: {cache.hits} hits, {cache.misses} misses, {cache.evictions} evicted")
         print("=" * 60)
         print()
         
         stats["total_encodings"] = total_loaded
+        face_gallery = FaceGallery(known_face_encodings, known_face_names)
+        if MATCH_INDEX == "prototype":
+            face_gallery.index = PrototypeIndex(face_gallery, PROTOTYPES_PER_PERSON, PROTOTYPE_TOP_K)
+        elif MATCH_INDEX == "ivf":
+            face_gallery.index = IVFIndex(face_gallery, IVF_LISTS, IVF_PROBE)
+            check = evaluate_recall(face_gallery, face_gallery.index)
+            stats["ann_recall"] = round(check["recall"], 4)
+            print(f"🔎 IVF index: {face_gallery.index.n_lists} lists, probe {IVF_PROBE} → "
+                  f"recall {check['recall']:.1%} vs exact, "
+                  f"{check['index_ms']:.3f} ms/face (exact {check['exact_ms']:.3f} ms/face)")
         
     except Exception as e:
         print(f"❌ ERROR loading dataset: {e}")
         import traceback
         traceback.print_exc()
 
-# Load dataset on startup
-load_dataset()
-
 # ============================================================
 # INISIALISASI SERIAL
 # ============================================================
+def _ensure_serial_port():
+    """Buka port pyserial jika belum terbuka (panggil dengan serial_lock)"""
+    global serial_port
+    if serial_port is None or not serial_port.is_open:
+        serial_port = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2, write_timeout=2)
+        time.sleep(2)  # Buka port → ESP32 reset (DTR), tunggu boot SEKALI saja
+    return serial_port
+
+def open_serial_session():
+    """Buka session pyserial persisten (dipakai bersama oleh semua route)"""
+    with serial_lock:
+        return _ensure_serial_port()
+
+def serial_send(command):
+    """Kirim perintah lewat session pyserial yang sama, tanpa buka-tutup port"""
+    global serial_port
+    with serial_lock:
+        port = _ensure_serial_port()
+        try:
+            port.write(f"{command}\n".encode())
+        except Exception:
+            # Port putus → buang handle, perintah berikutnya membuka ulang
+            port.close()
+            serial_port = None
+            raise
+    return True
+
+def serial_ready():
+    """Status link dari memori (tidak menyentuh port)"""
+    if esp32_controller:
+        return esp32_controller.connected  # Dijaga supervisor auto-reconnect
+    # Fallback pyserial: hanya jika session dibuka init_serial_connection()
+    # (belum di-init, mis. di bawah WSGI server → tidak terhubung)
+    return serial_connected and serial_port is not None and serial_port.is_open
+
+def serial_health():
+    """Status link untuk /serial_status dan event SSE "link" (sumber yang sama)"""
+    if esp32_controller:
+        return esp32_controller.health()  # Dari cache health controller, tidak menyentuh port
+    return {"connected": serial_ready(), "port": SERIAL_PORT, "baudrate": SERIAL_BAUDRATE}
+
 def init_serial_connection():
     """Inisialisasi koneksi serial ke ESP32"""
-    global esp32_controller, serial_connected
+    global esp32_controller, serial_connected, SERIAL_PORT
+    
+    if DOOR_DAEMON_SOCKET:
+        # Port serial + window buka/tutup pintu dipegang door_daemon.py,
+        # proses ini cukup jadi client (semua worker berbagi satu window)
+        from door_daemon import DoorClient  # Unix socket: tidak di-import di Windows
+        esp32_controller = DoorClient(DOOR_DAEMON_SOCKET)
+        serial_connected = esp32_controller.connected
+        print(f"{'✅' if serial_connected else '⚠️ '} Door daemon {DOOR_DAEMON_SOCKET}")
+        return serial_connected
+    
+    # Probe port cache dulu, lalu semua port kandidat paralel.
+    # Belum ketemu → supervisor menjalankan discovery lagi di setiap reconnect
+    discover = port_finder(SERIAL_PORT, SERIAL_BAUDRATE)
+    SERIAL_PORT = resolve_port(SERIAL_PORT, SERIAL_BAUDRATE)
     
     try:
         if USE_CUSTOM_SERIAL:
-            esp32_controller = ESP32SerialController(SERIAL_PORT, SERIAL_BAUDRATE)
+            esp32_controller = ESP32SerialController(SERIAL_PORT, SERIAL_BAUDRATE,
+                                                     fast_connect=SERIAL_FAST_CONNECT,
+                                                     auto_reconnect=True,
+                                                     max_backoff=SERIAL_MAX_BACKOFF,
+                                                     discover=discover)
             if esp32_controller.open():
                 serial_connected = True
                 print(f"✅ Serial {SERIAL_PORT} connected!")
                 return True
+            print(f"🔄 Auto-reconnect ke {SERIAL_PORT} berjalan di background")
         else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            time.sleep(2)
+            open_serial_session()
             serial_connected = True
             print(f"✅ Serial {SERIAL_PORT} connected!")
             return True
@@ -187,89 +358,113 @@ def init_serial_connection():
 # ============================================================
 # GENERATE VIDEO FRAMES WITH FACE DETECTION
 # ============================================================
+def get_camera():
+    """Start capture thread sekali saja (thread-safe), return CameraStream atau None"""
+    global camera
+    
+    with camera_lock:
+        if camera is None or not camera.running:
+            stream = CameraStream(CAMERA_SOURCE, fps=CAMERA_FPS, loop=CAMERA_LOOP)
+            if not stream.start():
+                return None
+            camera = stream
+        return camera
+
 def generate_frames():
-    global last_name, last_time, last_detected_timestamp, stats, camera
+    global last_name, last_time, last_detected_timestamp, stats
     
     # Initialize camera on first call
-    if camera is None:
-        camera = cv2.VideoCapture(0)
-        if not camera.isOpened():
-            print("⚠️  Camera not available!")
-            return
+    stream = get_camera()
+    if stream is None:
+        print("⚠️  Camera not available!")
+        return
 
     frame_count = 0
-    skip_frames = 0  # Skip every N frames untuk speed
+    frame_id = None
+    face_locations = []
+    face_names = []
     
     while True:
-        success, frame = camera.read()
-        if not success:
-            break
+        # Tunggu frame terbaru dari capture thread (tidak menyentuh device)
+        t = time.perf_counter()
+        frame_id, frame = stream.read(last_id=frame_id)
+        if frame is None:
+            if not stream.running:
+                break  # Capture thread berhenti (camera lepas / file habis)
+            continue  # Timeout (frame pertama lambat, FPS rendah) → tunggu lagi
+        # frame_wait = idle menunggu capture thread, capture = biaya ambil frame (copy)
+        t = frame_started = pipeline_metrics.lap("frame_wait", t)
+        frame = frame.copy()
+        t = pipeline_metrics.lap("capture", t)
 
         frame_count += 1
         
-        # Resize frame untuk speed
-        small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
-        rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+        # Scene kosong & tidak ada track → recognizer idle
+        active = not MOTION_GATE or bool(face_tracker.tracks) or motion_gate.check(frame)
+        if not active:
+            face_locations = []
+            face_names = []
         
-        # Only process every 2 frames untuk speed
-        if frame_count % 2 == 0:
+        # Proses frame sesuai rate yang diatur frame_skipper
+        if active and frame_skipper.should_process():
+            started = t = time.perf_counter()
             try:
+                # Resize frame untuk speed
+                small_frame = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
+                rgb_small_frame = cv2.cvtColor(small_frame, cv2.COLOR_BGR2RGB)
+                t = pipeline_metrics.lap("resize", t)
+                
                 # Detect faces
                 face_locations = face_recognition.face_locations(rgb_small_frame, model=FACE_DETECTION_MODEL)
-                face_encodings = face_recognition.face_encodings(rgb_small_frame, face_locations, num_jitters=NUM_JITTERS)
+                t = pipeline_metrics.lap("face_locations", t)
+                now = time.time()
+                tracks = face_tracker.update(face_locations, now)
                 
-                if face_encodings:
-                    last_detected_timestamp = time.time()
-                    stats["faces_detected"] = len(face_encodings)
+                # Encode hanya wajah yang belum teridentifikasi oleh tracker
+                to_encode = [i for i, track in enumerate(tracks) if face_tracker.needs_encoding(track, now)]
+                face_encodings = []
+                if to_encode:
+                    face_encodings = face_recognition.face_encodings(
+                        rgb_small_frame, [face_locations[i] for i in to_encode], num_jitters=NUM_JITTERS)
+                    t = pipeline_metrics.lap("face_encodings", t)
                 
-                face_names = []
-                face_distances = []
+                # Compare wajah yang di-encode dengan known faces sekaligus
+                matches = face_gallery.match(face_encodings, FACE_TOLERANCE)
+                if to_encode:
+                    t = pipeline_metrics.lap("match", t)
+                for i, (_, best_distance, name) in zip(to_encode, matches):
+                    face_tracker.assign(tracks[i], name, best_distance, now)
+                face_tracker.record(len(to_encode), len(tracks) - len(to_encode), now)
                 
-                for face_encoding in face_encodings:
-                    # Compare dengan known faces
-                    distances = face_recognition.face_distance(known_face_encodings, face_encoding)
-                    
-                    if len(distances) > 0:
-                        # Get best match
-                        best_match_index = np.argmin(distances)
-                        best_distance = distances[best_match_index]
-                        
-                        # Check jika match threshold
-                        if best_distance < FACE_TOLERANCE:
-                            name = known_face_names[best_match_index]
-                            stats["faces_recognized"] += 1
-                        else:
-                            name = "Tidak Dikenal"
-                    else:
-                        name = "Tidak Dikenal"
-                    
-                    face_names.append(name)
-                    face_distances.append(best_distance if len(distances) > 0 else 1.0)
+                if face_locations:
+                    last_detected_timestamp = now
+                    stats["faces_detected"] += len(face_locations)
+                
+                face_names = [track.name for track in tracks]
+                face_distances = [track.distance for track in tracks]
+                stats["faces_recognized"] += sum(1 for name in face_names if name != "Tidak Dikenal")
+                frame_skipper.record(time.perf_counter() - started)
                 
                 # Update last detected person
                 if face_names and face_names[0] != "Tidak Dikenal":
                     last_name = face_names[0]
                     last_time = time.strftime("%Y-%m-%d %H:%M:%S")
-                    
-                    # Log to presensi
-                    now = time.time()
-                    if last_name not in last_seen or (now - last_seen[last_name]) > 5:
-                        try:
-                            requests.post("http://localhost/facereconigtion/php/presensi.php", 
-                                        data={"nama": last_name}, timeout=1)
-                            last_seen[last_name] = now
-                        except:
-                            pass
+                
+                # Log to presensi (per kunjungan, dikirim attendance_writer di background)
+                presence.observe([name for name in face_names if name != "Tidak Dikenal"], now)
                         
             except Exception as e:
                 print(f"⚠️  Face detection error: {e}")
         
+        presence.sweep()
+        
         # Reset jika tidak ada wajah selama 5 detik
-        if not face_encodings and time.time() - last_detected_timestamp > 5:
+        if not face_locations and time.time() - last_detected_timestamp > 5:
             last_name = "-"
             last_time = time.strftime("%Y-%m-%d %H:%M:%S")
         
         # Draw detected faces pada ORIGINAL FRAME (full size)
+        t = time.perf_counter()
         for (top, right, bottom, left), name in zip(face_locations, face_names):
             # Scale back to original frame
             top *= 4
@@ -280,13 +475,32 @@ def generate_frames():
             color = (0, 255, 0) if name != "Tidak Dikenal" else (0, 0, 255)
             cv2.rectangle(frame, (left, top), (right, bottom), color, 2)
             cv2.putText(frame, name, (left, top - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.9, color, 2)
+        t = pipeline_metrics.lap("draw", t)
         
-        # Encode untuk streaming
+        # Encode untuk streaming (sekali per frame, dibagikan oleh video_hub)
         _, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 80])
-        frame_bytes = buffer.tobytes()
+        t = pipeline_metrics.lap("imencode", t)
+        pipeline_metrics.record("frame", t - frame_started)
+        yield multipart_chunk(buffer.tobytes())
 
-        yield (b'--frame\r\n'
-               b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
+def broadcast_frames():
+    """Jalankan generate_frames() sekali untuk semua client, hasil dibagikan lewat video_hub"""
+    try:
+        for chunk in generate_frames():
+            video_hub.publish(chunk)
+    except Exception as e:
+        print(f"❌ Pipeline error: {e}")
+    finally:
+        video_hub.close()
+
+def start_pipeline():
+    """Start pipeline thread jika belum berjalan"""
+    global pipeline_thread
+    
+    with pipeline_lock:
+        if pipeline_thread is None or not pipeline_thread.is_alive():
+            pipeline_thread = Thread(target=broadcast_frames, name="recognition-pipeline", daemon=True)
+            pipeline_thread.start()
 
 # ============================================================
 # ROUTES
@@ -297,7 +511,10 @@ def index():
 
 @app.route('/video_feed')
 def video_feed():
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # ?fps=N → batasi frame rate untuk client ini (client lambat otomatis skip frame)
+    max_fps = request.args.get('fps', type=float)
+    start_pipeline()
+    return Response(video_hub.stream(max_fps=max_fps), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 @app.route('/terakhir')
 def terakhir():
@@ -305,94 +522,100 @@ def terakhir():
 
 @app.route('/stats')
 def get_stats():
-    return jsonify(stats)
+    return jsonify({**stats, "stream": video_hub.snapshot(), "tracker": face_tracker.snapshot(),
+                    "processing": frame_skipper.snapshot(),
+                    "motion_gate": motion_gate.snapshot(),
+                    "attendance": attendance_writer.snapshot() if attendance_writer else None,
+                    "presence": presence.snapshot(),
+                    "events": events.snapshot()})
+
+@app.route('/stats/pipeline')
+def pipeline_stats():
+    return jsonify(pipeline_metrics.snapshot())
+
+@app.route('/metrics')
+def metrics():
+    # Format teks Prometheus: latency per tahap + counter recognition
+    counters = {name: stats[name] for name in ("faces_detected", "faces_recognized")}
+    return Response(pipeline_metrics.prometheus(counters), mimetype='text/plain; version=0.0.4')
 
 # ============================================================
 # KONTROL PINTU
 # ============================================================
+def send_door_command(command):
+    """Kirim satu perintah pintu ke ESP32 (dipakai oleh door_scheduler)"""
+    if esp32_controller:
+        return esp32_controller.send_command(command)
+    
+    return serial_send(command)
+
+# Buka → return langsung dengan job ID, tutup dijadwalkan di timer wheel.
+# Dibuat di startup(); dengan DOOR_DAEMON_SOCKET = DoorClient (window diatur daemon)
+door_scheduler = None
+
 @app.route('/buka_pintu', methods=['POST'])
 def buka_pintu():
-    global serial_connected
-    
-    if not serial_connected:
+    if not serial_ready():
         return jsonify({
             "status": "ERROR",
             "pesan": f"ESP32 tidak terhubung via serial {SERIAL_PORT}"
         }), 500
     
-    try:
-        print("🔓 Opening door...")
-        
-        if USE_CUSTOM_SERIAL and esp32_controller:
-            esp32_controller.send_command("pintu=BUKA")
-            responses = esp32_controller.read_response(10)
-            return jsonify({
-                "status": "OK",
-                "pesan": "Pintu dibuka selama 10 detik",
-                "response": responses
-            })
-        else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"pintu=BUKA\n")
-            time.sleep(10.5)
-            ser.close()
-            return jsonify({
-                "status": "OK",
-                "pesan": "Pintu dibuka selama 10 detik, lalu ditutup otomatis."
-            })
-            
-    except Exception as e:
-        serial_connected = False
+    print("🔓 Opening door...")
+    job = door_scheduler.open(DOOR_OPEN_SECONDS)
+    
+    if job["status"] == "error":
         return jsonify({
             "status": "ERROR",
-            "pesan": f"Gagal kontrol pintu: {str(e)}"
+            "pesan": f"Gagal kontrol pintu: {job['error']}",
+            "job": job
         }), 500
+    
+    pesan = f"Pintu dibuka selama {DOOR_OPEN_SECONDS} detik, lalu ditutup otomatis."
+    if job["extended"]:
+        pesan = f"Pintu masih terbuka, diperpanjang {DOOR_OPEN_SECONDS} detik."
+    return jsonify({
+        "status": "OK",
+        "pesan": pesan,
+        "job_id": job["job_id"],
+        "job": job
+    })
+
+@app.route('/door_jobs/<job_id>', methods=['GET'])
+def door_job_status(job_id):
+    job = door_scheduler.job(job_id) if door_scheduler else None
+    if job is None:
+        return jsonify({"status": "ERROR", "pesan": f"Job {job_id} tidak ditemukan"}), 404
+    return jsonify(job)
 
 @app.route('/tutup_pintu', methods=['POST'])
 def tutup_pintu():
-    global serial_connected
-    
-    if not serial_connected:
+    if not serial_ready():
         return jsonify({"status": "ERROR", "pesan": "ESP32 tidak terhubung"}), 500
     
     try:
         print("🔒 Closing door...")
-        
-        if USE_CUSTOM_SERIAL and esp32_controller:
-            esp32_controller.send_command("pintu=TUTUP")
-            responses = esp32_controller.read_response(3)
-            return jsonify({"status": "OK", "pesan": "Pintu ditutup", "response": responses})
-        else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"pintu=TUTUP\n")
-            time.sleep(1)
-            ser.close()
-            return jsonify({"status": "OK", "pesan": "Pintu ditutup"})
+        job = door_scheduler.close()
+        return jsonify({"status": "OK", "pesan": "Pintu ditutup", "job": job})
             
     except Exception as e:
-        serial_connected = False
         return jsonify({"status": "ERROR", "pesan": f"Gagal kontrol pintu: {str(e)}"})
 
 @app.route('/serial_status', methods=['GET'])
 def serial_status():
-    return jsonify({
-        "connected": serial_connected,
-        "port": SERIAL_PORT,
-        "baudrate": SERIAL_BAUDRATE
-    })
+    # Dijawab dari memori, tidak menulis/membaca port
+    return jsonify(serial_health())
 
 @app.route('/test_led', methods=['POST'])
 def test_led():
-    if not serial_connected:
+    if not serial_ready():
         return jsonify({"status": "ERROR", "pesan": "ESP32 tidak terhubung"}), 500
     
     try:
-        if USE_CUSTOM_SERIAL and esp32_controller:
+        if esp32_controller:
             esp32_controller.send_command("test=LED")
         else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"test=LED\n")
-            ser.close()
+            serial_send("test=LED")
         
         return jsonify({"status": "OK", "pesan": "Test LED sent"})
     except Exception as e:
@@ -400,21 +623,64 @@ def test_led():
 
 @app.route('/test_relay', methods=['POST'])
 def test_relay():
-    if not serial_connected:
+    if not serial_ready():
         return jsonify({"status": "ERROR", "pesan": "ESP32 tidak terhubung"}), 500
     
     try:
-        if USE_CUSTOM_SERIAL and esp32_controller:
+        if esp32_controller:
             esp32_controller.send_command("test=RELAY")
         else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"test=RELAY\n")
-            ser.close()
+            serial_send("test=RELAY")
         
         return jsonify({"status": "OK", "pesan": "Test RELAY sent"})
     except Exception as e:
         return jsonify({"status": "ERROR", "pesan": str(e)}), 500
 
+# ============================================================
+# PUSH EVENTS (SSE) — pengganti polling /terakhir & status dari dashboard
+# ============================================================
+events = EventStream()  # Watcher didaftarkan di startup()
+
+@app.route('/events')
+def events_feed():
+    return Response(events.stream(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+# ============================================================
+# STARTUP
+# ============================================================
+def startup():
+    """
+    Semua side effect startup: dataset, attendance writer (kirim ulang
+    spool), serial, door scheduler, watcher SSE. Camera tetap dibuka saat
+    /video_feed pertama.
+    
+    Tidak dijalankan saat import: worker spawn parallel_encoder meng-import
+    ulang modul ini sebagai __mp_main__, begitu juga benchmark.py.
+    Di bawah WSGI server, panggil app_usb_improved.startup() sekali.
+    
+    Returns:
+        True jika serial terhubung
+    """
+    global attendance_writer, door_scheduler
+    
+    load_dataset()
+    
+    attendance_writer = AttendanceWriter(PRESENSI_URL, spool_path=ATTENDANCE_SPOOL_PATH)
+    attendance_writer.start()
+    
+    connected = init_serial_connection()
+    if DOOR_DAEMON_SOCKET:
+        door_scheduler = esp32_controller  # DoorClient: satu window untuk semua worker
+    else:
+        door_scheduler = DoorScheduler(send_door_command, open_duration=DOOR_OPEN_SECONDS,
+                                       refresh_interval=FIRMWARE_AUTO_CLOSE)
+    
+    events.watch("recognition", lambda: {"nama": last_name, "waktu": last_time}, key=lambda d: d["nama"])
+    events.watch("door", door_scheduler.state)
+    events.watch("link", lambda: {key: serial_health().get(key) for key in ("connected", "port")})
+    return connected
+
 # ============================================================
 # MAIN
 # ============================================================
@@ -427,13 +693,14 @@ if __name__ == '__main__':
     print()
     print(f"🔧 Configuration:")
     print(f"   Dataset: {DATASET_PATH}")
+    print(f"   Source: {describe_source(CAMERA_SOURCE)}")
     print(f"   Serial: {SERIAL_PORT} @ {SERIAL_BAUDRATE} baud")
     print(f"   Tolerance: {FACE_TOLERANCE} (lower=stricter)")
     print(f"   Detection Model: {FACE_DETECTION_MODEL}")
     print()
     
-    # Inisialisasi serial
-    if init_serial_connection():
+    # Dataset, writer, serial, door scheduler, watcher SSE
+    if startup():
         print("✅ Ready to use!\n")
     else:
         print("⚠️  Running without serial connection. Check USB!\n")
@@ -10,7 +10,7 @@ import cv2
 import os
 import time
 import json
-from threading import Thread
+from threading import Lock, Thread
 import sys
 
 # Coba import library serial kita
@@ -22,21 +22,28 @@ except ImportError:
     print("⚠️  esp32_serial tidak ditemukan, menggunakan standard pyserial")
     import serial
 
+from serial_discovery import resolve_port
+from event_stream import EventStream
+from frame_source import open_source, source_options
+
 # ============================================================
 # KONFIGURASI
 # ============================================================
 app = Flask(__name__)
-camera = cv2.VideoCapture(0)
+camera = open_source(*source_options())  # Camera 0, atau --source file video / folder gambar
 
 DATASET_PATH = "../dataset"
-SERIAL_PORT = "COM3"
+SERIAL_PORT = "auto"  # "auto" = cari port ESP32 otomatis, atau isi mis. "COM3"
 SERIAL_BAUDRATE = 115200
+SERIAL_FAST_CONNECT = True  # Tanpa reset ESP32 (DTR/RTS), konfirmasi via handshake status
 
 # ============================================================
 # GLOBAL VARIABLES
 # ============================================================
 esp32_controller = None
 serial_connected = False
+serial_port = None                 # Session pyserial persisten (fallback tanpa esp32_serial)
+serial_lock = Lock()               # Satu perintah serial pada satu waktu
 
 # Placeholder untuk face recognition (skip loading)
 known_face_encodings = []
@@ -49,20 +56,50 @@ last_detected_timestamp = time.time()
 # ============================================================
 # INISIALISASI SERIAL
 # ============================================================
+def _ensure_serial_port():
+    """Buka port pyserial jika belum terbuka (panggil dengan serial_lock)"""
+    global serial_port
+    if serial_port is None or not serial_port.is_open:
+        serial_port = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2, write_timeout=2)
+        time.sleep(2)  # Buka port → ESP32 reset (DTR), tunggu boot SEKALI saja
+    return serial_port
+
+def open_serial_session():
+    """Buka session pyserial persisten (dipakai bersama oleh semua route)"""
+    with serial_lock:
+        return _ensure_serial_port()
+
+def serial_send(command):
+    """Kirim perintah lewat session pyserial yang sama, tanpa buka-tutup port"""
+    global serial_port
+    with serial_lock:
+        port = _ensure_serial_port()
+        try:
+            port.write(f"{command}\n".encode())
+        except Exception:
+            # Port putus → buang handle, perintah berikutnya membuka ulang
+            port.close()
+            serial_port = None
+            raise
+    return True
+
 def init_serial_connection():
     """Inisialisasi koneksi serial ke ESP32"""
-    global esp32_controller, serial_connected
+    global esp32_controller, serial_connected, SERIAL_PORT
+    
+    # Probe port cache dulu, lalu semua port kandidat paralel
+    SERIAL_PORT = resolve_port(SERIAL_PORT, SERIAL_BAUDRATE)
     
     try:
         if USE_CUSTOM_SERIAL:
-            esp32_controller = ESP32SerialController(SERIAL_PORT, SERIAL_BAUDRATE)
+            esp32_controller = ESP32SerialController(SERIAL_PORT, SERIAL_BAUDRATE,
+                                                     fast_connect=SERIAL_FAST_CONNECT)
             if esp32_controller.open():
                 serial_connected = True
                 print(f"✅ Serial {SERIAL_PORT} terhubung!")
                 return True
         else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            time.sleep(2)
+            open_serial_session()
             serial_connected = True
             print(f"✅ Serial {SERIAL_PORT} terhubung!")
             return True
@@ -124,18 +161,15 @@ def buka_pintu():
         print("🔓 Membuka pintu...")
         
         if USE_CUSTOM_SERIAL and esp32_controller:
-            esp32_controller.send_command("pintu=BUKA")
-            responses = esp32_controller.read_response(10)
+            # Tunggu konfirmasi buka saja (balasan lengkap baru selesai setelah 10 detik)
+            responses = esp32_controller.request("pintu=BUKA", expect="BUKA PINTU")
             return jsonify({
                 "status": "OK",
                 "pesan": "Pintu dibuka selama 10 detik",
                 "response": responses
             })
         else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"pintu=BUKA\n")
-            time.sleep(10.5)
-            ser.close()
+            serial_send("pintu=BUKA")
             return jsonify({
                 "status": "OK",
                 "pesan": "Pintu dibuka selama 10 detik, lalu ditutup otomatis."
@@ -162,18 +196,14 @@ def tutup_pintu():
         print("🔒 Menutup pintu...")
         
         if USE_CUSTOM_SERIAL and esp32_controller:
-            esp32_controller.send_command("pintu=TUTUP")
-            responses = esp32_controller.read_response(3)
+            responses = esp32_controller.request("pintu=TUTUP", expect="TUTUP PINTU")
             return jsonify({
                 "status": "OK",
                 "pesan": "Pintu ditutup",
                 "response": responses
             })
         else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"pintu=TUTUP\n")
-            time.sleep(1)
-            ser.close()
+            serial_send("pintu=TUTUP")
             return jsonify({
                 "status": "OK",
                 "pesan": "Pintu ditutup"
@@ -203,9 +233,7 @@ def test_led():
         if USE_CUSTOM_SERIAL and esp32_controller:
             esp32_controller.send_command("test=LED")
         else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"test=LED\n")
-            ser.close()
+            serial_send("test=LED")
         
         return jsonify({"status": "OK", "pesan": "Test LED sent"})
     except Exception as e:
@@ -220,14 +248,24 @@ def test_relay():
         if USE_CUSTOM_SERIAL and esp32_controller:
             esp32_controller.send_command("test=RELAY")
         else:
-            ser = serial.Serial(SERIAL_PORT, SERIAL_BAUDRATE, timeout=2)
-            ser.write(b"test=RELAY\n")
-            ser.close()
+            serial_send("test=RELAY")
         
         return jsonify({"status": "OK", "pesan": "Test RELAY sent"})
     except Exception as e:
         return jsonify({"status": "ERROR", "pesan": str(e)}), 500
 
+# ============================================================
+# PUSH EVENTS (SSE) — pengganti polling /terakhir & status dari dashboard
+# ============================================================
+events = EventStream()
+events.watch("recognition", lambda: {"nama": last_name, "waktu": last_time}, key=lambda d: d["nama"])
+events.watch("link", lambda: {"connected": serial_connected, "port": SERIAL_PORT})
+
+@app.route('/events')
+def events_feed():
+    return Response(events.stream(), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 # ============================================================
 # MAIN
 # ============================================================
@@ -0,0 +1,98 @@
+"""
+=============================================================
+Durable Attendance Spool (SQLite)
+=============================================================
+Spool lokal untuk event presensi supaya tidak ada yang hilang saat
+Apache/MySQL mati atau restart. Event ditulis dulu ke SQLite (mode
+WAL), baru kemudian dikirim ke presensi.php oleh replayer. Event
+hanya dihapus (ack) setelah server menerima-nya.
+
+  - Satu transaksi per batch → satu fsync untuk banyak event
+  - Urutan dijaga dengan id AUTOINCREMENT
+  - Thread-safe (satu koneksi + lock)
+
+Penggunaan:
+    from attendance_spool import AttendanceSpool
+
+    spool = AttendanceSpool("attendance_spool.db")
+    spool.append_many([{"nama": "A", "waktu": "...", "ts": 1700000000.0}])
+    rows = spool.peek(100)      # [(id, event), ...]
+    spool.ack(rows[-1][0])      # hapus sampai id ini
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class AttendanceSpool:
+    """
+    Antrian event presensi yang persisten di disk
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Lokasi file database SQLite
+        """
+        self.path = path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")  # fsync di setiap commit (per batch)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS spool ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " ts REAL NOT NULL,"
+            " event TEXT NOT NULL)"
+        )
+
+    def append_many(self, events: List[dict]) -> int:
+        """
+        Tulis beberapa event dalam satu transaksi
+
+        Returns:
+            Jumlah event yang ditulis
+        """
+        if not events:
+            return 0
+        rows = [(event.get("ts", time.time()), json.dumps(event)) for event in events]
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany("INSERT INTO spool (ts, event) VALUES (?, ?)", rows)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return len(rows)
+
+    def peek(self, limit: int = 100) -> List[Tuple[int, dict]]:
+        """Ambil event tertua (tanpa menghapus), urut sesuai waktu masuk"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT id, event FROM spool ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [(row_id, json.loads(event)) for row_id, event in rows]
+
+    def ack(self, last_id: int):
+        """Hapus semua event sampai (dan termasuk) last_id"""
+        with self.lock:
+            self.conn.execute("DELETE FROM spool WHERE id <= ?", (last_id,))
+
+    def size(self) -> int:
+        """Jumlah event yang belum terkirim"""
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM spool").fetchone()[0]
+
+    def oldest_ts(self) -> Optional[float]:
+        """Timestamp event tertua yang belum terkirim (None jika kosong)"""
+        with self.lock:
+            row = self.conn.execute("SELECT ts FROM spool ORDER BY id LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,304 @@
+"""
+=============================================================
+Background Attendance Writer
+=============================================================
+Kirim presensi ke php/presensi.php dari background thread,
+BUKAN langsung di dalam loop video. Loop video cukup memanggil
+submit() (non-blocking) sehingga server PHP/MySQL yang lambat
+tidak pernah membekukan stream dan recognition.
+
+  - Antrian bounded: jika penuh, event baru di-drop (dihitung)
+  - Setiap event membawa jenis "datang" / "pulang" (kolom
+    kehadiran.jenis, lihat database_setup.sql)
+  - requests.Session dengan keep-alive (koneksi dipakai ulang)
+  - Jika antrian menumpuk, worker menggabungkan (coalesce) event
+    dengan nama & jenis sama yang berjarak <= coalesce_window detik
+    dalam satu batch (kunjungan terpisah tetap jadi baris terpisah)
+  - Opsional spool SQLite (attendance_spool.py): event ditulis ke disk
+    dulu, lalu di-replay ke server secara bulk & berurutan. Saat server
+    mati, replay diulang dengan backoff sampai server kembali. Jika
+    spool tidak bisa ditulis (disk penuh, DB terkunci), event ditahan
+    di memori dan dikirim langsung / ditulis ulang di loop berikutnya.
+
+Penggunaan:
+    from attendance_writer import AttendanceWriter
+
+    writer = AttendanceWriter("http://localhost/facereconigtion/php/presensi.php",
+                              spool_path="attendance_spool.db")
+    writer.start()
+    writer.submit("Galih_Rakasiwi")
+    print(writer.snapshot())
+"""
+
+import json
+import logging
+import queue
+import threading
+import time
+from typing import List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from attendance_spool import AttendanceSpool
+
+logger = logging.getLogger(__name__)
+
+
+class AttendanceWriter:
+    """
+    Worker thread yang mengirim event presensi lewat HTTP
+    """
+
+    def __init__(self, url: str, max_queue: int = 1000, timeout: float = 3.0, max_batch: int = 100,
+                 spool_path: Optional[str] = None, max_backoff: float = 30.0, coalesce_window: float = 5.0):
+        """
+        Args:
+            url: URL presensi.php
+            max_queue: Kapasitas antrian event
+            timeout: Timeout HTTP (detik)
+            max_batch: Maksimum event per batch (antrian maupun replay)
+            spool_path: File SQLite untuk spool durable (None = tanpa spool)
+            max_backoff: Jeda maksimum (detik) antar percobaan replay saat server mati
+            coalesce_window: Event nama & jenis sama dalam N detik dianggap duplikat
+                             (jauh di bawah PresenceAggregator.gap)
+        """
+        self.url = url
+        self.timeout = timeout
+        self.max_batch = max_batch
+        self.max_backoff = max_backoff
+        self.coalesce_window = coalesce_window
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.spool = AttendanceSpool(spool_path) if spool_path else None
+        self.backoff = 0.0
+        self.next_replay = 0.0
+        self.unspooled = []  # Event yang gagal ditulis ke spool (dicoba lagi)
+
+        self.session = requests.Session()
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=2))
+
+        self.thread = None
+        self.running = False
+        self.lock = threading.Lock()
+
+        # Statistik
+        self.submitted = 0
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_latency = 0.0
+        self.avg_latency = 0.0
+        self.last_error = None
+
+    def start(self):
+        """Jalankan worker thread"""
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="attendance-writer", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Hentikan worker setelah antrian yang ada terkirim"""
+        self.running = False
+        self.queue.put(None)
+        if self.thread:
+            self.thread.join(timeout=timeout)
+
+    def submit(self, name: str, timestamp: Optional[float] = None, jenis: str = "datang") -> bool:
+        """
+        Masukkan event presensi ke antrian (tidak pernah blocking)
+
+        Args:
+            name: Nama orang
+            timestamp: Waktu event (default: sekarang)
+            jenis: "datang" / "pulang" (dari PresenceAggregator)
+
+        Returns:
+            False jika antrian penuh dan event di-drop
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        event = {
+            "nama": name,
+            "waktu": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(timestamp)),
+            "jenis": jenis,
+            "ts": timestamp,
+        }
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            return False
+        with self.lock:
+            self.submitted += 1
+        return True
+
+    def _drain(self, timeout: Optional[float] = None) -> List[dict]:
+        """Ambil satu event (tunggu max timeout) lalu semua event lain yang sudah menunggu"""
+        try:
+            first = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        if first is None:
+            return []
+        batch = [first]
+        while len(batch) < self.max_batch:
+            try:
+                event = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is None:
+                self.running = False
+                break
+            batch.append(event)
+        return batch
+
+    def _coalesce(self, batch: List[dict]) -> List[dict]:
+        """Gabungkan event nama & jenis sama dalam coalesce_window detik (simpan yang paling awal)"""
+        merged = []
+        kept = {}  # (nama, jenis) → event terakhir yang disimpan
+        for event in batch:
+            key = (event["nama"], event.get("jenis"))
+            previous = kept.get(key)
+            if previous is not None and event["ts"] - previous["ts"] <= self.coalesce_window:
+                continue  # Duplikat kunjungan yang sama
+            kept[key] = event
+            merged.append(event)
+        with self.lock:
+            self.coalesced += len(batch) - len(merged)
+        return merged
+
+    def _post(self, data: dict, count: int) -> bool:
+        started = time.perf_counter()
+        try:
+            response = self.session.post(self.url, data=data, timeout=self.timeout)
+            response.raise_for_status()
+            ok, error = True, None
+        except Exception as e:
+            ok, error = False, str(e)
+
+        latency = time.perf_counter() - started
+        with self.lock:
+            self.last_latency = latency
+            self.avg_latency = latency if self.avg_latency == 0 else self.avg_latency * 0.8 + latency * 0.2
+            if ok:
+                self.sent += count
+            else:
+                self.failed += 1
+                self.last_error = error
+        if not ok:
+            logger.warning(f"⚠️  Gagal kirim {count} presensi: {error}")
+        return ok
+
+    def _send(self, event: dict) -> bool:
+        return self._post({"nama": event["nama"], "waktu": event["waktu"],
+                           "jenis": event.get("jenis", "datang")}, 1)
+
+    def _send_bulk(self, events: List[dict]) -> bool:
+        # Event spool lama (sebelum ada jenis) dianggap "datang"
+        payload = [{"nama": e["nama"], "waktu": e["waktu"], "jenis": e.get("jenis", "datang")} for e in events]
+        return self._post({"events": json.dumps(payload)}, len(events))
+
+    def _retry_later(self):
+        """Server belum bisa dihubungi → coba lagi dengan exponential backoff"""
+        self.backoff = min(self.max_backoff, max(1.0, self.backoff * 2))
+        self.next_replay = time.monotonic() + self.backoff
+
+    def _spool_events(self, events: List[dict]):
+        """Tulis event ke spool; jika spool gagal, kirim langsung atau tahan di memori"""
+        self.unspooled.extend(events)
+        if not self.unspooled:
+            return
+        try:
+            self.spool.append_many(self.unspooled)
+            self.unspooled = []
+            return
+        except Exception as e:
+            error = f"Gagal tulis spool: {e}"
+            with self.lock:
+                repeated, self.last_error = self.last_error == error, error
+            if not repeated:  # Dicoba ulang tiap loop, log sekali per error
+                logger.error(f"❌ {error} ({len(self.unspooled)} presensi ditahan di memori)")
+
+        while self.unspooled and time.monotonic() >= self.next_replay:
+            batch = self.unspooled[:self.max_batch]
+            if not self._send_bulk(batch):
+                self._retry_later()
+                break
+            del self.unspooled[:len(batch)]
+            self.backoff = 0.0
+
+        # Spool dan server sama-sama mati: memori dibatasi seperti antrian
+        overflow = len(self.unspooled) - self.queue.maxsize
+        if overflow > 0:
+            del self.unspooled[:overflow]
+            with self.lock:
+                self.dropped += overflow
+
+    def _replay(self):
+        """Kirim isi spool ke server (bulk, berurutan) sampai kosong atau gagal"""
+        if time.monotonic() < self.next_replay:
+            return
+        while True:
+            rows = self.spool.peek(self.max_batch)
+            if not rows:
+                self.backoff = 0.0
+                return
+            if not self._send_bulk([event for _, event in rows]):
+                self._retry_later()
+                return
+            self.spool.ack(rows[-1][0])
+
+    def _run(self):
+        while self.running or not self.queue.empty():
+            timeout = None
+            if self.spool and self.backoff:
+                timeout = max(0.0, self.next_replay - time.monotonic())
+            elif self.spool:
+                timeout = 1.0
+
+            batch = self._drain(timeout)
+            events = self._coalesce(batch) if batch else []
+
+            if self.spool:
+                # Tulis ke disk dulu (1 transaksi / fsync per batch), baru replay
+                self._spool_events(events)
+                try:
+                    self._replay()
+                except Exception as e:
+                    # Spool tidak bisa dibaca (DB terkunci dsb.) → worker tetap hidup, coba lagi nanti
+                    logger.error(f"❌ Gagal replay spool: {e}")
+                    with self.lock:
+                        self.last_error = f"Gagal replay spool: {e}"
+            else:
+                for event in events:
+                    self._send(event)
+
+    def snapshot(self) -> dict:
+        """Statistik untuk /stats"""
+        spool_size, replay_lag = 0, 0.0
+        if self.spool:
+            try:
+                spool_size = self.spool.size()
+                oldest = self.spool.oldest_ts()
+                replay_lag = time.time() - oldest if oldest else 0.0
+            except Exception as e:
+                logger.warning(f"⚠️  Spool tidak bisa dibaca: {e}")
+        with self.lock:
+            return {
+                "spool_size": spool_size,
+                "replay_lag_s": round(replay_lag, 1),
+                "queue_depth": self.queue.qsize(),
+                "unspooled": len(self.unspooled),
+                "submitted": self.submitted,
+                "sent": self.sent,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "coalesced": self.coalesced,
+                "last_latency_ms": round(self.last_latency * 1000, 1),
+                "avg_latency_ms": round(self.avg_latency * 1000, 1),
+                "last_error": self.last_error,
+            }
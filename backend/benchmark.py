@@ -0,0 +1,284 @@
+"""
+=============================================================
+End-to-End Recognition Pipeline Benchmark
+=============================================================
+Menjalankan generate_frames() dari app_usb_improved.py (jalur proses
+yang sama dengan /video_feed) atas rekaman video atau folder gambar,
+tanpa webcam dan tanpa browser, lalu melaporkan:
+
+  - frames/sec end-to-end
+  - latency frame per wajah: latency frame dibagi jumlah wajah di
+    frame itu (p50 / p95 / p99 / max), bukan waktu proses satu wajah
+  - encodes/sec (face_encodings yang benar-benar dijalankan)
+  - peak RSS proses
+  - latency per tahap (pipeline_metrics: resize, face_locations, ...)
+
+Setiap frame diproses tepat sekali (source fps=0, frame-skip dan
+motion gate dimatikan) supaya hasil antar commit bisa dibandingkan.
+Re-verify FaceTracker berbasis waktu, jadi jumlah encode ikut
+kecepatan mesin; --encode-every-frame meng-encode semua wajah di
+setiap frame (biaya encoding terukur penuh, jumlah encode tetap).
+encodes/sec hanya dibandingkan dengan baseline di mode tersebut.
+Hasil ditulis ke JSON; jika ada baseline, benchmark GAGAL (exit 1)
+saat salah satu metrik memburuk lebih dari --max-regression persen.
+
+Penggunaan:
+    python benchmark.py --source ../images --save-baseline      # simpan baseline
+    python benchmark.py --source ../images                      # bandingkan dengan baseline
+    python benchmark.py --source rekaman.mp4 --max-regression 15 --output hasil.json
+    python benchmark.py --source ../images --encode-every-frame --frames 100
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+DEFAULT_SOURCE = "../images"
+DEFAULT_OUTPUT = "benchmark_results.json"
+DEFAULT_BASELINE = "benchmark_baseline.json"
+
+# Metrik yang dibandingkan dengan baseline: True = lebih besar lebih baik.
+# encodes_per_sec hanya jika hasil & baseline sama-sama --encode-every-frame
+COMPARED_METRICS = {
+    "fps": True,
+    "encodes_per_sec": True,
+    "frame_latency_per_face_p50_ms": False,
+    "frame_latency_per_face_p95_ms": False,
+    "frame_latency_p95_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def peak_rss_mb():
+    """Peak resident memory proses ini (MB), None jika tidak bisa diukur"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux: KB, macOS: byte
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        pass
+    try:
+        import psutil  # Windows
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / (1024 * 1024), 1)
+    except ImportError:
+        return None
+
+
+def percentiles(samples_ms, prefix: str) -> dict:
+    if not samples_ms:
+        return {f"{prefix}_p50_ms": None, f"{prefix}_p95_ms": None,
+                f"{prefix}_p99_ms": None, f"{prefix}_max_ms": None}
+    samples = np.array(samples_ms)
+    p50, p95, p99 = np.percentile(samples, [50, 95, 99])
+    return {
+        f"{prefix}_p50_ms": round(float(p50), 2),
+        f"{prefix}_p95_ms": round(float(p95), 2),
+        f"{prefix}_p99_ms": round(float(p99), 2),
+        f"{prefix}_max_ms": round(float(samples.max()), 2),
+    }
+
+
+def run_benchmark(source: str, max_frames=None, warmup: int = 1, encode_every_frame: bool = False) -> dict:
+    """
+    Jalankan generate_frames() atas `source` sampai habis (atau max_frames)
+
+    Args:
+        source: File video atau folder gambar
+        max_frames: Batas jumlah frame yang diukur (None = semua)
+        warmup: Frame awal yang tidak diukur (load model dlib, cache)
+        encode_every_frame: Encode semua wajah di setiap frame (tracker tidak menghemat encode)
+
+    Returns:
+        Hasil benchmark (dict, JSON-serializable)
+    """
+    import app_usb_improved as pipeline
+    from adaptive_skip import AdaptiveFrameSkipper
+    from face_tracker import FaceTracker
+    from pipeline_metrics import PipelineMetrics
+    from presence_aggregator import PresenceAggregator
+
+    # Import tidak menjalankan startup() (writer/spool, serial, door scheduler, SSE):
+    # cukup dataset. Setiap frame diproses, tidak ada presensi yang dikirim
+    pipeline.load_dataset()
+    pipeline.CAMERA_SOURCE, pipeline.CAMERA_FPS, pipeline.CAMERA_LOOP = source, 0, False
+    pipeline.MOTION_GATE = False
+    pipeline.frame_skipper = AdaptiveFrameSkipper(target_rate=0, cpu_budget=0)
+    pipeline.presence = PresenceAggregator(on_event=lambda nama, jenis, ts: None)
+    if encode_every_frame:
+        pipeline.face_tracker = FaceTracker(reverify_interval=0, unknown_reverify_interval=0)
+
+    frame_ms, per_face_ms = [], []
+    frames = faces = frames_seen = 0
+
+    generator = pipeline.generate_frames()
+    encodes_before = pipeline.face_tracker.encodes_done
+    faces_before = pipeline.stats["faces_detected"]
+    started = finished = t = time.perf_counter()
+    for _ in generator:
+        now = time.perf_counter()
+        faces_now = pipeline.stats["faces_detected"]
+        frames_seen += 1
+
+        if frames_seen <= warmup:
+            if frames_seen == warmup:
+                # Mulai mengukur setelah warmup (tahap, encode, durasi)
+                pipeline.pipeline_metrics = PipelineMetrics()
+                encodes_before = pipeline.face_tracker.encodes_done
+                started = now
+        else:
+            elapsed_ms = (now - t) * 1000
+            frame_faces = faces_now - faces_before
+            frame_ms.append(elapsed_ms)
+            per_face_ms.extend([elapsed_ms / frame_faces] * frame_faces)
+            frames += 1
+            faces += frame_faces
+            finished = now
+            if max_frames and frames >= max_frames:
+                break
+
+        faces_before = faces_now
+        t = time.perf_counter()
+
+    generator.close()
+    if pipeline.camera:
+        pipeline.camera.stop()
+
+    if not frames:
+        raise RuntimeError(f"Tidak ada frame yang diproses dari {source} (warmup={warmup})")
+
+    duration = finished - started
+    encodes = pipeline.face_tracker.encodes_done - encodes_before
+
+    return {
+        "source": source,
+        "frames": frames,
+        "warmup_frames": warmup,
+        "faces": faces,
+        "duration_s": round(duration, 3),
+        "fps": round(frames / duration, 2) if duration > 0 else None,
+        **percentiles(frame_ms, "frame_latency"),
+        **percentiles(per_face_ms, "frame_latency_per_face"),
+        "encodes": encodes,
+        "encodes_per_sec": round(encodes / duration, 2) if duration > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+        "stages": pipeline.pipeline_metrics.snapshot()["stages"],
+        "config": {
+            "detection_model": pipeline.FACE_DETECTION_MODEL,
+            "num_jitters": pipeline.NUM_JITTERS,
+            "match_index": pipeline.MATCH_INDEX,
+            "encode_every_frame": encode_every_frame,
+            "known_encodings": len(pipeline.known_face_encodings),
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+        },
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+    }
+
+
+def compare(results: dict, baseline: dict, max_regression: float) -> list:
+    """
+    Bandingkan hasil dengan baseline
+
+    Returns:
+        List (metrik, baseline, sekarang, perubahan %, regresi?) per metrik
+    """
+    # Tanpa --encode-every-frame jumlah encode ikut re-verify tracker (wall-clock):
+    # tracker yang lebih hemat bukan regresi
+    fixed_encodes = all(data.get("config", {}).get("encode_every_frame") for data in (results, baseline))
+
+    rows = []
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        if metric == "encodes_per_sec" and not fixed_encodes:
+            continue
+        old, new = baseline.get(metric), results.get(metric)
+        if not old or new is None:
+            continue
+        change = (new - old) / old * 100
+        worse = -change if higher_is_better else change
+        rows.append((metric, old, new, round(change, 1), worse > max_regression))
+    return rows
+
+
+def save_json(data: dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+
+# =============================================================
+# MAIN
+# =============================================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark pipeline recognition (generate_frames)")
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="File video atau folder gambar")
+    parser.add_argument("--frames", type=int, default=None, help="Batas jumlah frame yang diukur")
+    parser.add_argument("--warmup", type=int, default=1, help="Frame awal yang tidak diukur")
+    parser.add_argument("--encode-every-frame", action="store_true",
+                        help="Encode semua wajah di setiap frame (tanpa penghematan tracker)")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="File JSON hasil")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="File JSON baseline")
+    parser.add_argument("--max-regression", type=float, default=10.0,
+                        help="Persen penurunan maksimum terhadap baseline sebelum gagal")
+    parser.add_argument("--save-baseline", action="store_true", help="Simpan hasil sebagai baseline baru")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.source):
+        print(f"❌ Source tidak ditemukan: {args.source}")
+        sys.exit(2)
+
+    print(f"⏱️  Benchmark {args.source} ...")
+    try:
+        results = run_benchmark(args.source, args.frames, args.warmup, args.encode_every_frame)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        sys.exit(2)
+
+    save_json(results, args.output)
+    print(f"   Frames: {results['frames']} ({results['faces']} wajah) dalam {results['duration_s']}s")
+    print(f"   FPS: {results['fps']}")
+    print(f"   Latency frame/wajah: p50 {results['frame_latency_per_face_p50_ms']} ms, "
+          f"p95 {results['frame_latency_per_face_p95_ms']} ms, p99 {results['frame_latency_per_face_p99_ms']} ms")
+    print(f"   Encodes/sec: {results['encodes_per_sec']}")
+    if results["peak_rss_mb"] is None:
+        print("   Peak RSS: tidak tersedia (install psutil di Windows)")
+    else:
+        print(f"   Peak RSS: {results['peak_rss_mb']} MB")
+    print(f"📄 Hasil: {args.output}")
+
+    if args.save_baseline:
+        save_json(results, args.baseline)
+        print(f"✅ Baseline disimpan: {args.baseline}")
+        sys.exit(0)
+
+    if not os.path.exists(args.baseline):
+        print(f"⚠️  Baseline {args.baseline} belum ada (jalankan dengan --save-baseline)")
+        sys.exit(0)
+
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline, args.max_regression)
+
+    mode, baseline_mode = (data.get("config", {}).get("encode_every_frame", False) for data in (results, baseline))
+    if mode != baseline_mode:
+        print(f"⚠️  Mode --encode-every-frame berbeda dengan baseline ({mode} vs {baseline_mode}), "
+              f"hasil tidak sebanding")
+
+    print(f"\n📊 Dibandingkan dengan baseline ({baseline.get('timestamp', '-')}, batas {args.max_regression}%):")
+    for metric, old, new, change, regressed in rows:
+        mark = "❌" if regressed else "✅"
+        print(f"   {mark} {metric}: {old} → {new} ({change:+.1f}%)")
+
+    regressions = [row[0] for row in rows if row[4]]
+    if regressions:
+        print(f"\n❌ Regresi > {args.max_regression}%: {', '.join(regressions)}")
+        sys.exit(1)
+    print("\n✅ Tidak ada regresi")
@@ -0,0 +1,161 @@
+"""
+=============================================================
+Camera Capture Thread (shared)
+=============================================================
+Satu background thread yang terus membaca camera dan selalu
+menyimpan frame TERBARU. Karena driver dibaca terus-menerus,
+buffer camera selalu kosong sehingga frame tidak pernah basi.
+
+Berapapun jumlah client /video_feed, hanya thread ini yang
+menyentuh cv2.VideoCapture. Client cukup memanggil read().
+
+Source bisa camera, file video, atau folder gambar (frame_source.py).
+Untuk source lossless (file/folder dengan fps=0) thread capture
+menunggu frame dibaca dulu sebelum mengambil frame berikutnya,
+sehingga setiap frame diproses tepat sekali (benchmark deterministik).
+
+Frame yang dibagikan bersifat read-only (writeable=False).
+Copy dulu sebelum menggambar kotak/teks di atasnya.
+
+Penggunaan:
+    from camera_stream import CameraStream
+
+    stream = CameraStream(0)                       # atau CameraStream("../images/Galih_Rakasiwi", fps=0)
+    stream.start()
+    frame_id, frame = stream.read()
+    frame_id, frame = stream.read(last_id=frame_id)  # tunggu frame baru
+"""
+
+import logging
+import threading
+import time
+from typing import Optional, Tuple
+
+import cv2
+
+from frame_source import describe_source, open_source
+
+logger = logging.getLogger(__name__)
+
+
+class CameraStream:
+    """
+    Background capture thread yang membagikan frame terbaru
+    """
+
+    def __init__(self, source=0, fps: Optional[float] = None, loop: bool = False):
+        """
+        Args:
+            source: Index camera (0, 1, ...), file video, folder gambar, atau URL
+            fps: FPS untuk file/folder (None = asli, 0 = secepatnya tanpa drop frame)
+            loop: Ulangi file/folder dari awal saat habis
+        """
+        self.source = source
+        self.source_fps = fps
+        self.loop = loop
+        self.capture = None
+        self.lossless = False
+        self.frame = None
+        self.frame_id = 0
+        self.consumed_id = 0
+        self.running = False
+        self.thread = None
+        self.condition = threading.Condition()
+
+        # Statistik
+        self.frames_captured = 0
+        self.started_at = None
+
+    def start(self) -> bool:
+        """
+        Buka camera dan jalankan capture thread
+
+        Returns:
+            True jika camera berhasil dibuka
+        """
+        if self.running:
+            return True
+
+        self.capture = open_source(self.source, self.source_fps, self.loop)
+        if not self.capture.isOpened():
+            logger.error(f"❌ Source {describe_source(self.source)} tidak bisa dibuka")
+            self.capture.release()
+            self.capture = None
+            return False
+
+        # Buffer minimal supaya driver tidak menumpuk frame lama
+        self.capture.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.lossless = getattr(self.capture, "lossless", False)
+
+        self.running = True
+        self.started_at = time.time()
+        self.thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        self.thread.start()
+        logger.info(f"📷 {describe_source(self.source)} capture thread started")
+        return True
+
+    def _run(self):
+        while self.running:
+            if self.lossless:
+                # Jangan timpa frame yang belum diambil consumer
+                with self.condition:
+                    self.condition.wait_for(lambda: not self.running or self.consumed_id == self.frame_id)
+                if not self.running:
+                    break
+
+            success, frame = self.capture.read()
+            if not success:
+                logger.warning(f"⚠️  {describe_source(self.source)} berhenti mengirim frame")
+                break
+
+            frame.flags.writeable = False
+            with self.condition:
+                self.frame = frame
+                self.frame_id += 1
+                self.frames_captured += 1
+                self.condition.notify_all()
+
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        self.capture.release()
+
+    def read(self, last_id: Optional[int] = None, timeout: float = 2.0) -> Tuple[int, Optional[object]]:
+        """
+        Ambil frame terbaru
+
+        Args:
+            last_id: frame_id terakhir yang sudah diproses pemanggil.
+                     Jika diisi, tunggu sampai ada frame yang lebih baru.
+            timeout: Maksimum waktu tunggu (detik)
+
+        Returns:
+            (frame_id, frame) — frame None jika camera berhenti / timeout
+        """
+        with self.condition:
+            if not self.condition.wait_for(
+                lambda: not self.running or (self.frame is not None and self.frame_id != last_id),
+                timeout,
+            ):
+                return self.frame_id, None
+            if self.frame is None or self.frame_id == last_id:
+                return self.frame_id, None
+            if self.lossless:
+                self.consumed_id = self.frame_id
+                self.condition.notify_all()
+            return self.frame_id, self.frame
+
+    def fps(self) -> float:
+        """Rata-rata frame per detik sejak start"""
+        if not self.started_at:
+            return 0.0
+        elapsed = time.time() - self.started_at
+        return self.frames_captured / elapsed if elapsed > 0 else 0.0
+
+    def stop(self):
+        """Hentikan capture thread"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join(timeout=2)
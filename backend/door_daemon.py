@@ -0,0 +1,387 @@
+"""
+=============================================================
+Door Control Daemon (Unix Domain Socket)
+=============================================================
+Hanya satu proses yang boleh memegang port serial ESP32. Daemon ini
+memegang port lewat ESP32SerialController dan menerima perintah dari
+sebanyak apa pun web worker lewat Unix domain socket, sehingga
+app_usb*.py bisa dijalankan lebih dari satu proses.
+
+  - Protokol: satu JSON per baris, request → response
+        {"op": "open", "duration": 10}       → {"ok": true, "job": {...}} (buka / perpanjang)
+        {"op": "close"}                      → {"ok": true, "job": {...}}
+        {"op": "job", "job_id": "3"}         → {"ok": true, "job": {...}}
+        {"op": "state"}                      → {"ok": true, "state": {...}}
+        {"command": "status"}                → {"ok": true, "lines": [...], ...}
+        {"op": "health"}                     → health() controller + statistik antrian
+  - Window buka pintu (buka / perpanjang / refresh / tutup otomatis)
+    diatur SATU DoorScheduler di daemon: web worker hanya meminta
+    buka, jadi dua worker tidak punya window sendiri-sendiri yang
+    saling menutup pintu lebih awal
+  - Antrian prioritas: pintu=TUTUP > pintu=BUKA > status > test=*
+    (perintah tutup tidak pernah menunggu di belakang test LED/RELAY)
+  - Satu worker thread mengirim perintah berurutan ke ESP32;
+    'op: health' / 'op: state' dijawab langsung dari memori tanpa antri
+
+Menjalankan daemon:
+    python door_daemon.py --port auto --socket /tmp/esp32_door.sock --open-seconds 10
+
+Dari web worker:
+    from door_daemon import DoorClient
+
+    door = DoorClient("/tmp/esp32_door.sock")
+    job = door.open()          # window diatur daemon, langsung return
+    door.job(job["job_id"])    # progress
+"""
+
+import argparse
+import itertools
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from typing import Optional
+
+from door_scheduler import DoorScheduler
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = "/tmp/esp32_door.sock"
+
+# Prioritas (kecil = duluan) dan baris yang menandakan perintah sudah dijalankan
+COMMANDS = {
+    "pintu=TUTUP": (0, "TUTUP PINTU"),
+    "pintu=BUKA": (1, "BUKA PINTU"),
+    "status": (2, None),
+    "test=LED": (3, "Test LED"),
+    "test=RELAY": (3, "Test RELAY"),
+}
+
+
+class DoorJob:
+    """Satu perintah di antrian daemon"""
+
+    def __init__(self, command: str, timeout: float):
+        self.command = command
+        self.timeout = timeout
+        self.queued_at = time.monotonic()
+        self.done = threading.Event()
+        self.result = None
+
+
+class DoorDaemon:
+    """
+    Pemilik port serial ESP32: antrian prioritas + satu worker thread
+    """
+
+    def __init__(self, controller, max_queue: int = 100, open_duration: float = 10.0,
+                 refresh_interval: Optional[float] = None):
+        """
+        Args:
+            controller: ESP32SerialController yang sudah (atau akan) dibuka
+            max_queue: Kapasitas antrian perintah
+            open_duration: Lama pintu terbuka per 'op: open' tanpa duration (detik)
+            refresh_interval: Kirim ulang pintu=BUKA selama window diperpanjang
+                              (firmware auto-close), None = tidak
+        """
+        self.controller = controller
+        self.queue = queue.PriorityQueue(maxsize=max_queue)
+        self.seq = itertools.count()
+        self.lock = threading.Lock()
+        self.running = False
+        self.worker = None
+
+        # Satu window buka pintu untuk semua client, perintahnya lewat antrian yang sama
+        self.scheduler = DoorScheduler(self._door_command, open_duration=open_duration,
+                                       refresh_interval=refresh_interval)
+
+        # Statistik
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.last_queue_ms = 0.0
+
+    def start(self):
+        self.running = True
+        self.worker = threading.Thread(target=self._run, name="door-daemon-worker", daemon=True)
+        self.worker.start()
+
+    def stop(self):
+        self.running = False
+        self.queue.put((-1, next(self.seq), None))
+
+    def submit(self, command: str, timeout: float = 2.0, priority: Optional[int] = None) -> DoorJob:
+        """Masukkan perintah ke antrian; raise ValueError / queue.Full"""
+        if command not in COMMANDS:
+            raise ValueError(f"Perintah tidak dikenal: {command}")
+        priority = COMMANDS[command][0] if priority is None else priority
+        job = DoorJob(command, timeout)
+        try:
+            self.queue.put_nowait((priority, next(self.seq), job))
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            raise
+        return job
+
+    def execute(self, command: str, timeout: float = 2.0, priority: Optional[int] = None) -> dict:
+        """Antrikan perintah dan tunggu hasilnya (dict hasil worker)"""
+        try:
+            job = self.submit(command, timeout, priority)
+        except ValueError as e:
+            return {"ok": False, "command": command, "error": str(e)}
+        except queue.Full:
+            return {"ok": False, "command": command, "error": "Antrian daemon penuh"}
+
+        # Worker selalu mengisi hasil ≤ timeout request; beri ruang untuk antrian
+        if not job.done.wait(timeout + 30):
+            return {"ok": False, "command": command, "error": "Timeout di antrian daemon"}
+        return job.result
+
+    def _door_command(self, command: str):
+        """send_command untuk DoorScheduler: raise jika ESP32 tidak mengonfirmasi"""
+        result = self.execute(command)
+        if not result["ok"]:
+            raise RuntimeError(result["error"])
+
+    def _run(self):
+        while self.running:
+            _, _, job = self.queue.get()
+            if job is None:
+                break
+
+            started = time.monotonic()
+            expect = COMMANDS[job.command][1]
+            try:
+                lines = self.controller.request(job.command, timeout=job.timeout, expect=expect)
+                error = None if lines else (self.controller.last_error or "Tidak ada balasan ESP32")
+            except Exception as e:
+                # Mis. SerialException saat menulis: job ini gagal, worker tetap jalan
+                logger.error(f"❌ {job.command}: {e}")
+                lines, error = [], f"Gagal kirim {job.command}: {e}"
+            ok = error is None
+            job.result = {
+                "ok": ok,
+                "command": job.command,
+                "lines": lines,
+                "error": error,
+                "queued_ms": round((started - job.queued_at) * 1000, 1),
+                "latency_ms": round((time.monotonic() - started) * 1000, 1),
+            }
+            with self.lock:
+                self.processed += 1
+                self.failed += 0 if ok else 1
+                self.last_queue_ms = job.result["queued_ms"]
+            job.done.set()
+
+    def health(self) -> dict:
+        """health() controller + statistik antrian (dari memori)"""
+        with self.lock:
+            stats = {
+                "queue_depth": self.queue.qsize(),
+                "processed": self.processed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "last_queue_ms": self.last_queue_ms,
+            }
+        return {**self.controller.health(), "daemon": stats, "door": self.scheduler.snapshot()}
+
+    def _handle_door(self, op: str, request: dict) -> dict:
+        """op open / close / job / state → DoorScheduler daemon"""
+        if op == "open":
+            duration = request.get("duration")
+            try:
+                duration = None if duration is None else float(duration)
+            except (TypeError, ValueError):
+                return {"ok": False, "error": "duration harus berupa angka"}
+            if duration is not None and duration <= 0:
+                return {"ok": False, "error": "duration harus lebih dari 0"}
+            job = self.scheduler.open(duration)
+            return {"ok": job["status"] != "error", "job": job, "error": job["error"]}
+
+        if op == "close":
+            try:
+                return {"ok": True, "job": self.scheduler.close()}
+            except RuntimeError as e:
+                return {"ok": False, "error": str(e)}
+
+        if op == "job":
+            job = self.scheduler.job(request.get("job_id"))
+            return {"ok": job is not None, "job": job,
+                    "error": None if job else f"Job {request.get('job_id')} tidak ditemukan"}
+
+        return {"ok": True, "state": self.scheduler.state()}
+
+    def handle(self, request: dict) -> dict:
+        """Proses satu request JSON dari client"""
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "Request harus berupa object JSON"}
+        op = request.get("op")
+        if op == "health":
+            return {"ok": True, **self.health()}
+        if op in ("open", "close", "job", "state"):
+            return self._handle_door(op, request)
+
+        command = request.get("command", "")
+        try:
+            timeout = float(request.get("timeout", 2.0))
+            priority = request.get("priority")
+            priority = None if priority is None else int(priority)  # Harus bisa dibandingkan di heap
+        except (TypeError, ValueError):
+            return {"ok": False, "command": command, "error": "timeout/priority harus berupa angka"}
+        return self.execute(command, timeout, priority)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for raw in self.rfile:
+            try:
+                response = self.server.door.handle(json.loads(raw))
+            except ValueError as e:
+                response = {"ok": False, "error": f"Request bukan JSON: {e}"}
+            self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+            self.wfile.flush()
+
+
+class DoorServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Satu thread per koneksi client, semua berbagi satu DoorDaemon"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, door: DoorDaemon):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)  # Socket sisa proses sebelumnya
+        self.door = door
+        super().__init__(socket_path, _Handler)
+        os.chmod(socket_path, 0o660)
+
+
+class DoorClient:
+    """
+    Client untuk web worker, antarmuka sama dengan ESP32SerialController
+    (send_command / request / health / connected) dan DoorScheduler
+    (open / close / job / state)
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET_PATH, timeout: float = 2.0, health_ttl: float = 1.0):
+        """
+        Args:
+            socket_path: Path Unix domain socket daemon
+            timeout: Timeout default per perintah (detik)
+            health_ttl: Lama hasil health() di-cache (serial_ready() / SSE "link" dibaca sering)
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.health_ttl = health_ttl
+        self.port = socket_path
+        self.last_error = None
+        self.cached_health = None
+        self.cached_at = 0.0
+
+    def call(self, request: dict, timeout: Optional[float] = None) -> dict:
+        """Kirim satu request JSON ke daemon dan tunggu response"""
+        timeout = self.timeout if timeout is None else timeout
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.settimeout(timeout + 5)
+                sock.connect(self.socket_path)
+                sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+                data = b""
+                while not data.endswith(b"\n"):
+                    chunk = sock.recv(4096)
+                    if not chunk:
+                        break
+                    data += chunk
+            response = json.loads(data)
+        except (OSError, ValueError) as e:
+            response = {"ok": False, "connected": False, "error": f"Door daemon tidak bisa dihubungi: {e}"}
+        self.last_error = response.get("error")
+        return response
+
+    def request(self, command: str, timeout: Optional[float] = None, expect: Optional[str] = None) -> list:
+        timeout = self.timeout if timeout is None else timeout
+        return self.call({"command": command, "timeout": timeout}, timeout).get("lines", [])
+
+    def send_command(self, command: str) -> bool:
+        response = self.call({"command": command})
+        if not response.get("ok"):
+            logger.error(f"❌ {command}: {response.get('error')}")
+        return bool(response.get("ok"))
+
+    def read_response(self, lines: int = 5) -> list:
+        return []  # Balasan sudah dikembalikan oleh request()
+
+    def health(self, max_age: Optional[float] = None) -> dict:
+        """health() daemon, dari cache jika umurnya < max_age (default health_ttl)"""
+        max_age = self.health_ttl if max_age is None else max_age
+        now = time.monotonic()
+        if self.cached_health is None or now - self.cached_at >= max_age:
+            self.cached_health = self.call({"op": "health"})
+            self.cached_at = now
+        return self.cached_health
+
+    @property
+    def connected(self) -> bool:
+        return bool(self.health().get("connected"))
+
+    def open(self, duration: Optional[float] = None) -> dict:
+        """Minta daemon membuka pintu (atau memperpanjang window); tutup diatur daemon"""
+        response = self.call({"op": "open", "duration": duration})
+        if response.get("job"):
+            return response["job"]
+        return {"job_id": None, "status": "error", "extended": 0, "error": response.get("error")}
+
+    def close(self) -> Optional[dict]:
+        """Tutup pintu sekarang; raise RuntimeError jika gagal"""
+        response = self.call({"op": "close"})
+        if not response.get("ok"):
+            raise RuntimeError(response.get("error"))
+        return response.get("job")
+
+    def job(self, job_id: str) -> Optional[dict]:
+        return self.call({"op": "job", "job_id": job_id}).get("job")
+
+    def state(self) -> dict:
+        response = self.call({"op": "state"})
+        return response.get("state") or {"open": False, "job_id": None, "status": None,
+                                         "error": response.get("error")}
+
+
+# =============================================================
+# MAIN
+# =============================================================
+if __name__ == '__main__':
+    from esp32_serial import ESP32SerialController
+    from serial_discovery import port_finder, resolve_port
+
+    parser = argparse.ArgumentParser(description="Door control daemon (pemilik port serial ESP32)")
+    parser.add_argument("--port", default="auto", help='Port serial ESP32, "auto" = discovery')
+    parser.add_argument("--baudrate", type=int, default=115200)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Path Unix domain socket")
+    parser.add_argument("--open-seconds", type=float, default=10.0, help="Lama pintu terbuka per 'op: open'")
+    parser.add_argument("--refresh-interval", type=float, default=10.2,
+                        help="Kirim ulang pintu=BUKA setiap N detik saat diperpanjang (firmware auto-close 10 detik)")
+    args = parser.parse_args()
+
+    port = resolve_port(args.port, args.baudrate)
+    controller = ESP32SerialController(port, args.baudrate, fast_connect=True, auto_reconnect=True,
+                                       discover=port_finder(args.port, args.baudrate))
+    controller.open()  # Gagal → supervisor terus mencoba di background
+
+    door = DoorDaemon(controller, open_duration=args.open_seconds, refresh_interval=args.refresh_interval)
+    door.start()
+    server = DoorServer(args.socket, door)
+    print(f"🚪 Door daemon: {port} ↔ {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        door.stop()
+        controller.close()
+        os.unlink(args.socket)
@@ -0,0 +1,288 @@
+"""
+=============================================================
+Non-blocking Door Scheduler
+=============================================================
+Pengganti time.sleep(10) / time.sleep(10.5) di route /buka_pintu.
+Perintah buka dikirim langsung, route langsung return dengan job ID,
+dan perintah tutup dijadwalkan di timer wheel (satu thread untuk
+semua timer). Thread Flask tidak pernah ditahan selama pintu terbuka.
+
+  - Buka lagi saat pintu masih terbuka → window diperpanjang
+    (job yang sama, bukan menumpuk sleep)
+  - refresh_interval: firmware ESP32 USB menutup sendiri setelah 10
+    detik, jadi saat window diperpanjang perintah buka dikirim ulang
+    setiap refresh_interval detik sampai deadline
+  - Status job bisa dicek lewat job(job_id) → route /door_jobs/<id>
+
+Penggunaan:
+    from door_scheduler import DoorScheduler
+
+    door = DoorScheduler(send_command=esp32.send_command, open_duration=10)
+    job = door.open()          # langsung return
+    door.job(job["job_id"])    # progress
+"""
+
+import itertools
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+OPEN_COMMAND = "pintu=BUKA"
+CLOSE_COMMAND = "pintu=TUTUP"
+
+
+class Timer:
+    """Satu entry di TimerWheel"""
+
+    def __init__(self, deadline_tick: int, callback: Callable[[], None]):
+        self.deadline_tick = deadline_tick
+        self.callback = callback
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel: satu thread, resolusi `tick` detik
+    """
+
+    def __init__(self, tick: float = 0.1, slots: int = 512):
+        """
+        Args:
+            tick: Resolusi timer (detik)
+            slots: Jumlah slot wheel (timer > slots*tick tetap didukung)
+        """
+        self.tick = tick
+        self.slots = [[] for _ in range(slots)]
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.current_tick = 0
+        self.thread = threading.Thread(target=self._run, name="door-timer-wheel", daemon=True)
+        self.thread.start()
+
+    def schedule(self, delay: float, callback: Callable[[], None]) -> Timer:
+        """Jalankan callback setelah `delay` detik (di thread wheel)"""
+        target = math.ceil((time.monotonic() + max(0.0, delay) - self.started) / self.tick)
+        with self.lock:
+            timer = Timer(max(target, self.current_tick + 1), callback)
+            self.slots[timer.deadline_tick % len(self.slots)].append(timer)
+        return timer
+
+    def _run(self):
+        while True:
+            time.sleep(self.tick)
+            now_tick = int((time.monotonic() - self.started) / self.tick)
+            due = []
+            with self.lock:
+                # Proses semua tick yang lewat (catch-up jika thread terlambat)
+                while self.current_tick < now_tick:
+                    self.current_tick += 1
+                    slot = self.slots[self.current_tick % len(self.slots)]
+                    if not slot:
+                        continue
+                    keep = []
+                    for timer in slot:
+                        if timer.cancelled:
+                            continue
+                        if timer.deadline_tick <= self.current_tick:
+                            due.append(timer)
+                        else:
+                            keep.append(timer)
+                    slot[:] = keep
+
+            for timer in due:
+                try:
+                    timer.callback()
+                except Exception as e:
+                    logger.error(f"❌ Timer callback error: {e}")
+
+
+class DoorScheduler:
+    """
+    Mengatur window buka pintu tanpa memblok thread pemanggil
+    """
+
+    def __init__(self, send_command: Callable[[str], object], open_duration: float = 10.0,
+                 refresh_interval: Optional[float] = None, history: int = 100):
+        """
+        Args:
+            send_command: Fungsi pengirim perintah ("pintu=BUKA"/"pintu=TUTUP").
+                          Return False atau raise exception jika gagal.
+            open_duration: Lama pintu terbuka (detik)
+            refresh_interval: Kirim ulang perintah buka setiap N detik selama
+                              window aktif (firmware auto-close), None = tidak
+            history: Jumlah job yang disimpan untuk /door_jobs
+        """
+        self.send_command = send_command
+        self.open_duration = open_duration
+        self.refresh_interval = refresh_interval
+        self.history = history
+
+        self.wheel = TimerWheel()
+        self.lock = threading.RLock()
+        self.jobs = OrderedDict()
+        self.ids = itertools.count(1)
+        self.active = None  # Job yang sedang membuka pintu
+        self.close_timer = None
+        self.refresh_timer = None
+
+    def _send(self, command: str):
+        if self.send_command(command) is False:
+            raise RuntimeError(f"Gagal kirim {command}")
+
+    def _job_view(self, job: dict) -> dict:
+        view = dict(job)
+        if job["status"] == "open":
+            now = time.time()
+            total = job["close_at"] - job["opened_at"]
+            view["remaining"] = round(max(0.0, job["close_at"] - now), 1)
+            view["progress"] = round(min(1.0, (now - job["opened_at"]) / total), 3) if total > 0 else 1.0
+        else:
+            view["remaining"] = 0.0
+            view["progress"] = 1.0
+        return view
+
+    def open(self, duration: Optional[float] = None) -> dict:
+        """
+        Buka pintu (atau perpanjang window yang sedang aktif)
+
+        Returns:
+            Status job (dict) — langsung return tanpa menunggu pintu menutup
+        """
+        duration = self.open_duration if duration is None else duration
+        with self.lock:
+            now = time.time()
+            job = self.active
+            if job is not None:
+                # Sudah terbuka → perpanjang window
+                job["close_at"] = now + duration
+                job["extended"] += 1
+                logger.info(f"🔓 Door job {job['job_id']} diperpanjang {duration}s")
+            else:
+                job_id = str(next(self.ids))
+                job = {
+                    "job_id": job_id,
+                    "status": "opening",
+                    "opened_at": now,
+                    "close_at": now + duration,
+                    "closed_at": None,
+                    "extended": 0,
+                    "error": None,
+                }
+                self.jobs[job_id] = job
+                while len(self.jobs) > self.history:
+                    self.jobs.popitem(last=False)
+
+                try:
+                    self._send(OPEN_COMMAND)
+                except Exception as e:
+                    job["status"] = "error"
+                    job["error"] = str(e)
+                    return self._job_view(job)
+
+                job["status"] = "open"
+                job["refreshed_at"] = now
+                self.active = job
+                self._schedule_refresh(job)
+
+            self._schedule_close(job)
+            return self._job_view(job)
+
+    def _schedule_close(self, job: dict):
+        if self.close_timer:
+            self.close_timer.cancel()
+        self.close_timer = self.wheel.schedule(job["close_at"] - time.time(), lambda: self._close(job))
+
+    def _schedule_refresh(self, job: dict):
+        if not self.refresh_interval:
+            return
+        if self.refresh_timer:
+            self.refresh_timer.cancel()
+        self.refresh_timer = self.wheel.schedule(self.refresh_interval, lambda: self._refresh(job))
+
+    def _refresh(self, job: dict):
+        with self.lock:
+            if self.active is not job:
+                return
+            # Masih ada sisa window setelah firmware auto-close → buka lagi
+            if job["close_at"] - time.time() > self.wheel.tick:
+                try:
+                    self._send(OPEN_COMMAND)
+                    job["refreshed_at"] = time.time()
+                except Exception as e:
+                    job["error"] = str(e)
+                self._schedule_refresh(job)
+
+    def _close(self, job: Optional[dict], manual: bool = False) -> Optional[str]:
+        """Kirim perintah tutup; return pesan error atau None"""
+        with self.lock:
+            if job is not None and self.active is not job:
+                return None
+            if job is not None and not manual and job["close_at"] - time.time() > self.wheel.tick:
+                return None  # Window sudah diperpanjang, timer baru yang akan menutup
+            for timer in (self.close_timer, self.refresh_timer):
+                if timer:
+                    timer.cancel()
+            self.close_timer = self.refresh_timer = None
+            self.active = None
+
+            try:
+                self._send(CLOSE_COMMAND)
+                error = None
+            except Exception as e:
+                error = str(e)
+                logger.error(f"❌ Gagal menutup pintu: {e}")
+
+            if job is not None:
+                job["status"] = "closed" if error is None else "error"
+                job["closed_at"] = time.time()
+                job["error"] = error or job["error"]
+            return error
+
+    def close(self) -> Optional[dict]:
+        """
+        Tutup pintu sekarang (manual) dan batalkan timer
+
+        Returns:
+            Status job yang ditutup (None jika tidak ada window aktif)
+        """
+        with self.lock:
+            job = self.active
+            error = self._close(job, manual=True)
+            if error:
+                raise RuntimeError(error)
+            return self._job_view(job) if job else None
+
+    def job(self, job_id: str) -> Optional[dict]:
+        """Status job berdasarkan ID (None jika tidak ditemukan)"""
+        with self.lock:
+            job = self.jobs.get(str(job_id))
+            return self._job_view(job) if job else None
+
+    def state(self) -> dict:
+        """Keadaan pintu tanpa field yang berubah tiap detik (untuk push /events)"""
+        with self.lock:
+            job = self.active or (next(reversed(self.jobs.values())) if self.jobs else None)
+            if job is None:
+                return {"open": False, "job_id": None, "status": None}
+            return {
+                "open": self.active is not None,
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "close_at": job["close_at"],
+                "extended": job["extended"],
+                "error": job["error"],
+            }
+
+    def snapshot(self) -> dict:
+        """Status pintu saat ini"""
+        with self.lock:
+            return {"open": self.active is not None,
+                    "job": self._job_view(self.active) if self.active else None}
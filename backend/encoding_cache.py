@@ -0,0 +1,207 @@
+"""
+=============================================================
+Face Encoding Cache (on-disk)
+=============================================================
+Cache face encodings dataset ke file supaya restart aplikasi
+tidak perlu menjalankan ulang load_image_file + deteksi wajah +
+face_encodings untuk setiap gambar.
+
+Setiap entry di-key dengan path gambar, lalu divalidasi dengan
+ukuran file, mtime dan hash isi file (SHA-1). Cache otomatis
+dianggap invalid jika model deteksi atau NUM_JITTERS berubah.
+cache_path() memasukkan setting tersebut ke nama file, jadi app
+dengan setting berbeda (app.py vs app_usb_improved.py) punya file
+cache sendiri dan tidak saling menimpa.
+
+Penggunaan:
+    from encoding_cache import EncodingCache, cache_path
+
+    cache = EncodingCache(cache_path('../dataset', model='hog', num_jitters=1),
+                          model='hog', num_jitters=1)
+    cache.load()
+    hit, encoding = cache.lookup(path)
+    if not hit:
+        encoding = ...  # hitung encoding
+        cache.store(path, encoding)
+    cache.prune(seen_paths)
+    cache.save()
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from typing import Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_VERSION = 1
+
+
+def file_sha1(path: str, chunk_size: int = 1 << 16) -> str:
+    """Hitung SHA-1 dari isi file"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def cache_path(dataset_path: str, model: str = "hog", num_jitters: int = 1) -> str:
+    """Path file cache per setting encoding, mis. ../dataset/.encodings_cache_hog_j1.pkl"""
+    return os.path.join(dataset_path, f".encodings_cache_{model}_j{num_jitters}.pkl")
+
+
+class EncodingCache:
+    """
+    Cache encoding wajah per file gambar, disimpan sebagai pickle
+    """
+
+    def __init__(self, cache_path: str, model: str = "hog", num_jitters: int = 1):
+        """
+        Args:
+            cache_path: Lokasi file cache
+            model: Model deteksi wajah ("hog" / "cnn")
+            num_jitters: NUM_JITTERS yang dipakai saat encoding
+        """
+        self.cache_path = cache_path
+        self.model = model
+        self.num_jitters = num_jitters
+        self.entries = {}
+        self.dirty = False
+
+        # Statistik untuk load summary
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _signature(self) -> dict:
+        return {
+            "version": CACHE_VERSION,
+            "model": self.model,
+            "num_jitters": self.num_jitters,
+        }
+
+    def load(self) -> int:
+        """
+        Baca file cache dari disk
+
+        Returns:
+            Jumlah entry yang berhasil dibaca (0 jika cache tidak valid)
+        """
+        self.entries = {}
+        if not os.path.exists(self.cache_path):
+            return 0
+
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = pickle.load(f)
+        except Exception as e:
+            logger.warning(f"⚠️  Cache {self.cache_path} rusak, diabaikan: {e}")
+            self.dirty = True
+            return 0
+
+        if not isinstance(data, dict) or data.get("signature") != self._signature():
+            logger.info("Cache encoding dibuat dengan setting berbeda, rebuild")
+            self.dirty = True
+            return 0
+
+        self.entries = data.get("entries", {})
+        return len(self.entries)
+
+    def lookup(self, path: str) -> Tuple[bool, Optional[object]]:
+        """
+        Cari encoding untuk sebuah file gambar
+
+        Entry valid jika ukuran dan mtime sama. Jika berbeda, hash isi
+        file dibandingkan supaya file yang hanya di-copy/touch tetap hit.
+
+        Returns:
+            (hit, encoding) — encoding bisa None jika gambar tidak punya wajah
+        """
+        key = os.path.abspath(path)
+        entry = self.entries.get(key)
+
+        try:
+            st = os.stat(path)
+        except OSError:
+            self.misses += 1
+            return False, None
+
+        if entry is not None:
+            if entry["size"] == st.st_size and entry["mtime"] == st.st_mtime_ns:
+                self.hits += 1
+                return True, entry["encoding"]
+
+            if entry["size"] == st.st_size and entry["sha1"] == file_sha1(path):
+                entry["mtime"] = st.st_mtime_ns
+                self.dirty = True
+                self.hits += 1
+                return True, entry["encoding"]
+
+        self.misses += 1
+        return False, None
+
+    def store(self, path: str, encoding) -> None:
+        """
+        Simpan hasil encoding (atau None jika tidak ada wajah) untuk file
+        """
+        key = os.path.abspath(path)
+        try:
+            st = os.stat(path)
+            sha1 = file_sha1(path)
+        except OSError as e:
+            logger.warning(f"⚠️  Tidak bisa cache {path}: {e}")
+            return
+
+        self.entries[key] = {
+            "size": st.st_size,
+            "mtime": st.st_mtime_ns,
+            "sha1": sha1,
+            "encoding": encoding,
+        }
+        self.dirty = True
+
+    def prune(self, seen_paths: Iterable[str]) -> int:
+        """
+        Hapus entry untuk gambar yang sudah tidak ada di dataset
+
+        Args:
+            seen_paths: Semua path gambar yang ditemukan saat scan dataset
+
+        Returns:
+            Jumlah entry yang dihapus
+        """
+        seen = {os.path.abspath(p) for p in seen_paths}
+        stale = [key for key in self.entries if key not in seen]
+        for key in stale:
+            del self.entries[key]
+        if stale:
+            self.dirty = True
+        self.evictions += len(stale)
+        return len(stale)
+
+    def save(self) -> bool:
+        """
+        Tulis cache ke disk (atomic: tulis file temp lalu rename)
+
+        Returns:
+            True jika berhasil atau tidak ada perubahan
+        """
+        if not self.dirty:
+            return True
+
+        folder = os.path.dirname(os.path.abspath(self.cache_path))
+        try:
+            os.makedirs(folder, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=".encodings_", dir=folder)
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump({"signature": self._signature(), "entries": self.entries},
+                            f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+            return True
+        except Exception as e:
+            logger.error(f"❌ Gagal simpan cache {self.cache_path}: {e}")
+            return False
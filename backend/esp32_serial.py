@@ -5,31 +5,65 @@ ESP32 USB Serial Communication Library
 Library untuk berkomunikasi dengan ESP32 via USB Serial
 untuk kontrol LED dan Relay (bypass MQTT)
 
+Satu reader thread membaca semua output ESP32 per baris. Firmware
+meng-echo setiap perintah ("📡 Terima: <perintah>") dan menutup balasan
+dengan baris kosong, jadi balasan dicocokkan ke pemanggil berdasarkan
+echo tersebut. Pemanggil request() dibangunkan begitu balasannya
+datang (tanpa sleep tetap), output lain masuk ke inbox read_response().
+send_command() mengosongkan inbox, jadi read_response() hanya berisi
+output yang datang SETELAH perintah terakhir (bukan banner boot dsb.).
+
+Dengan auto_reconnect=True, supervisor thread membuka ulang port saat
+USB putus (exponential backoff), opsional mencari ulang port lewat
+discover() (board dicabut/dipasang di port lain, atau port "auto" yang
+belum ketemu saat start), dan health() memberi snapshot link
+(RTT terakhir, error terakhir, uptime) dari memori tanpa menyentuh port.
+
 Penggunaan:
     from esp32_serial import ESP32SerialController
     
     esp32 = ESP32SerialController('COM3', 115200)
     esp32.open()
-    esp32.send_command('pintu=BUKA')
-    response = esp32.read_response()
+    esp32.request('status')                         # tunggu balasan (maks timeout)
+    esp32.request('pintu=BUKA', expect='BUKA PINTU') # tunggu konfirmasi saja
+    esp32.send_command('pintu=BUKA')                # fire-and-forget
+    response = esp32.read_response()                # output setelah perintah ini
     esp32.close()
 """
 
 import serial
+import threading
 import time
 import logging
-from typing import Optional
+from collections import deque
+from typing import Callable, Optional
+
+ECHO_PREFIX = "📡 Terima:"  # Baris pertama setiap balasan firmware
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class PendingReply:
+    """Balasan yang sedang ditunggu oleh satu pemanggil request()"""
+    
+    def __init__(self, command: str, expect: Optional[str] = None):
+        self.command = command
+        self.expect = expect  # Bangunkan pemanggil saat baris ini muncul (None = tunggu akhir balasan)
+        self.lines = []
+        self.started = False
+        self.done = threading.Event()
+
+
 class ESP32SerialController:
     """
     Kontrol ESP32 via USB Serial (bukan MQTT)
     """
     
-    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 2.0):
+    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 2.0,
+                 fast_connect: bool = False, handshake_timeout: float = 1.0,
+                 auto_reconnect: bool = False, min_backoff: float = 1.0, max_backoff: float = 30.0,
+                 discover: Optional[Callable[[], Optional[str]]] = None):
         """
         Inisialisasi koneksi serial
         
@@ -37,42 +71,287 @@ class ESP32SerialController:
             port: COM port (e.g., 'COM3' on Windows, '/dev/ttyUSB0' on Linux)
             baudrate: Baud rate (default 115200)
             timeout: Timeout untuk read (default 2 detik)
+            fast_connect: Buka port tanpa reset ESP32 (DTR/RTS low) lalu
+                          konfirmasi dengan handshake 'status' (default False)
+            handshake_timeout: Batas tunggu handshake sebelum fallback ke wait 2 detik
+            auto_reconnect: Buka ulang port otomatis saat putus (default False)
+            min_backoff: Jeda awal sebelum mencoba reconnect (detik)
+            max_backoff: Jeda maksimum antar percobaan reconnect (detik)
+            discover: Fungsi pencari port (mis. serial_discovery.port_finder),
+                      dipanggil supervisor sebelum reconnect jika port belum
+                      diketahui atau percobaan sebelumnya gagal
         """
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
+        self.fast_connect = fast_connect
+        self.handshake_timeout = handshake_timeout
         self.ser = None
         self.connected = False
+        self.connect_time = None  # Lama open() terakhir (detik)
+        
+        # Supervisor reconnect + health cache
+        self.auto_reconnect = auto_reconnect
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.discover = discover
+        self.supervisor = None
+        self.link_down = threading.Event()
+        self.stopping = threading.Event()
+        self.connected_since = None
+        self.last_rtt = None
+        self.last_reply_at = None
+        self.last_error = None
+        self.reconnects = 0
+        self.reconnect_attempts = 0
+        self.next_retry_at = None
+        
+        # Reader thread + routing balasan
+        self.lock = threading.Lock()
+        self.write_lock = threading.Lock()
+        self.reader = None
+        self.reading = False
+        self.pending = []      # PendingReply yang belum menerima echo
+        self.current = None    # PendingReply yang sedang menerima baris
+        self.inbox = deque(maxlen=200)  # Output yang tidak ditunggu siapa pun
+    
+    def _open_port(self, fast_connect: bool):
+        if not fast_connect:
+            self.ser = serial.Serial(
+                port=self.port,
+                baudrate=self.baudrate,
+                timeout=self.timeout,
+                write_timeout=self.timeout
+            )
+            return
+        
+        # DTR/RTS diset low SEBELUM port dibuka → EN/IO0 ESP32 tidak di-toggle (tidak reset)
+        self.ser = serial.Serial()
+        self.ser.port = self.port
+        self.ser.baudrate = self.baudrate
+        self.ser.timeout = self.timeout
+        self.ser.write_timeout = self.timeout
+        self.ser.dtr = False
+        self.ser.rts = False
+        self.ser.open()
+    
+    def _handshake(self) -> bool:
+        """Kirim 'status' dan tunggu ESP32 membalas"""
+        return len(self.request('status', timeout=self.handshake_timeout)) > 0
     
-    def open(self) -> bool:
+    def open(self, fast_connect: Optional[bool] = None) -> bool:
         """
         Buka koneksi serial ke ESP32
         
+        Args:
+            fast_connect: Override self.fast_connect untuk open() ini
+        
         Returns:
             True jika berhasil, False jika gagal
         """
+        fast_connect = self.fast_connect if fast_connect is None else fast_connect
+        started = time.monotonic()
         try:
-            self.ser = serial.Serial(
-                port=self.port,
-                baudrate=self.baudrate,
-                timeout=self.timeout,
-                write_timeout=self.timeout
-            )
-            time.sleep(2)  # Tunggu ESP32 initialize setelah serial open
+            self._open_port(fast_connect)
             self.connected = True
-            logger.info(f"✅ Serial {self.port} dibuka (baudrate: {self.baudrate})")
+            self._start_reader()
+            
+            if not fast_connect:
+                time.sleep(2)  # Tunggu ESP32 initialize setelah serial open
+            elif not self._handshake():
+                # Board tetap reset / belum siap → kembali ke wait tetap
+                logger.warning(f"⚠️  Handshake {self.port} timeout, tunggu ESP32 boot...")
+                time.sleep(2)
+            
+            self.connect_time = time.monotonic() - started
+            self.connected_since = time.time()
+            self.link_down.clear()
+            logger.info(f"✅ Serial {self.port} dibuka (baudrate: {self.baudrate}, {self.connect_time:.2f}s)")
             return True
         except Exception as e:
             logger.error(f"❌ Gagal buka serial {self.port}: {e}")
-            self.connected = False
+            self._mark_down(str(e))
             return False
+        finally:
+            if self.auto_reconnect:
+                self._start_supervisor()
     
-    def close(self):
-        """Tutup koneksi serial"""
+    def _close_port(self):
+        self.reading = False
         if self.ser and self.ser.is_open:
-            self.ser.close()
-            self.connected = False
+            try:
+                self.ser.close()
+            except Exception:
+                pass
             logger.info(f"Serial {self.port} ditutup")
+        self.connected = False
+        if self.reader and self.reader is not threading.current_thread():
+            self.reader.join(timeout=self.timeout + 1)
+        self.reader = None
+        self._fail_pending()
+    
+    def close(self):
+        """Tutup koneksi serial (dan hentikan auto-reconnect)"""
+        self.stopping.set()
+        self.link_down.set()  # Bangunkan supervisor supaya berhenti
+        self._close_port()
+        if self.supervisor and self.supervisor is not threading.current_thread():
+            self.supervisor.join(timeout=1)
+        self.supervisor = None
+    
+    # ---------------------------------------------------------
+    # Auto-reconnect + health
+    # ---------------------------------------------------------
+    def _mark_down(self, error: str):
+        """Tandai link putus; supervisor (jika aktif) akan reconnect"""
+        self.connected = False
+        self.connected_since = None
+        self.last_error = error
+        self.link_down.set()
+    
+    def _start_supervisor(self):
+        if self.supervisor and self.supervisor.is_alive():
+            return
+        self.stopping.clear()
+        self.supervisor = threading.Thread(target=self._supervise, name=f"esp32-supervisor-{self.port}", daemon=True)
+        self.supervisor.start()
+    
+    def _supervise(self):
+        """Tunggu link putus, lalu buka ulang port dengan exponential backoff"""
+        backoff = self.min_backoff
+        while not self.stopping.is_set():
+            self.link_down.wait()
+            if self.stopping.is_set():
+                break
+            
+            self.next_retry_at = time.time() + backoff
+            if self.stopping.wait(backoff):
+                break
+            
+            self._close_port()
+            # Port belum ketemu ("auto") atau reconnect sebelumnya gagal → cari ulang
+            if self.discover and (str(self.port).lower() == "auto" or backoff > self.min_backoff):
+                self._rediscover()
+            self.reconnect_attempts += 1
+            logger.info(f"🔄 Reconnect {self.port} (percobaan {self.reconnect_attempts})...")
+            if self.open():
+                self.reconnects += 1
+                backoff = self.min_backoff
+                self.next_retry_at = None
+            else:
+                backoff = min(self.max_backoff, backoff * 2)
+    
+    def _rediscover(self):
+        """Cari ulang port ESP32 (port lama tetap dipakai jika tidak ketemu)"""
+        try:
+            port = self.discover()
+        except Exception as e:
+            logger.warning(f"⚠️  Discovery port gagal: {e}")
+            return
+        if port and port != self.port:
+            logger.info(f"🔎 ESP32 ditemukan di {port} (sebelumnya {self.port})")
+            self.port = port
+    
+    def health(self) -> dict:
+        """
+        Snapshot kesehatan link dari memori (tidak menyentuh port)
+        
+        Returns:
+            Dict untuk /serial_status
+        """
+        now = time.time()
+        connected_since = self.connected_since
+        return {
+            "connected": self.connected,
+            "port": self.port,
+            "baudrate": self.baudrate,
+            "uptime_s": round(now - connected_since, 1) if self.connected and connected_since else 0.0,
+            "last_rtt_ms": round(self.last_rtt * 1000, 1) if self.last_rtt is not None else None,
+            "last_reply_age_s": round(now - self.last_reply_at, 1) if self.last_reply_at else None,
+            "last_error": self.last_error,
+            "connect_time_s": round(self.connect_time, 2) if self.connect_time is not None else None,
+            "auto_reconnect": self.auto_reconnect,
+            "reconnects": self.reconnects,
+            "reconnect_attempts": self.reconnect_attempts,
+            "next_retry_s": round(max(0.0, self.next_retry_at - now), 1)
+                            if self.next_retry_at and not self.connected else None,
+        }
+    
+    # ---------------------------------------------------------
+    # Reader thread
+    # ---------------------------------------------------------
+    def _start_reader(self):
+        self.reading = True
+        self.reader = threading.Thread(target=self._read_loop, name=f"esp32-reader-{self.port}", daemon=True)
+        self.reader.start()
+    
+    def _read_loop(self):
+        """Baca output ESP32 per baris dan teruskan ke _route_line()"""
+        while self.reading:
+            try:
+                raw = self.ser.readline()
+            except Exception as e:
+                if self.reading:
+                    logger.error(f"❌ Gagal baca serial: {e}")
+                    self._mark_down(f"Gagal baca serial: {e}")
+                break
+            if raw:
+                self.last_reply_at = time.time()
+                self._route_line(raw.decode('utf-8', errors='replace').strip())
+        self._fail_pending()
+    
+    def _fail_pending(self):
+        """Bangunkan semua pemanggil yang masih menunggu (port ditutup/putus)"""
+        with self.lock:
+            waiting = self.pending + ([self.current] if self.current else [])
+            self.pending = []
+            self.current = None
+        for reply in waiting:
+            reply.done.set()
+    
+    def _route_line(self, line: str):
+        """Cocokkan satu baris output ke balasan yang sedang ditunggu"""
+        if line:
+            logger.info(f"📥 Response: {line}")
+        
+        with self.lock:
+            if line.startswith(ECHO_PREFIX):
+                # Awal balasan baru → balasan sebelumnya dianggap selesai
+                if self.current:
+                    self.current.done.set()
+                command = line[len(ECHO_PREFIX):].strip()
+                self.current = next((r for r in self.pending if r.command == command), None)
+                if self.current is None:
+                    self.inbox.append(line)
+                    return
+                self.pending.remove(self.current)
+                self.current.started = True
+                self.current.lines.append(line)
+                return
+            
+            if line:
+                # Firmware tidak meng-echo pintu=TUTUP yang diterima selama pintu terbuka
+                for reply in self.pending:
+                    if reply.expect and reply.expect in line:
+                        self.pending.remove(reply)
+                        reply.lines.append(line)
+                        reply.done.set()
+                        return
+            
+            if self.current is None:
+                if line:
+                    self.inbox.append(line)
+                return
+            
+            if not line:
+                # Baris kosong = akhir balasan
+                self.current.done.set()
+                self.current = None
+                return
+            
+            self.current.lines.append(line)
+            if self.current.expect and self.current.expect in line:
+                self.current.done.set()
     
     def send_command(self, command: str) -> bool:
         """
@@ -89,17 +368,57 @@ class ESP32SerialController:
             return False
         
         try:
+            # Output lama (banner boot, sisa balasan sebelumnya) bukan balasan perintah ini
+            with self.lock:
+                self.inbox.clear()
             # Tambah newline di akhir untuk Serial.readStringUntil('\n')
-            self.ser.write(f"{command}\n".encode('utf-8'))
+            with self.write_lock:
+                self.ser.write(f"{command}\n".encode('utf-8'))
             logger.info(f"📤 Kirim: {command}")
             return True
         except Exception as e:
             logger.error(f"❌ Gagal kirim perintah: {e}")
+            self._mark_down(f"Gagal kirim perintah: {e}")
             return False
     
+    def request(self, command: str, timeout: Optional[float] = None, expect: Optional[str] = None) -> list:
+        """
+        Kirim perintah dan tunggu balasannya (bangun begitu balasan lengkap)
+        
+        Args:
+            command: Perintah yang dikirim
+            timeout: Batas tunggu (default self.timeout)
+            expect: Kembali lebih awal saat baris berisi teks ini diterima
+        
+        Returns:
+            List baris balasan (bisa sebagian jika timeout)
+        """
+        timeout = self.timeout if timeout is None else timeout
+        reply = PendingReply(command, expect)
+        with self.lock:
+            self.pending.append(reply)
+        
+        sent_at = time.monotonic()
+        if not self.send_command(command):
+            with self.lock:
+                if reply in self.pending:
+                    self.pending.remove(reply)
+            return []
+        
+        if reply.done.wait(timeout) and reply.lines:
+            self.last_rtt = time.monotonic() - sent_at
+        else:
+            with self.lock:
+                if reply in self.pending:
+                    self.pending.remove(reply)
+            logger.warning(f"⚠️  Timeout menunggu balasan {command} ({timeout}s)")
+        return list(reply.lines)
+    
     def read_response(self, lines: int = 5) -> list:
         """
-        Baca response dari ESP32
+        Ambil output ESP32 sejak send_command() terakhir yang tidak
+        ditunggu request() (non-blocking). Untuk balasan perintah pakai
+        request(), read_response() tidak menunggu balasan datang.
         
         Args:
             lines: Jumlah baris yang dibaca (default 5)
@@ -111,20 +430,9 @@ class ESP32SerialController:
             logger.error("❌ Serial tidak terhubung!")
             return []
         
-        responses = []
-        try:
-            for _ in range(lines):
-                if self.ser.in_waiting > 0:
-                    line = self.ser.readline().decode('utf-8').strip()
-                    if line:
-                        responses.append(line)
-                        logger.info(f"📥 Response: {line}")
-                else:
-                    break
-            return responses
-        except Exception as e:
-            logger.error(f"❌ Gagal baca response: {e}")
-            return []
+        with self.lock:
+            count = min(lines, len(self.inbox))
+            return [self.inbox.popleft() for _ in range(count)]
     
     def send_and_read(self, command: str, lines: int = 5) -> list:
         """
@@ -137,10 +445,7 @@ class ESP32SerialController:
         Returns:
             List response
         """
-        if self.send_command(command):
-            time.sleep(0.5)  # Tunggu ESP32 process
-            return self.read_response(lines)
-        return []
+        return self.request(command)[:lines]
     
     def buka_pintu(self, wait_for_completion: bool = True) -> bool:
         """
@@ -153,7 +458,8 @@ class ESP32SerialController:
             True jika berhasil, False jika gagal
         """
         logger.info("🔓 Membuka pintu...")
-        responses = self.send_and_read('pintu=BUKA', lines=10)
+        # Firmware baru selesai membalas setelah 10 detik → cukup tunggu konfirmasi buka
+        responses = self.request('pintu=BUKA', expect='BUKA PINTU')
         
         if wait_for_completion:
             logger.info("⏳ Tunggu 10 detik untuk pintu menutup otomatis...")
@@ -169,19 +475,19 @@ class ESP32SerialController:
             True jika berhasil, False jika gagal
         """
         logger.info("🔒 Menutup pintu...")
-        responses = self.send_and_read('pintu=TUTUP', lines=3)
+        responses = self.request('pintu=TUTUP', expect='TUTUP PINTU')
         return len(responses) > 0
     
     def test_led(self) -> bool:
         """Test LED blink"""
         logger.info("🧪 Test LED...")
-        responses = self.send_and_read('test=LED', lines=2)
+        responses = self.request('test=LED', expect='Test LED')
         return len(responses) > 0
     
     def test_relay(self) -> bool:
         """Test Relay ON 2 detik"""
         logger.info("🧪 Test RELAY...")
-        responses = self.send_and_read('test=RELAY', lines=2)
+        responses = self.request('test=RELAY', expect='Test RELAY')
         return len(responses) > 0
     
     def get_status(self) -> dict:
@@ -191,7 +497,7 @@ class ESP32SerialController:
         Returns:
             Dict berisi status {'led': 'ON'/'OFF', 'relay': 'ON'/'OFF'}
         """
-        responses = self.send_and_read('status', lines=5)
+        responses = self.request('status')
         status = {'led': 'UNKNOWN', 'relay': 'UNKNOWN'}
         
         for line in responses:
@@ -0,0 +1,192 @@
+"""
+=============================================================
+Server-Sent Events Push Channel
+=============================================================
+Pengganti polling setInterval ke /terakhir dan /serial_status dari
+setiap dashboard. Server mengirim event HANYA saat nilainya berubah,
+lewat satu koneksi /events per dashboard.
+
+  - publish(event, data): dikirim ke semua client jika berbeda dari
+    nilai terakhir event tersebut (atau key-nya berbeda)
+  - watch(event, fn): satu thread server membaca fn() tiap interval
+    (baca memori, murah) dan publish jika berubah — 10 dashboard
+    tetap 0 request polling
+  - Client baru langsung menerima nilai terakhir setiap event
+  - Heartbeat (komentar SSE) saat idle supaya proxy tidak memutus
+    koneksi dan client yang sudah pergi terdeteksi
+  - Per client hanya nilai terbaru per event yang disimpan (client
+    lambat tidak menumpuk antrian)
+
+Penggunaan:
+    from event_stream import EventStream
+
+    events = EventStream()
+    events.watch("recognition", lambda: {"nama": last_name}, key=lambda d: d["nama"])
+
+    @app.route('/events')
+    def events_feed():
+        return Response(events.stream(), mimetype='text/event-stream')
+"""
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class EventSubscriber:
+    """Mailbox satu client: nilai terbaru per event yang belum terkirim"""
+
+    def __init__(self):
+        self.pending = OrderedDict()
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def put(self, event: str, data):
+        with self.condition:
+            self.pending.pop(event, None)  # Urutan = perubahan terakhir
+            self.pending[event] = data
+            self.condition.notify()
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def wait(self, timeout: float):
+        """Ambil semua event yang tertunda (list kosong = timeout, None = ditutup)"""
+        with self.condition:
+            if not self.pending and not self.closed:
+                self.condition.wait(timeout)
+            if self.closed:
+                return None
+            events = list(self.pending.items())
+            self.pending.clear()
+            return events
+
+
+class EventStream:
+    """
+    Broadcaster SSE untuk semua dashboard
+    """
+
+    def __init__(self, heartbeat: float = 15.0, interval: float = 0.25, retry_ms: int = 3000):
+        """
+        Args:
+            heartbeat: Kirim heartbeat jika tidak ada event selama N detik
+            interval: Jeda antar pengecekan watch() (detik)
+            retry_ms: Jeda reconnect EventSource di browser (ms)
+        """
+        self.heartbeat = heartbeat
+        self.interval = interval
+        self.retry_ms = retry_ms
+
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.latest = OrderedDict()  # event → data terakhir
+        self.keys = {}               # event → key pembanding
+        self.watchers = []
+        self.watch_thread = None
+
+        # Statistik
+        self.published = 0
+        self.suppressed = 0
+
+    def publish(self, event: str, data, key=None) -> bool:
+        """
+        Kirim event ke semua client jika berubah
+
+        Args:
+            event: Nama event SSE
+            data: Payload (JSON-serializable)
+            key: Pembanding perubahan (default: data itu sendiri)
+
+        Returns:
+            True jika event dikirim, False jika sama dengan sebelumnya
+        """
+        key = data if key is None else key
+        with self.lock:
+            if event in self.keys and self.keys[event] == key:
+                self.suppressed += 1
+                return False
+            self.keys[event] = key
+            self.latest[event] = data
+            self.published += 1
+            subscribers = list(self.subscribers)
+
+        for subscriber in subscribers:
+            subscriber.put(event, data)
+        return True
+
+    def watch(self, event: str, fn: Callable[[], object], key: Optional[Callable[[object], object]] = None):
+        """Publish fn() setiap kali hasilnya berubah (dicek tiap self.interval detik)"""
+        with self.lock:
+            self.watchers.append((event, fn, key))
+            if self.watch_thread is None:
+                self.watch_thread = threading.Thread(target=self._watch_loop, name="event-stream-watch", daemon=True)
+                self.watch_thread.start()
+
+    def _watch_loop(self):
+        while True:
+            with self.lock:
+                watchers = list(self.watchers)
+            for event, fn, key in watchers:
+                try:
+                    data = fn()
+                    self.publish(event, data, key(data) if key else None)
+                except Exception as e:
+                    logger.warning(f"⚠️  Event {event} gagal dibaca: {e}")
+            time.sleep(self.interval)
+
+    def subscribe(self) -> EventSubscriber:
+        subscriber = EventSubscriber()
+        with self.lock:
+            self.subscribers.add(subscriber)
+            # Client baru langsung dapat keadaan terakhir
+            for event, data in self.latest.items():
+                subscriber.pending[event] = data
+        return subscriber
+
+    def unsubscribe(self, subscriber: EventSubscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+        subscriber.close()
+
+    def close(self):
+        """Tutup semua stream (shutdown)"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+            self.subscribers.clear()
+        for subscriber in subscribers:
+            subscriber.close()
+
+    def stream(self):
+        """Generator untuk Flask Response(mimetype='text/event-stream')"""
+        subscriber = self.subscribe()
+        try:
+            yield f"retry: {self.retry_ms}\n\n"
+            while True:
+                events = subscriber.wait(self.heartbeat)
+                if events is None:
+                    return
+                if not events:
+                    yield ": heartbeat\n\n"
+                    continue
+                for event, data in events:
+                    yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+
+    def snapshot(self) -> dict:
+        """Statistik untuk /stats"""
+        with self.lock:
+            return {
+                "clients": len(self.subscribers),
+                "published": self.published,
+                "suppressed": self.suppressed,
+                "events": list(self.latest.keys()),
+            }
@@ -0,0 +1,272 @@
+"""
+=============================================================
+Face Gallery — Vectorized Matching
+=============================================================
+Menyimpan semua known face encodings sebagai satu matrix float32
+kontigu (N x 128) beserta norm kuadrat yang sudah dihitung, lalu
+mencocokkan SEMUA wajah dalam satu frame sekaligus (satu operasi
+matrix), bukan face_distance() per wajah yang membangun ulang array
+float64 dari list Python setiap kali dipanggil.
+
+Jarak yang dihasilkan sama dengan face_recognition.face_distance
+(euclidean), dihitung dengan ||a||² + ||b||² - 2·a·b.
+
+Penggunaan:
+    from face_gallery import FaceGallery
+
+    gallery = FaceGallery(known_face_encodings, known_face_names)
+    for index, distance, name in gallery.match(face_encodings, tolerance=0.5):
+        ...
+"""
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+UNKNOWN_NAME = "Tidak Dikenal"
+
+
+def pairwise_distances(queries: np.ndarray, matrix: np.ndarray, sq_norms: np.ndarray) -> np.ndarray:
+    """
+    Jarak euclidean (M x N) antara queries (M x D) dan matrix (N x D)
+
+    Args:
+        queries: Array float32 M x D
+        matrix: Array float32 N x D
+        sq_norms: Norm kuadrat setiap baris matrix (panjang N)
+    """
+    q_sq = np.einsum('ij,ij->i', queries, queries)
+    d2 = q_sq[:, None] + sq_norms[None, :] - 2.0 * (queries @ matrix.T)
+    np.maximum(d2, 0.0, out=d2)
+    return np.sqrt(d2, out=d2)
+
+
+class FaceGallery:
+    """
+    Matrix encoding wajah yang dikenal + nama per baris
+    """
+
+    def __init__(self, encodings: Sequence = (), names: Sequence[str] = ()):
+        """
+        Args:
+            encodings: List/array encoding wajah (masing-masing 128 dimensi)
+            names: Nama orang untuk setiap encoding (urutan sama)
+        """
+        if len(encodings) != len(names):
+            raise ValueError("Jumlah encodings dan names harus sama")
+
+        if len(encodings):
+            self.matrix = np.ascontiguousarray(np.asarray(encodings, dtype=np.float32))
+        else:
+            self.matrix = np.empty((0, 128), dtype=np.float32)
+        self.sq_norms = np.einsum('ij,ij->i', self.matrix, self.matrix)
+        self.names = list(names)
+        self.index = None  # Index opsional (mis. PrototypeIndex), None = brute-force
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def distances(self, queries) -> np.ndarray:
+        """
+        Hitung jarak euclidean semua query ke semua encoding gallery
+
+        Args:
+            queries: Array (M x 128) encoding wajah dari frame
+
+        Returns:
+            Array (M x N) float32
+        """
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, self.matrix.shape[1])
+        return pairwise_distances(q, self.matrix, self.sq_norms)
+
+    def nearest(self, queries) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cari encoding terdekat untuk setiap query (exact / brute-force)
+
+        Returns:
+            (indices, distances) — masing-masing array panjang M
+        """
+        d = self.distances(queries)
+        idx = np.argmin(d, axis=1)
+        return idx, d[np.arange(d.shape[0]), idx]
+
+    def match(self, queries, tolerance: float = 0.5) -> List[Tuple[int, float, str]]:
+        """
+        Cocokkan semua wajah dalam satu frame dengan gallery
+
+        Args:
+            queries: Encoding wajah dari frame (list atau array M x 128)
+            tolerance: Jarak maksimum untuk dianggap cocok (FACE_TOLERANCE)
+
+        Returns:
+            List (best_index, distance, name) per wajah. Jika gallery kosong
+            index = -1 dan distance = 1.0; jika di atas tolerance name
+            = "Tidak Dikenal".
+        """
+        if len(queries) == 0:
+            return []
+        if len(self) == 0:
+            return [(-1, 1.0, UNKNOWN_NAME) for _ in range(len(queries))]
+
+        if self.index is not None:
+            idx, dist = self.index.search(queries, tolerance)
+        else:
+            idx, dist = self.nearest(queries)
+        results = []
+        for i, d in zip(idx.tolist(), dist.tolist()):
+            name = self.names[i] if d < tolerance else UNKNOWN_NAME
+            results.append((i, d, name))
+        return results
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    K-means sederhana (init farthest-point, deterministik)
+
+    Args:
+        vectors: Array float32 N x D
+        k: Jumlah cluster
+        iterations: Maksimum iterasi Lloyd
+
+    Returns:
+        (labels per vector, centers k x D)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    k = max(1, min(k, len(vectors)))
+    if k == 1:
+        return np.zeros(len(vectors), dtype=np.intp), vectors.mean(axis=0, keepdims=True)
+
+    sq_norms = np.einsum('ij,ij->i', vectors, vectors)
+    chosen = [0]
+    min_d = pairwise_distances(vectors[:1], vectors, sq_norms)[0]
+    for _ in range(1, k):
+        chosen.append(int(np.argmax(min_d)))
+        np.minimum(min_d, pairwise_distances(vectors[chosen[-1:]], vectors, sq_norms)[0], out=min_d)
+    centers = vectors[chosen].copy()
+
+    labels = None
+    for _ in range(iterations):
+        c_sq = np.einsum('ij,ij->i', centers, centers)
+        new_labels = np.argmin(pairwise_distances(vectors, centers, c_sq), axis=1)
+        if labels is not None and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        for c in range(k):
+            members = vectors[labels == c]
+            if len(members):
+                centers[c] = members.mean(axis=0)
+    return labels, centers
+
+
+class PrototypeIndex:
+    """
+    Index dua tahap: prototype per orang → cek ulang encoding lengkap
+
+    Tahap 1: query dibandingkan dengan 1..k prototype (centroid k-means)
+    per orang. Tahap 2: hanya top_k orang terdekat yang dicek ke semua
+    encoding mereka. Setiap prototype menyimpan radius (jarak member
+    terjauh), sehingga ||q - c|| - radius adalah batas bawah jarak ke
+    semua member-nya. Orang lain hanya dicek jika batas bawahnya masih
+    di bawah min(jarak terbaik, tolerance) — hasil akhirnya sama dengan
+    brute-force argmin untuk semua wajah yang cocok di bawah tolerance.
+    """
+
+    # Slack untuk error pembulatan float32 pada batas bawah
+    EPS = 1e-4
+
+    def __init__(self, gallery: FaceGallery, prototypes_per_person: int = 1, top_k: int = 3):
+        """
+        Args:
+            gallery: FaceGallery sumber
+            prototypes_per_person: Jumlah prototype (cluster) per orang
+            top_k: Jumlah orang kandidat yang dicek penuh di tahap 2
+        """
+        self.gallery = gallery
+        self.top_k = max(1, top_k)
+
+        # Urutkan baris gallery per orang supaya encoding satu orang
+        # berupa slice kontigu (view, tanpa copy saat search)
+        names = np.array(gallery.names, dtype=object)
+        self.person_names = sorted(set(gallery.names))
+        groups = [np.flatnonzero(names == name) for name in self.person_names]
+        order = np.concatenate(groups) if groups else np.empty(0, dtype=np.intp)
+        self.row_ids = order
+        self.matrix = np.ascontiguousarray(gallery.matrix[order])
+        self.sq_norms = gallery.sq_norms[order]
+
+        self.person_bounds = []  # (start, end) di self.matrix
+        centroids, radii, proto_starts = [], [], []
+        start = 0
+        for rows in groups:
+            end = start + len(rows)
+            vectors = self.matrix[start:end]
+            labels, _ = kmeans(vectors, prototypes_per_person)
+
+            proto_starts.append(len(centroids))
+            for c in np.unique(labels):
+                members = vectors[labels == c]
+                center = members.mean(axis=0)
+                centroids.append(center)
+                radii.append(np.sqrt(np.sum((members - center) ** 2, axis=1)).max())
+
+            self.person_bounds.append((start, end))
+            start = end
+
+        self.centroids = np.asarray(centroids, dtype=np.float32).reshape(-1, gallery.matrix.shape[1])
+        self.centroid_sq = np.einsum('ij,ij->i', self.centroids, self.centroids)
+        self.radii = np.asarray(radii, dtype=np.float32)
+        self.proto_starts = np.asarray(proto_starts, dtype=np.intp)
+
+    def _scan_person(self, q: np.ndarray, p: int) -> Tuple[int, float]:
+        start, end = self.person_bounds[p]
+        d = pairwise_distances(q, self.matrix[start:end], self.sq_norms[start:end])[0]
+        j = int(np.argmin(d))
+        return start + j, float(d[j])
+
+    def search(self, queries, tolerance: float = 0.5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cari encoding terdekat untuk setiap query
+
+        Returns:
+            (indices ke gallery asli, distances). Untuk query tanpa match
+            di bawah tolerance, hasil bisa bukan minimum global.
+        """
+        q = np.asarray(queries, dtype=np.float32).reshape(-1, self.matrix.shape[1])
+        n_people = len(self.person_names)
+        indices = np.full(len(q), -1, dtype=np.intp)
+        distances = np.full(len(q), np.inf, dtype=np.float32)
+        if n_people == 0:
+            return indices, distances
+
+        # Tahap 1: jarak ke semua prototype → per orang
+        dc = pairwise_distances(q, self.centroids, self.centroid_sq)
+        person_dc = np.minimum.reduceat(dc, self.proto_starts, axis=1)
+        person_lb = np.minimum.reduceat(dc - self.radii - self.EPS, self.proto_starts, axis=1)
+
+        top_k = min(self.top_k, n_people)
+        for i in range(len(q)):
+            qi = q[i:i + 1]
+            best_row, best = -1, np.inf
+
+            # Tahap 2: cek penuh top_k orang terdekat
+            candidates = np.argpartition(person_dc[i], top_k - 1)[:top_k]
+            for p in candidates:
+                row, d = self._scan_person(qi, p)
+                if d < best:
+                    best_row, best = row, d
+
+            # Jaminan exact: orang lain yang batas bawahnya masih < bound
+            bound = min(best, tolerance)
+            rest = np.flatnonzero(person_lb[i] < bound)
+            rest = rest[~np.isin(rest, candidates)]
+            for p in rest[np.argsort(person_lb[i][rest])]:
+                if person_lb[i][p] >= bound:
+                    break
+                row, d = self._scan_person(qi, p)
+                if d < best:
+                    best_row, best = row, d
+                    bound = min(best, tolerance)
+
+            indices[i] = self.row_ids[best_row]
+            distances[i] = best
+        return indices, distances
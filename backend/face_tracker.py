@@ -0,0 +1,208 @@
+"""
+=============================================================
+Face Tracker (IoU + centroid)
+=============================================================
+Tracker ringan untuk menghubungkan kotak wajah antar frame dengan
+track ID. Identitas (nama + jarak) disimpan di track, sehingga
+face_encodings (langkah paling mahal) hanya dijalankan jika:
+
+  - track baru,
+  - kotak wajah bergeser jauh sejak terakhir di-encode, atau
+  - sudah lewat interval re-verify.
+
+Format kotak sama dengan face_recognition: (top, right, bottom, left).
+
+Penggunaan:
+    from face_tracker import FaceTracker
+
+    tracker = FaceTracker(reverify_interval=3.0)
+    tracks = tracker.update(face_locations)
+    for track in tracks:
+        if tracker.needs_encoding(track):
+            ...  # encode + match
+            tracker.assign(track, name, distance)
+"""
+
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Sequence, Tuple
+
+UNKNOWN_NAME = "Tidak Dikenal"
+
+Box = Tuple[int, int, int, int]
+
+
+def box_iou(a: Box, b: Box) -> float:
+    """Intersection-over-union dua kotak (top, right, bottom, left)"""
+    top, right = max(a[0], b[0]), min(a[1], b[1])
+    bottom, left = min(a[2], b[2]), max(a[3], b[3])
+    inter = max(0, right - left) * max(0, bottom - top)
+    area_a = (a[1] - a[3]) * (a[2] - a[0])
+    area_b = (b[1] - b[3]) * (b[2] - b[0])
+    union = area_a + area_b - inter
+    return inter / union if union > 0 else 0.0
+
+
+def box_center(box: Box) -> Tuple[float, float]:
+    return (box[1] + box[3]) / 2.0, (box[0] + box[2]) / 2.0
+
+
+class Track:
+    """
+    Satu wajah yang diikuti antar frame
+    """
+
+    def __init__(self, track_id: int, box: Box, now: float):
+        self.id = track_id
+        self.box = box
+        self.name = UNKNOWN_NAME
+        self.distance = 1.0
+        self.created_at = now
+        self.last_seen = now
+        self.missed = 0
+        self.encoded_box = None  # Kotak saat terakhir di-encode
+        self.encoded_at = None
+
+
+class FaceTracker:
+    """
+    Menghubungkan deteksi wajah antar frame dan menyimpan identitasnya
+    """
+
+    def __init__(
+        self,
+        min_iou: float = 0.3,
+        max_missed: int = 5,
+        reverify_interval: float = 3.0,
+        unknown_reverify_interval: float = 1.0,
+        reencode_iou: float = 0.5,
+    ):
+        """
+        Args:
+            min_iou: IoU minimum agar deteksi dianggap track yang sama
+            max_missed: Track dihapus setelah tidak terlihat N frame diproses
+            reverify_interval: Detik sebelum wajah yang dikenal di-encode ulang
+            unknown_reverify_interval: Detik sebelum wajah "Tidak Dikenal" di-encode ulang
+            reencode_iou: Encode ulang jika IoU kotak sekarang vs kotak saat
+                          terakhir di-encode di bawah nilai ini (wajah bergeser)
+        """
+        self.min_iou = min_iou
+        self.max_missed = max_missed
+        self.reverify_interval = reverify_interval
+        self.unknown_reverify_interval = unknown_reverify_interval
+        self.reencode_iou = reencode_iou
+
+        self.tracks = []
+        self.next_id = 1
+
+        # Statistik encode yang dihemat
+        self.encodes_done = 0
+        self.encodes_saved = 0
+        self.saved_events = deque()  # (timestamp, jumlah saved) untuk rate
+        self.stats_lock = threading.Lock()
+
+    def update(self, boxes: Sequence[Box], now: Optional[float] = None) -> List[Track]:
+        """
+        Cocokkan deteksi frame ini dengan track yang ada
+
+        Args:
+            boxes: face_locations dari frame ini
+
+        Returns:
+            List Track, satu per kotak (urutan sama dengan boxes)
+        """
+        now = time.time() if now is None else now
+        assigned = [None] * len(boxes)
+        free_tracks = set(range(len(self.tracks)))
+
+        # 1) Greedy IoU tertinggi
+        pairs = []
+        for ti, track in enumerate(self.tracks):
+            for bi, box in enumerate(boxes):
+                iou = box_iou(track.box, box)
+                if iou >= self.min_iou:
+                    pairs.append((iou, ti, bi))
+        for _, ti, bi in sorted(pairs, reverse=True):
+            if ti in free_tracks and assigned[bi] is None:
+                assigned[bi] = self.tracks[ti]
+                free_tracks.discard(ti)
+
+        # 2) Sisa: centroid terdekat (gerakan cepat / frame di-skip)
+        for bi, box in enumerate(boxes):
+            if assigned[bi] is not None:
+                continue
+            cx, cy = box_center(box)
+            size = max(box[1] - box[3], box[2] - box[0], 1)
+            best, best_d = None, None
+            for ti in free_tracks:
+                tx, ty = box_center(self.tracks[ti].box)
+                d = ((cx - tx) ** 2 + (cy - ty) ** 2) ** 0.5
+                if d < size and (best_d is None or d < best_d):
+                    best, best_d = ti, d
+            if best is not None:
+                assigned[bi] = self.tracks[best]
+                free_tracks.discard(best)
+
+        # 3) Update track yang cocok, buat track baru untuk sisanya
+        for bi, box in enumerate(boxes):
+            track = assigned[bi]
+            if track is None:
+                track = Track(self.next_id, box, now)
+                self.next_id += 1
+                self.tracks.append(track)
+                assigned[bi] = track
+            track.box = box
+            track.last_seen = now
+            track.missed = 0
+
+        # 4) Track yang tidak terlihat
+        for ti in free_tracks:
+            self.tracks[ti].missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+
+        return assigned
+
+    def needs_encoding(self, track: Track, now: Optional[float] = None) -> bool:
+        """Apakah track ini perlu face_encodings di frame ini"""
+        now = time.time() if now is None else now
+        if track.encoded_at is None:
+            return True
+        if box_iou(track.box, track.encoded_box) < self.reencode_iou:
+            return True
+        interval = self.reverify_interval if track.name != UNKNOWN_NAME else self.unknown_reverify_interval
+        return now - track.encoded_at >= interval
+
+    def assign(self, track: Track, name: str, distance: float, now: Optional[float] = None):
+        """Simpan hasil encode + match ke track"""
+        now = time.time() if now is None else now
+        track.name = name
+        track.distance = distance
+        track.encoded_box = track.box
+        track.encoded_at = now
+
+    def record(self, encoded: int, saved: int, now: Optional[float] = None):
+        """Catat jumlah wajah yang di-encode vs yang dilewati di satu frame"""
+        now = time.time() if now is None else now
+        with self.stats_lock:
+            self.encodes_done += encoded
+            self.encodes_saved += saved
+            if saved:
+                self.saved_events.append((now, saved))
+
+    def saved_per_second(self, window: float = 10.0, now: Optional[float] = None) -> float:
+        """Rata-rata encode yang dihemat per detik dalam `window` detik terakhir"""
+        now = time.time() if now is None else now
+        with self.stats_lock:
+            while self.saved_events and now - self.saved_events[0][0] > window:
+                self.saved_events.popleft()
+            return sum(n for _, n in self.saved_events) / window
+
+    def snapshot(self) -> dict:
+        """Statistik tracker untuk /stats"""
+        return {
+            "active_tracks": len(self.tracks),
+            "encodes_done": self.encodes_done,
+            "encodes_saved": self.encodes_saved,
+            "encodes_saved_per_sec": round(self.saved_per_second(), 2),
+        }
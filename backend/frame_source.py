@@ -0,0 +1,209 @@
+"""
+=============================================================
+Pluggable Frame Sources (camera / video file / image folder)
+=============================================================
+Pengganti cv2.VideoCapture(0) yang di-hardcode. Pipeline bisa
+dijalankan tanpa webcam (headless / CI) dan hasilnya bisa diulang:
+
+  - Camera      : "0", "1", ... atau URL (rtsp://, http://)
+  - File video  : "rekaman.mp4"
+  - Folder      : "../images/Galih_Rakasiwi/" atau "../images/" (termasuk
+                  subfolder, gambar diurutkan berdasarkan path)
+
+FPS untuk file/folder:
+  - None → file video diputar sesuai FPS aslinya, folder = 0
+  - 0    → secepatnya, TANPA drop frame (CameraStream menunggu
+           consumer selesai sebelum frame berikutnya → deterministik)
+  - N    → N frame per detik (seperti camera, frame bisa di-skip
+           jika consumer lambat)
+
+Semua source punya antarmuka yang sama dengan cv2.VideoCapture
+(isOpened / read / set / get / release), jadi CameraStream dan
+app_usb_minimal.py tidak perlu tahu jenis source-nya.
+
+Pilih source lewat command line atau environment:
+    python app_usb_improved.py --source ../images/Galih_Rakasiwi --source-fps 0
+    CAMERA_SOURCE=rekaman.mp4 CAMERA_FPS=15 python app_usb.py
+
+Penggunaan:
+    from frame_source import open_source, source_options
+
+    options = source_options()                  # --source / --source-fps / --loop
+    capture = open_source(options.source, options.fps, options.loop)
+    success, frame = capture.read()
+"""
+
+import argparse
+import logging
+import os
+import time
+from collections import namedtuple
+from typing import List, Optional
+
+import cv2
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+SourceOptions = namedtuple("SourceOptions", ["source", "fps", "loop"])
+
+
+def parse_source(spec):
+    """"0" → 0 (index camera), selain itu path/URL apa adanya"""
+    if isinstance(spec, str) and spec.strip().isdigit():
+        return int(spec)
+    return spec
+
+
+def source_options(argv: Optional[List[str]] = None, default=0) -> SourceOptions:
+    """
+    Baca --source / --source-fps / --loop dari command line
+    (default dari env CAMERA_SOURCE / CAMERA_FPS / CAMERA_LOOP)
+
+    Argumen lain di command line diabaikan, jadi aman dipanggil saat import.
+    """
+    fps = os.environ.get("CAMERA_FPS")
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--source", default=os.environ.get("CAMERA_SOURCE", default),
+                        help="Index camera, file video, atau folder gambar")
+    parser.add_argument("--source-fps", dest="fps", type=float, default=float(fps) if fps else None,
+                        help="FPS file/folder (0 = secepatnya tanpa drop frame)")
+    parser.add_argument("--loop", action="store_true", default=os.environ.get("CAMERA_LOOP") == "1",
+                        help="Ulangi file/folder dari awal saat habis")
+    args, _ = parser.parse_known_args(argv)
+    return SourceOptions(parse_source(args.source), args.fps, args.loop)
+
+
+def describe_source(source) -> str:
+    if isinstance(source, int):
+        return f"camera {source}"
+    if os.path.isdir(str(source)):
+        return f"folder {source}"
+    return f"file {source}" if os.path.isfile(str(source)) else str(source)
+
+
+class _PacedSource:
+    """Dasar source file/folder: pacing FPS + antarmuka cv2.VideoCapture"""
+
+    def __init__(self, fps: Optional[float], loop: bool):
+        self.fps = fps
+        self.loop = loop
+        # fps=0: secepatnya, CameraStream tidak boleh menimpa frame yang belum dibaca
+        self.lossless = fps == 0
+        self.next_at = None
+        self.frames_read = 0
+
+    def _pace(self):
+        if not self.fps:
+            return
+        now = time.perf_counter()
+        if self.next_at is None or now - self.next_at > 1.0:
+            self.next_at = now  # Start / consumer tertinggal jauh → jangan burst
+        elif self.next_at > now:
+            time.sleep(self.next_at - now)
+        self.next_at += 1.0 / self.fps
+
+    def set(self, prop, value) -> bool:
+        return False  # CAP_PROP_BUFFERSIZE dst. tidak berlaku
+
+    def get(self, prop) -> float:
+        if prop == cv2.CAP_PROP_FPS:
+            return float(self.fps or 0)
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.frames_read)
+        return 0.0
+
+
+class VideoFileSource(_PacedSource):
+    """File video (mp4/avi/...) dengan FPS tetap, FPS asli, atau secepatnya"""
+
+    def __init__(self, path: str, fps: Optional[float] = None, loop: bool = False):
+        self.path = path
+        self.capture = cv2.VideoCapture(path)
+        if fps is None and self.capture.isOpened():
+            fps = self.capture.get(cv2.CAP_PROP_FPS) or 0.0  # FPS asli (0 jika tidak diketahui)
+        super().__init__(fps, loop)
+
+    def isOpened(self) -> bool:
+        return self.capture.isOpened()
+
+    def read(self):
+        self._pace()
+        success, frame = self.capture.read()
+        if not success and self.loop and self.frames_read:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self.capture.read()
+        if success:
+            self.frames_read += 1
+        return success, frame
+
+    def get(self, prop) -> float:
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return self.capture.get(prop)
+        return super().get(prop)
+
+    def release(self):
+        self.capture.release()
+
+
+class ImageFolderSource(_PacedSource):
+    """Folder gambar (mis. images/Galih_Rakasiwi/) diputar sebagai video"""
+
+    def __init__(self, path: str, fps: Optional[float] = None, loop: bool = False):
+        super().__init__(0.0 if fps is None else fps, loop)
+        self.path = path
+        self.files = []
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            self.files.extend(os.path.join(root, name) for name in sorted(names)
+                              if name.lower().endswith(IMAGE_EXTENSIONS))
+        self.index = 0
+
+    def isOpened(self) -> bool:
+        return bool(self.files)
+
+    def read(self):
+        self._pace()
+        while True:
+            if self.index >= len(self.files):
+                if not self.loop or not self.files:
+                    return False, None
+                self.index = 0
+            path = self.files[self.index]
+            self.index += 1
+            frame = cv2.imread(path)
+            if frame is not None:
+                self.frames_read += 1
+                return True, frame
+            logger.warning(f"⚠️  Gambar tidak bisa dibaca: {path}")
+            self.files.remove(path)
+            self.index -= 1
+
+    def get(self, prop) -> float:
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.files))
+        return super().get(prop)
+
+    def release(self):
+        self.files = []
+
+
+def open_source(source=0, fps: Optional[float] = None, loop: bool = False):
+    """
+    Buka frame source sesuai jenisnya
+
+    Args:
+        source: Index camera, path file video, path folder gambar, atau URL
+        fps: FPS untuk file/folder (None = asli, 0 = secepatnya tanpa drop frame)
+        loop: Ulangi file/folder dari awal saat habis
+
+    Returns:
+        Object dengan antarmuka cv2.VideoCapture (cek isOpened())
+    """
+    source = parse_source(source)
+    if isinstance(source, str) and os.path.isdir(source):
+        return ImageFolderSource(source, fps, loop)
+    if isinstance(source, str) and os.path.isfile(source):
+        return VideoFileSource(source, fps, loop)
+    return cv2.VideoCapture(source)
@@ -0,0 +1,149 @@
+"""
+=============================================================
+MJPEG Broadcast Hub
+=============================================================
+Frame hasil anotasi di-encode JPEG SEKALI oleh pipeline, lalu
+bytes multipart yang sama dibagikan ke semua client /video_feed.
+
+Setiap client punya mailbox 1 slot: frame baru selalu menimpa
+frame lama yang belum terkirim. Client lambat otomatis melewati
+frame (drop) dan tidak pernah membangun antrian/backlog, dan tidak
+memperlambat client lain maupun pipeline.
+
+Penggunaan:
+    from mjpeg_hub import MJPEGHub
+
+    hub = MJPEGHub()
+    hub.publish(chunk)               # dari pipeline thread
+    Response(hub.stream(max_fps=10), mimetype=...)  # per client
+"""
+
+import threading
+import time
+from typing import Iterator, Optional
+
+
+def multipart_chunk(jpeg_bytes: bytes) -> bytes:
+    """Bungkus JPEG menjadi satu part multipart/x-mixed-replace (boundary=frame)"""
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + jpeg_bytes + b'\r\n')
+
+
+class Subscriber:
+    """
+    Mailbox 1 slot untuk satu client stream
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition()
+        self.chunk = None
+        self.closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def offer(self, chunk: bytes):
+        """Taruh frame baru, timpa frame lama yang belum diambil"""
+        with self.condition:
+            if self.chunk is not None:
+                self.dropped += 1
+            self.chunk = chunk
+            self.condition.notify()
+
+    def take(self, timeout: float = 5.0) -> Optional[bytes]:
+        """
+        Ambil frame dari mailbox (tunggu jika kosong)
+
+        Returns:
+            Bytes multipart atau None jika timeout / hub ditutup
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.chunk is not None or self.closed, timeout)
+            chunk, self.chunk = self.chunk, None
+            if chunk is not None:
+                self.delivered += 1
+            return chunk
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+
+class MJPEGHub:
+    """
+    Broadcast satu stream MJPEG ke banyak client
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.frames_published = 0
+        self.dropped_total = 0  # Akumulasi drop dari client yang sudah disconnect
+
+    def publish(self, chunk: bytes):
+        """
+        Bagikan satu frame (sudah berbentuk multipart chunk) ke semua client
+        """
+        with self.lock:
+            self.frames_published += 1
+            subscribers = list(self.subscribers)
+        for sub in subscribers:
+            sub.offer(chunk)
+
+    def subscribe(self) -> Subscriber:
+        sub = Subscriber()
+        with self.lock:
+            self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self.lock:
+            if sub in self.subscribers:
+                self.subscribers.discard(sub)
+                self.dropped_total += sub.dropped
+        sub.close()
+
+    def close(self):
+        """Tutup semua client (mis. camera berhenti)"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+        for sub in subscribers:
+            sub.close()
+
+    def stream(self, max_fps: Optional[float] = None, idle_timeout: float = 10.0) -> Iterator[bytes]:
+        """
+        Generator untuk satu client Flask Response
+
+        Args:
+            max_fps: Batas frame per detik untuk client ini (None = ikut pipeline)
+            idle_timeout: Putus jika tidak ada frame baru selama ini (detik)
+        """
+        sub = self.subscribe()
+        interval = 1.0 / max_fps if max_fps and max_fps > 0 else 0.0
+        try:
+            while True:
+                chunk = sub.take(timeout=idle_timeout)
+                if chunk is None:
+                    break
+                sent_at = time.monotonic()
+                yield chunk
+
+                # FPS cap: frame yang datang selama tidur akan di-drop (ditimpa)
+                if interval:
+                    remaining = interval - (time.monotonic() - sent_at)
+                    if remaining > 0:
+                        time.sleep(remaining)
+        finally:
+            self.unsubscribe(sub)
+
+    def snapshot(self) -> dict:
+        """Statistik hub untuk /stats"""
+        with self.lock:
+            subscribers = list(self.subscribers)
+            dropped = self.dropped_total
+            published = self.frames_published
+        return {
+            "clients": len(subscribers),
+            "frames_published": published,
+            "frames_dropped": dropped + sum(sub.dropped for sub in subscribers),
+        }
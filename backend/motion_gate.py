@@ -0,0 +1,110 @@
+"""
+=============================================================
+Motion Gate
+=============================================================
+Cek gerakan yang sangat murah sebelum menjalankan deteksi wajah
+HOG/CNN. Frame diperkecil (lebar ~160 px), grayscale + blur, lalu
+dibandingkan dengan background (running average). Jika fraksi pixel
+yang berubah di bawah threshold, scene dianggap kosong/diam dan
+face_locations tidak perlu dijalankan.
+
+force_interval membuka gate sesekali walau scene diam (orang yang
+berdiri sangat diam bisa terserap ke background). Default-nya jarang
+(60 detik) supaya kiosk yang idle benar-benar idle; 0 = nonaktif.
+
+Penggunaan:
+    from motion_gate import MotionGate
+
+    gate = MotionGate(threshold=0.01)
+    if gate.check(frame) or tracker_aktif:
+        ...  # jalankan deteksi wajah
+"""
+
+import threading
+import time
+from typing import Optional
+
+import cv2
+
+
+class MotionGate:
+    """
+    Deteksi gerakan berbasis frame-difference terhadap background
+    """
+
+    def __init__(self, threshold: float = 0.01, pixel_delta: int = 25, width: int = 160,
+                 learning_rate: float = 0.05, force_interval: float = 60.0):
+        """
+        Args:
+            threshold: Fraksi pixel (0..1) yang harus berubah agar dianggap ada gerakan
+            pixel_delta: Selisih intensitas minimum (0..255) agar pixel dianggap berubah
+            width: Lebar frame kecil untuk perbandingan
+            learning_rate: Kecepatan background mengikuti scene (accumulateWeighted)
+            force_interval: Paksa gate terbuka minimal sekali per N detik tanpa
+                            gerakan (0 = tidak). Setiap pembukaan = satu deteksi penuh
+        """
+        self.threshold = threshold
+        self.pixel_delta = pixel_delta
+        self.width = width
+        self.learning_rate = learning_rate
+        self.force_interval = force_interval
+
+        self.background = None
+        self.last_open = 0.0
+        self.last_score = 0.0
+        self.frames_checked = 0
+        self.frames_skipped = 0
+        self.frames_forced = 0
+        self.lock = threading.Lock()
+
+    def _prepare(self, frame):
+        h, w = frame.shape[:2]
+        scale = self.width / float(w)
+        small = cv2.resize(frame, (self.width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def check(self, frame, now: Optional[float] = None) -> bool:
+        """
+        Cek apakah ada gerakan di frame ini
+
+        Returns:
+            True jika deteksi wajah perlu dijalankan
+        """
+        now = time.monotonic() if now is None else now
+        gray = self._prepare(frame)
+
+        with self.lock:
+            self.frames_checked += 1
+            if self.background is None or self.background.shape != gray.shape:
+                self.background = gray.astype("float32")
+                self.last_open = now
+                return True
+
+            diff = cv2.absdiff(gray, cv2.convertScaleAbs(self.background))
+            changed = cv2.countNonZero(cv2.threshold(diff, self.pixel_delta, 255, cv2.THRESH_BINARY)[1])
+            self.last_score = changed / float(diff.size)
+            cv2.accumulateWeighted(gray, self.background, self.learning_rate)
+
+            motion = self.last_score >= self.threshold
+            if not motion and self.force_interval and now - self.last_open >= self.force_interval:
+                motion = True
+                self.frames_forced += 1
+            if motion:
+                self.last_open = now
+            else:
+                self.frames_skipped += 1
+            return motion
+
+    def snapshot(self) -> dict:
+        """Statistik untuk /stats"""
+        with self.lock:
+            checked = self.frames_checked
+            return {
+                "threshold": self.threshold,
+                "last_score": round(self.last_score, 4),
+                "frames_checked": checked,
+                "frames_skipped": self.frames_skipped,
+                "frames_forced": self.frames_forced,
+                "skipped_ratio": round(self.frames_skipped / checked, 3) if checked else 0.0,
+            }
@@ -0,0 +1,207 @@
+"""
+=============================================================
+Persistent MQTT Door Client
+=============================================================
+Satu koneksi MQTT yang hidup terus untuk app.py, pengganti
+mqtt.Client() baru + connect + disconnect di setiap tombol ditekan
+(setiap tekan membayar handshake TCP + MQTT ke broker).
+
+  - loop_start(): network loop di background thread, keepalive jalan
+  - Reconnect otomatis (paho reconnect_delay_set, 1 → 30 detik)
+  - Publish QoS 1: ditunggu sampai PUBACK dari broker, latensi
+    publish → ack dicatat (last / avg / p95 / max)
+  - Subscribe ke topik status ESP32 (status=ONLINE/OFFLINE via last
+    will, pintu=TERBUKA / pintu=TERTUTUP, retained) sehingga keadaan
+    pintu diketahui tanpa polling
+  - Broker bisa diganti (mis. mosquitto lokal) lewat konfigurasi
+
+Penggunaan:
+    from mqtt_door import MQTTDoorClient
+
+    door = MQTTDoorClient("localhost", 1883, "fc/pintu", status_topic="fc/pintu/status")
+    door.start()
+    door.publish("pintu=BUKA")
+    print(door.snapshot())
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Optional
+
+import numpy as np
+import paho.mqtt.client as mqtt
+
+logger = logging.getLogger(__name__)
+
+
+def _failed(rc) -> bool:
+    """rc paho 1.x (int) maupun ReasonCode paho 2.x"""
+    return rc.is_failure if hasattr(rc, "is_failure") else rc != 0
+
+
+class MQTTDoorClient:
+    """
+    Client MQTT persisten untuk perintah pintu
+    """
+
+    def __init__(self, broker: str, port: int = 1883, topic: str = "fc/pintu",
+                 status_topic: Optional[str] = None, qos: int = 1, keepalive: int = 60,
+                 ack_timeout: float = 3.0, client_id: str = ""):
+        """
+        Args:
+            broker: Host broker MQTT
+            port: Port broker
+            topic: Topik perintah (harus sama dengan firmware ESP32)
+            status_topic: Topik status yang dipublish ESP32 (None = tidak subscribe)
+            qos: QoS publish perintah (1 = tunggu PUBACK)
+            keepalive: Keepalive MQTT (detik)
+            ack_timeout: Batas tunggu PUBACK per publish (detik)
+            client_id: Client ID MQTT ("" = dibuat broker)
+        """
+        self.broker = broker
+        self.port = port
+        self.topic = topic
+        self.status_topic = status_topic
+        self.qos = qos
+        self.keepalive = keepalive
+        self.ack_timeout = ack_timeout
+
+        if hasattr(mqtt, "CallbackAPIVersion"):
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id)
+        else:
+            self.client = mqtt.Client(client_id=client_id)
+        self.client.reconnect_delay_set(min_delay=1, max_delay=30)
+        self.client.on_connect = self._on_connect
+        self.client.on_disconnect = self._on_disconnect
+        self.client.on_message = self._on_message
+
+        self.lock = threading.Lock()
+        self.connected = False
+        self.started = False
+
+        # Statistik
+        self.connects = 0
+        self.published = 0
+        self.acked = 0
+        self.failed = 0
+        self.ack_latencies = deque(maxlen=200)
+        self.last_error = None
+
+        # Status pintu dari ESP32 (topik status)
+        self.door_state = None
+        self.door_state_at = None
+        self.device_online = None
+
+    def start(self):
+        """Connect (async) dan jalankan network loop di background"""
+        if self.started:
+            return
+        self.started = True
+        self.client.connect_async(self.broker, self.port, self.keepalive)
+        self.client.loop_start()
+        logger.info(f"📡 MQTT {self.broker}:{self.port} (loop_start)")
+
+    def stop(self):
+        self.client.loop_stop()
+        self.client.disconnect()
+        self.started = False
+
+    def _on_connect(self, client, userdata, flags, rc, properties=None):
+        if _failed(rc):
+            self.last_error = f"Connect ditolak broker: {rc}"
+            logger.error(f"❌ MQTT connect gagal: {rc}")
+            return
+        with self.lock:
+            self.connected = True
+            self.connects += 1
+        logger.info(f"✅ Terhubung ke broker {self.broker}:{self.port}")
+        # Subscribe ulang setiap (re)connect
+        if self.status_topic:
+            client.subscribe(self.status_topic, qos=1)
+
+    def _on_disconnect(self, client, userdata, *args):
+        with self.lock:
+            self.connected = False
+        rc = args[-2] if len(args) >= 2 else (args[0] if args else 0)
+        if _failed(rc):
+            self.last_error = f"Terputus dari broker: {rc}"
+            logger.warning(f"⚠️  MQTT terputus ({rc}), reconnect otomatis...")
+
+    def _on_message(self, client, userdata, message):
+        payload = message.payload.decode("utf-8", errors="replace").strip()
+        with self.lock:
+            if payload.startswith("status="):
+                self.device_online = payload == "status=ONLINE"
+            else:
+                self.door_state = payload
+                self.device_online = True
+            self.door_state_at = time.time()
+        logger.info(f"📥 MQTT status: {payload}")
+
+    def publish(self, payload: str) -> bool:
+        """
+        Publish perintah dan tunggu PUBACK (QoS 1)
+
+        Returns:
+            True jika broker mengkonfirmasi dalam ack_timeout
+        """
+        if not self.connected:
+            # Jangan antrikan perintah pintu untuk dikirim "nanti" saat reconnect
+            self.last_error = "Tidak terhubung ke broker MQTT"
+            with self.lock:
+                self.failed += 1
+            return False
+
+        started = time.perf_counter()
+        info = self.client.publish(self.topic, payload, qos=self.qos)
+        with self.lock:
+            self.published += 1
+
+        if info.rc != mqtt.MQTT_ERR_SUCCESS:
+            self.last_error = f"Publish gagal: {mqtt.error_string(info.rc)}"
+            with self.lock:
+                self.failed += 1
+            return False
+
+        try:
+            info.wait_for_publish(self.ack_timeout)
+        except (RuntimeError, ValueError) as e:
+            self.last_error = str(e)
+        latency = time.perf_counter() - started
+
+        with self.lock:
+            if info.is_published():
+                self.acked += 1
+                self.ack_latencies.append(latency)
+                ok = True
+            else:
+                self.failed += 1
+                self.last_error = f"Tidak ada ack untuk {payload} dalam {self.ack_timeout}s"
+                ok = False
+        logger.info(f"📡 MQTT publish: {payload} → {self.topic} ({latency * 1000:.1f} ms, ack={ok})")
+        return ok
+
+    def snapshot(self) -> dict:
+        """Statistik untuk /mqtt_status"""
+        with self.lock:
+            latencies = np.array(self.ack_latencies) * 1000
+            return {
+                "connected": self.connected,
+                "broker": f"{self.broker}:{self.port}",
+                "topic": self.topic,
+                "qos": self.qos,
+                "connects": self.connects,
+                "published": self.published,
+                "acked": self.acked,
+                "failed": self.failed,
+                "ack_last_ms": round(float(latencies[-1]), 1) if len(latencies) else None,
+                "ack_avg_ms": round(float(latencies.mean()), 1) if len(latencies) else None,
+                "ack_p95_ms": round(float(np.percentile(latencies, 95)), 1) if len(latencies) else None,
+                "ack_max_ms": round(float(latencies.max()), 1) if len(latencies) else None,
+                "door_state": self.door_state,
+                "device_online": self.device_online,
+                "state_age_s": round(time.time() - self.door_state_at, 1) if self.door_state_at else None,
+                "last_error": self.last_error,
+            }
@@ -0,0 +1,99 @@
+"""
+=============================================================
+Parallel Dataset Encoder
+=============================================================
+Encode gambar dataset wajah memakai beberapa process sekaligus
+(ProcessPoolExecutor) supaya semua core CPU terpakai saat startup.
+
+Hasil dikembalikan sebagai generator dengan URUTAN YANG SAMA seperti
+input, jadi pemanggil bisa langsung append ke known_face_encodings /
+known_face_names / known_face_files tanpa sorting ulang.
+
+Penggunaan:
+    from parallel_encoder import encode_images
+
+    for path, encoding, error in encode_images(paths, workers=4):
+        ...
+
+Catatan Windows:
+    Worker dibuat dengan metode "spawn", sehingga module utama di-import
+    ulang di setiap worker. Jangan panggil encode_images() saat import
+    di worker (cek multiprocessing.parent_process() is None).
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import face_recognition
+
+
+def default_workers() -> int:
+    """Jumlah worker default = jumlah core CPU"""
+    return os.cpu_count() or 1
+
+
+def encode_image(path: str, model: str = "hog", num_jitters: int = 1) -> Tuple[str, Optional[object], Optional[str]]:
+    """
+    Encode satu gambar (dijalankan di worker process)
+
+    Returns:
+        (path, encoding wajah pertama atau None, pesan error atau None)
+    """
+    try:
+        image = face_recognition.load_image_file(path)
+        face_locations = face_recognition.face_locations(image, model=model)
+        face_encodings = face_recognition.face_encodings(image, face_locations, num_jitters=num_jitters)
+        return path, (face_encodings[0] if face_encodings else None), None
+    except Exception as e:
+        return path, None, str(e)
+
+
+def encode_images(
+    paths: List[str],
+    model: str = "hog",
+    num_jitters: int = 1,
+    workers: Optional[int] = None,
+    progress: Optional[Callable[[int, int, float], None]] = None,
+) -> Iterator[Tuple[str, Optional[object], Optional[str]]]:
+    """
+    Encode banyak gambar secara paralel, hasil di-stream sesuai urutan input
+
+    Args:
+        paths: Daftar path gambar
+        model: Model deteksi wajah ("hog" / "cnn")
+        num_jitters: NUM_JITTERS untuk face_encodings
+        workers: Jumlah process (default: jumlah core). 1 = tanpa pool
+        progress: Callback progress(done, total, images_per_sec)
+
+    Yields:
+        (path, encoding atau None, error atau None)
+    """
+    total = len(paths)
+    if total == 0:
+        return
+
+    workers = max(1, min(workers or default_workers(), total))
+    started = time.perf_counter()
+
+    def report(done):
+        if progress:
+            elapsed = time.perf_counter() - started
+            progress(done, total, done / elapsed if elapsed > 0 else 0.0)
+
+    if workers == 1:
+        for done, path in enumerate(paths, 1):
+            result = encode_image(path, model, num_jitters)
+            report(done)
+            yield result
+        return
+
+    # chunksize kecil → hasil cepat mengalir balik walaupun urutan dijaga
+    chunksize = max(1, min(8, total // (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(encode_image, paths, repeat(model), repeat(num_jitters), chunksize=chunksize)
+        for done, result in enumerate(results, 1):
+            report(done)
+            yield result
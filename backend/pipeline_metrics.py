@@ -0,0 +1,147 @@
+"""
+=============================================================
+Per-Stage Pipeline Latency Metrics
+=============================================================
+Timer ringan di setiap tahap generate_frames() supaya bottleneck
+terlihat: capture, resize, face_locations, face_encodings, match,
+draw, imencode (+ total per frame). frame_wait dicatat terpisah:
+waktu idle menunggu frame baru dari camera (bukan biaya proses,
+tidak termasuk di total frame).
+
+  - lap(stage, t0): satu perf_counter() + append ke deque per tahap,
+    return waktu sekarang untuk tahap berikutnya (overhead < 1 µs)
+  - Histogram rolling: `window` sample terakhir per tahap →
+    p50 / p95 / p99 / max dihitung hanya saat diminta (/stats/pipeline)
+  - count / sum / max sejak start disimpan terpisah (tidak ikut rolling)
+  - prometheus(): format teks Prometheus (summary per tahap + counter
+    tambahan) untuk route /metrics
+
+Penggunaan:
+    from pipeline_metrics import PipelineMetrics
+
+    metrics = PipelineMetrics()
+    t = time.perf_counter()
+    small = cv2.resize(frame, (0, 0), fx=0.25, fy=0.25)
+    t = metrics.lap("resize", t)
+    ...
+    print(metrics.snapshot())
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+STAGES = ("frame_wait", "capture", "resize", "face_locations", "face_encodings", "match", "draw", "imencode",
+          "frame")
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class StageHistogram:
+    """Sample latency satu tahap (detik)"""
+
+    def __init__(self, window: int):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class PipelineMetrics:
+    """
+    Histogram latency rolling per tahap pipeline recognition
+    """
+
+    def __init__(self, stages: Iterable[str] = STAGES, window: int = 1000, prefix: str = "facereco"):
+        """
+        Args:
+            stages: Nama tahap (urutan dipakai di output)
+            window: Jumlah sample terakhir per tahap untuk persentil
+            prefix: Prefix nama metrik Prometheus
+        """
+        self.window = window
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.stages: Dict[str, StageHistogram] = {name: StageHistogram(window) for name in stages}
+        self.started = time.time()
+
+    def record(self, stage: str, seconds: float):
+        """Tambahkan satu sample (detik) ke tahap `stage`"""
+        with self.lock:
+            histogram = self.stages.get(stage)
+            if histogram is None:
+                histogram = self.stages[stage] = StageHistogram(self.window)
+            histogram.add(seconds)
+
+    def lap(self, stage: str, started: float) -> float:
+        """Catat waktu sejak `started` ke `stage`, return perf_counter() sekarang"""
+        now = time.perf_counter()
+        self.record(stage, now - started)
+        return now
+
+    def _stage_view(self, histogram: StageHistogram) -> dict:
+        if not histogram.samples:
+            return {"count": histogram.count, "p50_ms": None, "p95_ms": None, "p99_ms": None,
+                    "max_ms": None, "avg_ms": None, "total_max_ms": None}
+        samples = np.array(histogram.samples) * 1000
+        p50, p95, p99 = np.percentile(samples, [q * 100 for q in QUANTILES])
+        return {
+            "count": histogram.count,
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+            "max_ms": round(float(samples.max()), 2),
+            "avg_ms": round(float(samples.mean()), 2),
+            "total_max_ms": round(histogram.max * 1000, 2),
+        }
+
+    def snapshot(self) -> dict:
+        """Persentil per tahap untuk /stats/pipeline (max_ms = window, total_max_ms = sejak start)"""
+        with self.lock:
+            stages = {name: self._stage_view(histogram) for name, histogram in self.stages.items()}
+        return {"window": self.window, "uptime_s": round(time.time() - self.started, 1), "stages": stages}
+
+    def prometheus(self, counters: Optional[Dict[str, float]] = None) -> str:
+        """
+        Metrik dalam format teks Prometheus (exposition format 0.0.4)
+
+        Args:
+            counters: Counter tambahan, mis. {"faces_detected": 12} →
+                      facereco_faces_detected_total 12
+
+        Returns:
+            Teks untuk Response(mimetype='text/plain; version=0.0.4')
+        """
+        name = f"{self.prefix}_stage_seconds"
+        lines = [
+            f"# HELP {name} Latency per tahap pipeline recognition (rolling {self.window} sample)",
+            f"# TYPE {name} summary",
+        ]
+        with self.lock:
+            for stage, histogram in self.stages.items():
+                if histogram.samples:
+                    values = np.percentile(np.array(histogram.samples), [q * 100 for q in QUANTILES])
+                    for quantile, value in zip(QUANTILES, values):
+                        lines.append(f'{name}{{stage="{stage}",quantile="{quantile}"}} {float(value):.6f}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {histogram.total:.6f}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+            lines.append(f"# HELP {name}_max Latency maksimum per tahap sejak start")
+            lines.append(f"# TYPE {name}_max gauge")
+            for stage, histogram in self.stages.items():
+                lines.append(f'{name}_max{{stage="{stage}"}} {histogram.max:.6f}')
+
+        for counter, value in (counters or {}).items():
+            metric = f"{self.prefix}_{counter}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
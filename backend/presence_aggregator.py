@@ -0,0 +1,120 @@
+"""
+=============================================================
+Presence Aggregator
+=============================================================
+Mengubah hasil recognition per frame menjadi event kunjungan:
+SATU event "datang" dan SATU event "pulang" per orang per kunjungan,
+menggantikan debounce last_seen 5 detik (yang menghasilkan 12 baris
+kehadiran untuk orang yang berdiri 1 menit di depan pintu).
+
+  - Kunjungan dimulai saat nama pertama kali terlihat
+  - Event "datang" dikirim setelah orang terlihat >= min_dwell detik
+    (orang lewat sekilas / salah kenali satu frame tidak dicatat)
+  - Kunjungan selesai jika nama tidak terlihat > gap detik, lalu
+    event "pulang" dikirim dengan waktu terakhir terlihat
+
+Penggunaan:
+    from presence_aggregator import PresenceAggregator
+
+    presence = PresenceAggregator(on_event=lambda nama, jenis, ts: ...)
+    presence.observe(["Galih_Rakasiwi"])  # setiap frame yang diproses
+    presence.sweep()                      # setiap loop (tutup kunjungan)
+"""
+
+import threading
+import time
+from typing import Callable, Iterable, Optional
+
+ARRIVAL = "datang"
+DEPARTURE = "pulang"
+
+
+class Visit:
+    """Satu kunjungan seseorang di depan camera"""
+
+    def __init__(self, now: float):
+        self.first_seen = now
+        self.last_seen = now
+        self.observations = 0
+        self.arrived = False
+
+
+class PresenceAggregator:
+    """
+    Mengumpulkan observasi per frame menjadi event datang/pulang
+    """
+
+    def __init__(self, on_event: Callable[[str, str, float], None], gap: float = 30.0,
+                 min_dwell: float = 1.0, emit_departure: bool = True):
+        """
+        Args:
+            on_event: Callback on_event(nama, jenis, timestamp), jenis "datang"/"pulang"
+            gap: Detik tanpa terlihat sebelum kunjungan dianggap selesai
+            min_dwell: Detik minimum terlihat sebelum event "datang" dikirim
+            emit_departure: Kirim juga event "pulang" saat kunjungan selesai
+        """
+        self.on_event = on_event
+        self.gap = gap
+        self.min_dwell = min_dwell
+        self.emit_departure = emit_departure
+
+        self.visits = {}
+        self.lock = threading.Lock()
+
+        # Statistik
+        self.observations = 0
+        self.arrivals = 0
+        self.departures = 0
+        self.ignored = 0  # Kunjungan yang tidak mencapai min_dwell
+
+    def observe(self, names: Iterable[str], now: Optional[float] = None):
+        """Catat nama-nama yang dikenali di satu frame"""
+        now = time.time() if now is None else now
+        arrivals = []
+        with self.lock:
+            for name in set(names):
+                visit = self.visits.get(name)
+                if visit is None:
+                    visit = self.visits[name] = Visit(now)
+                visit.last_seen = now
+                visit.observations += 1
+                self.observations += 1
+
+                if not visit.arrived and now - visit.first_seen >= self.min_dwell:
+                    visit.arrived = True
+                    self.arrivals += 1
+                    arrivals.append((name, visit.first_seen))
+
+        for name, ts in arrivals:
+            self.on_event(name, ARRIVAL, ts)
+
+    def sweep(self, now: Optional[float] = None):
+        """Tutup kunjungan yang sudah tidak terlihat lebih dari gap detik"""
+        now = time.time() if now is None else now
+        departures = []
+        with self.lock:
+            for name, visit in list(self.visits.items()):
+                if now - visit.last_seen <= self.gap:
+                    continue
+                del self.visits[name]
+                if not visit.arrived:
+                    self.ignored += 1
+                elif self.emit_departure:
+                    self.departures += 1
+                    departures.append((name, visit.last_seen))
+
+        for name, ts in departures:
+            self.on_event(name, DEPARTURE, ts)
+
+    def snapshot(self) -> dict:
+        """Statistik untuk /stats"""
+        with self.lock:
+            events = self.arrivals + self.departures
+            return {
+                "active_visits": sum(1 for v in self.visits.values() if v.arrived),
+                "observations": self.observations,
+                "arrivals": self.arrivals,
+                "departures": self.departures,
+                "ignored": self.ignored,
+                "writes_saved": self.observations - events,
+            }
@@ -0,0 +1,197 @@
+"""
+=============================================================
+Serial Port Auto-Discovery (ESP32 Door Controller)
+=============================================================
+Pengganti SERIAL_PORT = "COM3" yang di-hardcode. Semua port kandidat
+(/dev/ttyUSB*, /dev/ttyACM*, COM*) di-probe PARALEL dengan perintah
+'status' firmware; port yang membalas "📊 STATUS:" adalah ESP32 pintu.
+
+  - Port dibuka dengan DTR/RTS low → ESP32 tidak reset saat di-probe
+  - Port hasil discovery disimpan di cache JSON dan di-probe PERTAMA
+    saat start berikutnya (biasanya langsung ketemu, tanpa scan)
+  - Port USB-serial yang dikenal (CP210x, CH340, FTDI, ESP32-S2/S3)
+    diurutkan lebih dulu
+
+Penggunaan:
+    from serial_discovery import port_finder, resolve_port
+
+    port = resolve_port("auto", 115200)   # "auto" → discovery, selain itu dipakai apa adanya
+
+    # Board belum terpasang saat start → supervisor mencari ulang saat reconnect
+    esp32 = ESP32SerialController(port, auto_reconnect=True, discover=port_finder("auto", 115200))
+"""
+
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+
+import serial
+
+try:
+    from serial.tools import list_ports
+except ImportError:
+    list_ports = None
+
+logger = logging.getLogger(__name__)
+
+AUTO = "auto"
+DEFAULT_CACHE_PATH = ".serial_port_cache.json"
+STATUS_MARKER = "STATUS:"
+
+# Vendor ID chip USB-serial yang umum dipakai board ESP32
+KNOWN_VIDS = {0x10C4, 0x1A86, 0x0403, 0x303A}
+
+
+def candidate_ports() -> List[str]:
+    """Daftar port serial kandidat, port USB-serial yang dikenal lebih dulu"""
+    known, others = [], []
+    if list_ports is not None:
+        for info in list_ports.comports():
+            (known if info.vid in KNOWN_VIDS else others).append(info.device)
+
+    for pattern in ("/dev/ttyUSB*", "/dev/ttyACM*"):
+        for device in sorted(glob.glob(pattern)):
+            if device not in known and device not in others:
+                others.append(device)
+
+    if list_ports is None and sys.platform.startswith("win"):
+        others.extend(f"COM{i}" for i in range(1, 21))
+
+    return known + others
+
+
+def probe_port(port: str, baudrate: int = 115200, timeout: float = 2.5) -> Tuple[str, bool, str]:
+    """
+    Kirim 'status' ke satu port dan cek apakah yang membalas firmware pintu
+
+    Returns:
+        (port, cocok, keterangan)
+    """
+    ser = serial.Serial()
+    ser.port = port
+    ser.baudrate = baudrate
+    ser.timeout = 0.2
+    ser.write_timeout = 1.0
+    ser.dtr = False  # Jangan reset ESP32
+    ser.rts = False
+    try:
+        ser.open()
+        ser.reset_input_buffer()
+        deadline = time.monotonic() + timeout
+        resend_at = time.monotonic() + timeout / 2
+        ser.write(b"status\n")
+
+        while time.monotonic() < deadline:
+            line = ser.readline().decode("utf-8", errors="replace").strip()
+            if STATUS_MARKER in line:
+                return port, True, line
+            if resend_at and time.monotonic() >= resend_at:
+                # Board mungkin baru selesai boot → kirim sekali lagi
+                ser.write(b"status\n")
+                resend_at = None
+        return port, False, "tidak ada balasan status"
+    except Exception as e:
+        return port, False, str(e)
+    finally:
+        try:
+            ser.close()
+        except Exception:
+            pass
+
+
+def load_cached_port(cache_path: str = DEFAULT_CACHE_PATH) -> Optional[str]:
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            return json.load(f).get("port")
+    except (OSError, ValueError):
+        return None
+
+
+def save_cached_port(port: str, cache_path: str = DEFAULT_CACHE_PATH):
+    tmp_path = cache_path + ".tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"port": port, "found_at": time.strftime("%Y-%m-%d %H:%M:%S")}, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning(f"⚠️  Gagal simpan cache port: {e}")
+
+
+def discover_port(baudrate: int = 115200, cache_path: str = DEFAULT_CACHE_PATH,
+                  timeout: float = 2.5, workers: int = 8) -> Optional[str]:
+    """
+    Cari port ESP32 pintu: port cache dulu, lalu semua kandidat paralel
+
+    Returns:
+        Nama port atau None jika tidak ditemukan
+    """
+    started = time.monotonic()
+    cached = load_cached_port(cache_path)
+    candidates = candidate_ports()
+
+    if cached:
+        port, ok, detail = probe_port(cached, baudrate, timeout)
+        if ok:
+            logger.info(f"✅ ESP32 di {port} (cache, {time.monotonic() - started:.2f}s)")
+            return port
+        logger.info(f"Port cache {cached} tidak membalas: {detail}")
+        candidates = [p for p in candidates if p != cached]
+
+    if not candidates:
+        logger.warning("⚠️  Tidak ada port serial kandidat")
+        return None
+
+    found = None
+    with ThreadPoolExecutor(max_workers=min(workers, len(candidates))) as executor:
+        futures = [executor.submit(probe_port, port, baudrate, timeout) for port in candidates]
+        for future in as_completed(futures):
+            port, ok, detail = future.result()
+            if ok and found is None:
+                found = port
+                # Probe lain tetap selesai sendiri (maks timeout) supaya port tertutup rapi
+                for other in futures:
+                    other.cancel()
+            elif not ok:
+                logger.debug(f"{port}: {detail}")
+
+    if found:
+        save_cached_port(found, cache_path)
+        logger.info(f"✅ ESP32 di {found} ({len(candidates)} port di-probe, {time.monotonic() - started:.2f}s)")
+    else:
+        logger.warning(f"⚠️  ESP32 tidak ditemukan di {', '.join(candidates)}")
+    return found
+
+
+def port_finder(configured: str, baudrate: int = 115200,
+                cache_path: str = DEFAULT_CACHE_PATH) -> Optional[Callable[[], Optional[str]]]:
+    """
+    Fungsi discovery untuk ESP32SerialController(discover=...)
+
+    Returns:
+        None jika port dikonfigurasi manual, selain itu fungsi yang menjalankan
+        discover_port() (dipanggil ulang oleh supervisor saat reconnect)
+    """
+    if configured and configured.lower() != AUTO:
+        return None
+    return lambda: discover_port(baudrate, cache_path)
+
+
+def resolve_port(configured: str, baudrate: int = 115200, cache_path: str = DEFAULT_CACHE_PATH) -> str:
+    """
+    Port yang dipakai aplikasi
+
+    Args:
+        configured: SERIAL_PORT dari konfigurasi ("auto" = discovery)
+
+    Returns:
+        Port hasil discovery, atau port cache / configured jika tidak ditemukan
+        (bisa "auto": pakai port_finder() supaya reconnect mencari ulang)
+    """
+    if configured and configured.lower() != AUTO:
+        return configured
+    return discover_port(baudrate, cache_path) or load_cached_port(cache_path) or configured
@@ -6,7 +6,6 @@ Gunakan script ini untuk test connection dan kontrol ESP32 via USB Serial
 """
 
 import sys
-import time
 from pathlib import Path
 
 # Coba import library custom (jika ada)
@@ -77,10 +76,7 @@ def test_led(port, baudrate):
             return False
         
         print_info("Mengirim perintah: test=LED")
-        esp32.send_command("test=LED")
-        time.sleep(1)
-        
-        responses = esp32.read_response(5)
+        responses = esp32.request("test=LED", expect="Test LED")
         if responses:
             print_success(f"LED test dikirim")
             for r in responses:
@@ -105,10 +101,7 @@ def test_relay(port, baudrate):
             return False
         
         print_info("Mengirim perintah: test=RELAY")
-        esp32.send_command("test=RELAY")
-        time.sleep(1)
-        
-        responses = esp32.read_response(5)
+        responses = esp32.request("test=RELAY", expect="Test RELAY")
         if responses:
             print_success(f"RELAY test dikirim")
             for r in responses:
@@ -135,16 +128,10 @@ def test_door_control(port, baudrate):
         print_info("Mengirim perintah: pintu=BUKA")
         print_info("Pintu akan terbuka selama 10 detik...")
         
-        esp32.send_command("pintu=BUKA")
-        
-        # Monitor selama 10 detik
-        start_time = time.time()
-        while time.time() - start_time < 10:
-            responses = esp32.read_response(3)
-            if responses:
-                for r in responses:
-                    print(f"  ← {r}")
-            time.sleep(0.5)
+        # Balasan lengkap (buka → 10 detik → tutup otomatis) diakhiri baris kosong
+        responses = esp32.request("pintu=BUKA", timeout=12)
+        for r in responses:
+            print(f"  ← {r}")
         
         print_success("Pintu auto-closed (10 detik selesai)")
         esp32.close()
@@ -164,10 +151,7 @@ def test_status(port, baudrate):
             return False
         
         print_info("Mengirim perintah: status")
-        esp32.send_command("status")
-        time.sleep(0.5)
-        
-        responses = esp32.read_response(5)
+        responses = esp32.request("status")
         if responses:
             print_success("Status diterima:")
             for r in responses:
@@ -205,10 +189,7 @@ def interactive_mode(port, baudrate):
                     continue
                 
                 print(f"Sending: {cmd}")
-                esp32.send_command(cmd)
-                time.sleep(0.5)
-                
-                responses = esp32.read_response(10)
+                responses = esp32.request(cmd)
                 if responses:
                     for r in responses:
                         print(f"  ← {r}")
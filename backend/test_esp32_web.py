@@ -425,8 +425,8 @@ def buka_pintu():
     
     try:
         print("🔓 Buka Pintu...")
-        esp32_controller.send_command("pintu=BUKA")
-        responses = esp32_controller.read_response(10)
+        # Tunggu konfirmasi buka saja (balasan lengkap baru selesai setelah 10 detik)
+        responses = esp32_controller.request("pintu=BUKA", expect="BUKA PINTU")
         
         return jsonify({
             "status": "OK",
@@ -453,8 +453,7 @@ def tutup_pintu():
     
     try:
         print("🔒 Tutup Pintu...")
-        esp32_controller.send_command("pintu=TUTUP")
-        responses = esp32_controller.read_response(3)
+        responses = esp32_controller.request("pintu=TUTUP", expect="TUTUP PINTU")
         
         return jsonify({
             "status": "OK",
@@ -51,15 +51,8 @@ except Exception as e:
 # Test 4: Serial ports
 print("\n[4] Serial Ports")
 try:
-    import serial
-    ports = []
-    for i in range(20):
-        try:
-            s = serial.Serial('COM' + str(i), timeout=0.1)
-            ports.append('COM' + str(i))
-            s.close()
-        except:
-            pass
+    from serial_discovery import candidate_ports
+    ports = candidate_ports()
     
     if ports:
         print("    OK: Available - " + ", ".join(ports))
@@ -68,27 +61,19 @@ try:
 except Exception as e:
     print("    ERROR: Serial - " + str(e))
 
-# Test 5: ESP32 connection
+# Test 5: ESP32 connection (probe semua port paralel, port cache dulu)
 print("\n[5] ESP32 Connection")
 try:
-    import serial
-    import time
+    from serial_discovery import discover_port
     
-    ser = serial.Serial('COM3', 115200, timeout=2)
-    time.sleep(1)
-    ser.write(b'status\n')
-    time.sleep(0.5)
-    resp = ser.read_all()
-    ser.close()
+    port = discover_port(115200)
     
-    if resp:
-        print("    OK: ESP32 responding on COM3")
+    if port:
+        print("    OK: ESP32 responding on " + port)
     else:
-        print("    WARNING: COM3 open but no response")
-except FileNotFoundError:
-    print("    ERROR: COM3 not found - Check Device Manager")
+        print("    WARNING: No port answered the status command")
 except Exception as e:
-    print("    WARNING: COM3 - " + str(e))
+    print("    WARNING: ESP32 - " + str(e))
 
 # Test 6: Dataset
 print("\n[6] Face Recognition Dataset")
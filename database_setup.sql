@@ -61,6 +61,25 @@ CREATE TABLE IF NOT EXISTS `presensi` (
   INDEX `idx_waktu` (`waktu`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- =============================================================
+-- TABEL: kehadiran
+-- Event presensi dari backend Python (php/presensi.php)
+-- jenis: 'datang' saat orang mulai terlihat, 'pulang' saat kunjungan selesai
+-- =============================================================
+CREATE TABLE IF NOT EXISTS `kehadiran` (
+  `id` INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY,
+  `nama` VARCHAR(255) NOT NULL,
+  `waktu` DATETIME NOT NULL,
+  `jenis` ENUM('datang', 'pulang') NOT NULL DEFAULT 'datang',
+  INDEX `idx_nama` (`nama`),
+  INDEX `idx_waktu` (`waktu`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- MIGRASI: tabel kehadiran lama tanpa kolom jenis (baris lama = 'datang')
+-- ADD COLUMN IF NOT EXISTS didukung MariaDB (XAMPP); di MySQL hapus "IF NOT EXISTS"
+ALTER TABLE `kehadiran`
+  ADD COLUMN IF NOT EXISTS `jenis` ENUM('datang', 'pulang') NOT NULL DEFAULT 'datang' AFTER `waktu`;
+
 -- =============================================================
 -- DATA AWAL (SEED)
 -- Contoh admin pertama dengan password: admin123
@@ -67,9 +67,10 @@ while ($row = mysqli_fetch_assoc($r4)) {
 */
 
 // Ambil data detail kehadiran unik per nama per hari (tanpa "Tidak Dikenal")
+// Jam datang = event "datang" paling awal (event "pulang" tidak dihitung)
 $q4 = "SELECT nama, DATE(waktu) as tanggal, MIN(TIME(waktu)) as waktu 
        FROM kehadiran 
-       WHERE nama != 'Tidak Dikenal' 
+       WHERE nama != 'Tidak Dikenal' AND jenis = 'datang'
        GROUP BY nama, DATE(waktu)
        ORDER BY tanggal DESC 
        LIMIT 100";
@@ -2,10 +2,51 @@
 include 'koneksi.php';
 date_default_timezone_set('Asia/Jakarta'); // Set zona waktu
 
+// Validasi format waktu dari backend (antrian/spool bisa terkirim terlambat)
+function waktu_valid($waktu) {
+  $dt = DateTime::createFromFormat('Y-m-d H:i:s', $waktu);
+  return $dt && $dt->format('Y-m-d H:i:s') === $waktu;
+}
+
+// Jenis event dari PresenceAggregator (kosong = "datang", untuk spool/client lama)
+function jenis_valid($jenis) {
+  return in_array($jenis, ['datang', 'pulang'], true);
+}
+
+// Bulk: events = [{"nama": "...", "waktu": "Y-m-d H:i:s", "jenis": "datang"}, ...] (replay spool)
+if (isset($_POST['events'])) {
+  $events = json_decode($_POST['events'], true);
+  if (!is_array($events)) { http_response_code(400); echo "Format events salah"; exit; }
+
+  $values = [];
+  foreach ($events as $e) {
+    $nama = trim($e['nama'] ?? '');
+    if ($nama == '') continue;
+    $jenis = $e['jenis'] ?? 'datang';
+    if (!jenis_valid($jenis)) continue; // Dilewati, jangan blokir replay spool
+    $waktu = waktu_valid($e['waktu'] ?? '') ? $e['waktu'] : date("Y-m-d H:i:s");
+    $values[] = "('" . mysqli_real_escape_string($conn, $nama) . "', '$waktu', '$jenis')";
+  }
+  if (!$values) { echo "0 presensi dicatat"; exit; }
+
+  $q = "INSERT INTO kehadiran (nama, waktu, jenis) VALUES " . implode(', ', $values);
+  if (mysqli_query($conn, $q)) {
+    echo count($values) . " presensi dicatat";
+  } else {
+    http_response_code(500);
+    echo "Gagal mencatat: " . mysqli_error($conn);
+  }
+  exit;
+}
+
 $nama = $_POST['nama'] ?? '';
 if ($nama == '') { echo "Tidak Dikenal"; exit; }
 
-$waktu = date("Y-m-d H:i:s");
-$q = "INSERT INTO kehadiran (nama, waktu) VALUES ('$nama', '$waktu')";
-echo mysqli_query($conn, $q) ? "Presensi dicatat untuk $nama pada $waktu" : "Gagal mencatat: " . mysqli_error($conn);
+$jenis = $_POST['jenis'] ?? 'datang';
+if (!jenis_valid($jenis)) { http_response_code(400); echo "Jenis tidak valid"; exit; }
+
+$waktu = waktu_valid($_POST['waktu'] ?? '') ? $_POST['waktu'] : date("Y-m-d H:i:s");
+$nama_sql = mysqli_real_escape_string($conn, $nama);
+$q = "INSERT INTO kehadiran (nama, waktu, jenis) VALUES ('$nama_sql', '$waktu', '$jenis')";
+echo mysqli_query($conn, $q) ? "Presensi ($jenis) dicatat untuk $nama pada $waktu" : "Gagal mencatat: " . mysqli_error($conn);
 ?>